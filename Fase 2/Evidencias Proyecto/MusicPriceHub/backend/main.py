@@ -37,6 +37,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paginación de GET /api/productos/
+    expose_headers=["X-Siguiente-Cursor"],
 )
 app.include_router(productos.router)
 app.include_router(historial.router)
@@ -0,0 +1,14 @@
+-- 001: historial de precios solo con cambios (segmentos)
+--
+-- Cada fila de precios.historial_precios pasa a representar un tramo en que
+-- el precio/disponibilidad no cambió: empieza en valido_desde y fue visto
+-- por última vez en confirmado_hasta.
+--
+-- Después de aplicar este script, compactar los datos antiguos con:
+--     python -m scraper.compactar_historial
+
+ALTER TABLE precios.historial_precios
+    ADD COLUMN IF NOT EXISTS confirmado_hasta TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS ix_historial_precios_tp_valido_desde
+    ON precios.historial_precios (tienda_producto_id, valido_desde);
@@ -0,0 +1,15 @@
+-- 002: clave normalizada del nombre de producto
+--
+-- El scraper identificaba productos con nombre ILIKE :nombre (un escaneo
+-- completo por ítem). Ahora busca por igualdad sobre esta columna indexada,
+-- que la aplicación mantiene al asignar Producto.nombre (utils/texto.py).
+
+ALTER TABLE catalogo.productos
+    ADD COLUMN IF NOT EXISTS nombre_normalizado TEXT;
+
+UPDATE catalogo.productos
+SET nombre_normalizado = lower(btrim(regexp_replace(normalize(nombre, NFKC), '\s+', ' ', 'g')))
+WHERE nombre_normalizado IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_catalogo_productos_nombre_normalizado
+    ON catalogo.productos (nombre_normalizado);
@@ -0,0 +1,18 @@
+-- 002a: estado por URL scrapeada (scraper/base_scraper.py)
+--
+-- Último ETag / Last-Modified y hash de lo extraído de cada
+-- TiendaProducto: con ellos la descarga HTTP es condicional (304) y una
+-- página sin cambios no se vuelve a guardar. Va antes de 003, 004 y 010,
+-- que agregan columnas a esta tabla; en una base creada con create_all
+-- no hace nada.
+
+CREATE SCHEMA IF NOT EXISTS operaciones;
+
+CREATE TABLE IF NOT EXISTS operaciones.estado_scraping_productos (
+    tienda_producto_id UUID PRIMARY KEY
+        REFERENCES catalogo.tienda_productos (id) ON DELETE CASCADE,
+    etag TEXT,
+    last_modified TEXT,
+    hash_contenido VARCHAR(64),
+    ultimo_scraping_en TIMESTAMPTZ
+);
@@ -0,0 +1,12 @@
+-- 003: agenda adaptativa de scraping
+--
+-- Cada URL tiene su propio intervalo (según cuánto cambia su precio y
+-- cuántas alertas activas tiene el producto) y la fecha en que vuelve
+-- a tocar. El worker solo toma las vencidas.
+
+ALTER TABLE operaciones.estado_scraping_productos
+    ADD COLUMN IF NOT EXISTS intervalo_segundos INTEGER,
+    ADD COLUMN IF NOT EXISTS proximo_scraping_en TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS ix_operaciones_estado_scraping_productos_proximo_scraping_en
+    ON operaciones.estado_scraping_productos (proximo_scraping_en);
@@ -0,0 +1,18 @@
+-- 004: cola de scraping con arriendos (varios workers en paralelo)
+--
+-- Cada worker "arrienda" un lote de URLs vencidas con
+-- SELECT ... FOR UPDATE SKIP LOCKED; mientras las procesa renueva el
+-- arriendo (heartbeat). Si el worker muere, el arriendo vence y otro
+-- worker las toma. `intentos` cuenta fallos consecutivos.
+
+ALTER TABLE operaciones.estado_scraping_productos
+    ADD COLUMN IF NOT EXISTS arrendado_por TEXT,
+    ADD COLUMN IF NOT EXISTS arrendado_hasta TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS intentos INTEGER NOT NULL DEFAULT 0;
+
+-- Toda URL activa necesita su fila de estado para poder arrendarse
+INSERT INTO operaciones.estado_scraping_productos (tienda_producto_id)
+SELECT tp.id
+FROM catalogo.tienda_productos tp
+WHERE tp.activo
+ON CONFLICT (tienda_producto_id) DO NOTHING;
@@ -0,0 +1,20 @@
+-- 005: tiempos por fase del scraping
+--
+-- Cada ResultadoScraping guarda cuánto tardó su página en cada fase
+-- (descarga, espera de render, parseo, BD), los bytes y el nivel de
+-- descarga usado. La TareaScraping guarda el agregado de la corrida.
+
+ALTER TABLE operaciones.tareas_scraping
+    ADD COLUMN IF NOT EXISTS metricas JSONB;
+
+ALTER TABLE operaciones.resultados_scraping
+    ADD COLUMN IF NOT EXISTS nivel_descarga VARCHAR,
+    ADD COLUMN IF NOT EXISTS bytes_descargados INTEGER,
+    ADD COLUMN IF NOT EXISTS descarga_ms INTEGER,
+    ADD COLUMN IF NOT EXISTS espera_render_ms INTEGER,
+    ADD COLUMN IF NOT EXISTS parseo_ms INTEGER,
+    ADD COLUMN IF NOT EXISTS bd_ms INTEGER;
+
+-- Para los agregados por tienda y ventana de tiempo (/scraping/metricas)
+CREATE INDEX IF NOT EXISTS ix_operaciones_resultados_scraping_obtenido_en
+    ON operaciones.resultados_scraping (obtenido_en);
@@ -0,0 +1,133 @@
+-- 006: particionado por día de las tablas de auditoría del scraping
+--
+-- operaciones.tareas_scraping (por inicio_en) y
+-- operaciones.resultados_scraping (por obtenido_en) pasan a ser tablas
+-- particionadas. Borrar datos viejos pasa a ser un DROP de partición
+-- (instantáneo, sin VACUUM) en vez de un DELETE masivo.
+--
+-- Los datos existentes quedan en una partición "historico" que se borra
+-- cuando toda ella supera la retención. Las particiones diarias las crea
+-- scraper/mantenimiento_scraping.py (se ejecuta también desde el worker):
+--     python -m scraper.mantenimiento_scraping
+--
+-- Ejecutar con el worker detenido: reescribe ambas tablas.
+
+BEGIN;
+
+-- ---------- tareas_scraping ----------
+ALTER TABLE operaciones.resultados_scraping
+    DROP CONSTRAINT IF EXISTS resultados_scraping_tarea_id_fkey;
+
+ALTER TABLE operaciones.tareas_scraping RENAME TO tareas_scraping_anterior;
+ALTER TABLE operaciones.tareas_scraping_anterior
+    RENAME CONSTRAINT tareas_scraping_pkey TO tareas_scraping_anterior_pkey;
+
+CREATE TABLE operaciones.tareas_scraping (
+    id UUID NOT NULL,
+    tienda_id UUID NOT NULL REFERENCES catalogo.tiendas (id),
+    inicio_en TIMESTAMPTZ NOT NULL DEFAULT now(),
+    fin_en TIMESTAMPTZ,
+    estado VARCHAR NOT NULL,
+    detalle TEXT,
+    metricas JSONB,
+    PRIMARY KEY (id, inicio_en)
+) PARTITION BY RANGE (inicio_en);
+
+-- ---------- resultados_scraping ----------
+ALTER TABLE operaciones.resultados_scraping RENAME TO resultados_scraping_anterior;
+ALTER TABLE operaciones.resultados_scraping_anterior
+    RENAME CONSTRAINT resultados_scraping_pkey TO resultados_scraping_anterior_pkey;
+-- Los índices conservan su nombre al renombrar la tabla: se liberan
+DROP INDEX IF EXISTS operaciones.ix_operaciones_resultados_scraping_obtenido_en;
+DROP INDEX IF EXISTS operaciones.ix_resultados_scraping_obtenido_en;
+
+CREATE TABLE operaciones.resultados_scraping (
+    id UUID NOT NULL,
+    tarea_id UUID NOT NULL,
+    url_producto TEXT NOT NULL,
+    datos_extraidos JSONB NOT NULL,
+    obtenido_en TIMESTAMPTZ NOT NULL DEFAULT now(),
+    estado VARCHAR NOT NULL,
+    nivel_descarga VARCHAR,
+    bytes_descargados INTEGER,
+    descarga_ms INTEGER,
+    espera_render_ms INTEGER,
+    parseo_ms INTEGER,
+    bd_ms INTEGER,
+    PRIMARY KEY (id, obtenido_en)
+) PARTITION BY RANGE (obtenido_en);
+
+CREATE INDEX ix_operaciones_resultados_scraping_obtenido_en
+    ON operaciones.resultados_scraping (obtenido_en);
+CREATE INDEX ix_operaciones_resultados_scraping_tarea_id
+    ON operaciones.resultados_scraping (tarea_id);
+
+-- ---------- particiones iniciales ----------
+DO $$
+DECLARE
+    hoy DATE := current_date;
+    desde_tareas TIMESTAMPTZ;
+    desde_resultados TIMESTAMPTZ;
+BEGIN
+    SELECT COALESCE(MIN(inicio_en), hoy) INTO desde_tareas FROM operaciones.tareas_scraping_anterior;
+    SELECT COALESCE(MIN(obtenido_en), hoy) INTO desde_resultados FROM operaciones.resultados_scraping_anterior;
+
+    IF desde_tareas < hoy THEN
+        EXECUTE format(
+            'CREATE TABLE operaciones.tareas_scraping_historico PARTITION OF operaciones.tareas_scraping '
+            'FOR VALUES FROM (%L) TO (%L)', date_trunc('day', desde_tareas), hoy);
+    END IF;
+    IF desde_resultados < hoy THEN
+        EXECUTE format(
+            'CREATE TABLE operaciones.resultados_scraping_historico PARTITION OF operaciones.resultados_scraping '
+            'FOR VALUES FROM (%L) TO (%L)', date_trunc('day', desde_resultados), hoy);
+    END IF;
+
+    FOR i IN 0..7 LOOP
+        EXECUTE format(
+            'CREATE TABLE operaciones.tareas_scraping_p%s PARTITION OF operaciones.tareas_scraping '
+            'FOR VALUES FROM (%L) TO (%L)', to_char(hoy + i, 'YYYYMMDD'), hoy + i, hoy + i + 1);
+        EXECUTE format(
+            'CREATE TABLE operaciones.resultados_scraping_p%s PARTITION OF operaciones.resultados_scraping '
+            'FOR VALUES FROM (%L) TO (%L)', to_char(hoy + i, 'YYYYMMDD'), hoy + i, hoy + i + 1);
+    END LOOP;
+END $$;
+
+CREATE TABLE operaciones.tareas_scraping_default
+    PARTITION OF operaciones.tareas_scraping DEFAULT;
+CREATE TABLE operaciones.resultados_scraping_default
+    PARTITION OF operaciones.resultados_scraping DEFAULT;
+
+-- ---------- copia de datos ----------
+INSERT INTO operaciones.tareas_scraping
+    (id, tienda_id, inicio_en, fin_en, estado, detalle, metricas)
+SELECT id, tienda_id, COALESCE(inicio_en, fin_en, now()), fin_en, estado, detalle, metricas
+FROM operaciones.tareas_scraping_anterior;
+
+INSERT INTO operaciones.resultados_scraping
+    (id, tarea_id, url_producto, datos_extraidos, obtenido_en, estado,
+     nivel_descarga, bytes_descargados, descarga_ms, espera_render_ms, parseo_ms, bd_ms)
+SELECT id, tarea_id, url_producto, datos_extraidos, COALESCE(obtenido_en, now()), estado,
+       nivel_descarga, bytes_descargados, descarga_ms, espera_render_ms, parseo_ms, bd_ms
+FROM operaciones.resultados_scraping_anterior;
+
+DROP TABLE operaciones.resultados_scraping_anterior;
+DROP TABLE operaciones.tareas_scraping_anterior;
+
+-- ---------- resumen diario (rollup de lo que se borra) ----------
+CREATE TABLE IF NOT EXISTS operaciones.resumen_scraping_diario (
+    fecha DATE NOT NULL,
+    tienda_id UUID NOT NULL REFERENCES catalogo.tiendas (id) ON DELETE CASCADE,
+    paginas INTEGER NOT NULL DEFAULT 0,
+    ok INTEGER NOT NULL DEFAULT 0,
+    errores INTEGER NOT NULL DEFAULT 0,
+    bytes_descargados BIGINT NOT NULL DEFAULT 0,
+    descarga_ms_total BIGINT NOT NULL DEFAULT 0,
+    espera_render_ms_total BIGINT NOT NULL DEFAULT 0,
+    parseo_ms_total BIGINT NOT NULL DEFAULT 0,
+    bd_ms_total BIGINT NOT NULL DEFAULT 0,
+    descarga_ms_p95 INTEGER,
+    PRIMARY KEY (fecha, tienda_id)
+);
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- 007: descubrimiento de URLs (scraper/descubrimiento.py)
+--
+-- Las URLs encontradas en sitemaps/categorías se registran antes de saber
+-- a qué producto corresponden: producto_id se completa en su primer
+-- scraping. El índice (tienda, url) acelera el diff contra lo existente.
+
+ALTER TABLE catalogo.tienda_productos
+    ALTER COLUMN producto_id DROP NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_tienda_productos_tienda_url
+    ON catalogo.tienda_productos (tienda_id, url_producto);
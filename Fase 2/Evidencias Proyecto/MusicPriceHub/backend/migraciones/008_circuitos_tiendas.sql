@@ -0,0 +1,15 @@
+-- 008: circuito por tienda y reintentos con espera exponencial
+--
+-- Tras SCRAPER_CIRCUITO_UMBRAL fallos de descarga seguidos, la tienda
+-- queda "abierta" (no se arriendan sus URLs) hasta abierto_hasta; después
+-- se prueba con unas pocas URLs ("semiabierto") antes de volver a "cerrado".
+-- Ver scraper/circuito.py.
+
+CREATE TABLE IF NOT EXISTS operaciones.circuitos_tiendas (
+    tienda_id UUID PRIMARY KEY REFERENCES catalogo.tiendas(id) ON DELETE CASCADE,
+    estado VARCHAR NOT NULL DEFAULT 'cerrado',
+    fallos_consecutivos INTEGER NOT NULL DEFAULT 0,
+    aperturas INTEGER NOT NULL DEFAULT 0,
+    abierto_hasta TIMESTAMPTZ,
+    actualizado_en TIMESTAMPTZ
+);
@@ -0,0 +1,11 @@
+-- 009: corridas completas retomables
+--
+-- Una fila por corrida completa en curso (p. ej. scraper.run_scraping_scheduled).
+-- Si el proceso se reinicia a mitad de camino, la corrida sigue solo con las
+-- URLs cuyo ultimo_scraping_en es anterior a iniciado_en. Ver scraper/checkpoint.py.
+
+CREATE TABLE IF NOT EXISTS operaciones.checkpoints_scraping (
+    clave VARCHAR PRIMARY KEY,
+    iniciado_en TIMESTAMPTZ NOT NULL,
+    actualizado_en TIMESTAMPTZ
+);
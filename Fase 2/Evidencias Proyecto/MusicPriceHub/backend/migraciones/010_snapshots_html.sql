@@ -0,0 +1,10 @@
+-- 010: puntero al último snapshot de HTML de cada URL
+--
+-- El HTML se guarda comprimido en disco, direccionado por su sha256
+-- (scraper/snapshots.py); aquí solo queda qué snapshot corresponde a cada
+-- TiendaProducto, para poder re-extraer sin volver a descargar
+-- (python -m scraper.reparsear).
+
+ALTER TABLE operaciones.estado_scraping_productos
+    ADD COLUMN IF NOT EXISTS snapshot_hash VARCHAR(64),
+    ADD COLUMN IF NOT EXISTS snapshot_en TIMESTAMPTZ;
@@ -0,0 +1,10 @@
+-- 011: miniaturas locales de la imagen de cada producto
+--
+-- scraper/imagenes.py descarga Producto.imagen_url una sola vez y guarda
+-- miniaturas WebP en media/productos/, con el sha256 de la imagen en el
+-- nombre. imagen_origen_url es la URL desde la que se generaron: mientras
+-- coincida con imagen_url no se vuelve a descargar.
+
+ALTER TABLE catalogo.productos
+    ADD COLUMN IF NOT EXISTS imagen_origen_url VARCHAR,
+    ADD COLUMN IF NOT EXISTS miniaturas JSONB;
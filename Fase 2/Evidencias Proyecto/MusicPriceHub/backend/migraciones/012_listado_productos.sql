@@ -0,0 +1,17 @@
+-- 012: índices del listado paginado de productos (GET /api/productos/)
+--
+-- El listado agrega MIN(precio_centavos) por producto en SQL y pagina por
+-- clave (orden, id): cada página es un rango de índice en vez de cargar
+-- todo el catálogo con sus ofertas.
+
+CREATE INDEX IF NOT EXISTS ix_productos_nombre_id
+    ON catalogo.productos (nombre, id);
+
+CREATE INDEX IF NOT EXISTS ix_productos_marca
+    ON catalogo.productos (marca);
+
+CREATE INDEX IF NOT EXISTS ix_ofertas_actuales_producto_precio
+    ON precios.ofertas_actuales (producto_id, precio_centavos);
+
+CREATE INDEX IF NOT EXISTS ix_ofertas_actuales_tienda_producto
+    ON precios.ofertas_actuales (tienda_id, producto_id);
@@ -0,0 +1,50 @@
+-- 013: proyección del mejor precio de cada producto (utils/mejores_precios.py)
+--
+-- Una fila por producto con su oferta más barata, cuántas ofertas tiene y
+-- el precio_final (menor entre esa oferta y precio_base_centavos). Se
+-- mantiene al escribir ofertas; el listado ordenado por precio recorre los
+-- índices de esta tabla en vez de agregar ofertas_actuales en cada lectura.
+-- Si la tabla ya la creó create_all, este script solo la llena.
+
+CREATE TABLE IF NOT EXISTS precios.mejores_precios (
+    producto_id UUID PRIMARY KEY REFERENCES catalogo.productos (id) ON DELETE CASCADE,
+    precio_oferta_centavos INTEGER,
+    tienda_id UUID,
+    oferta_id UUID,
+    cantidad_ofertas INTEGER NOT NULL DEFAULT 0,
+    precio_final_centavos INTEGER,
+    actualizado_en TIMESTAMPTZ
+);
+
+-- Sin precio al final en ambos sentidos (mismas expresiones que routers/productos.py)
+CREATE INDEX IF NOT EXISTS ix_mejores_precios_orden_precio
+    ON precios.mejores_precios ((COALESCE(precio_final_centavos, 2147483647)), producto_id);
+
+CREATE INDEX IF NOT EXISTS ix_mejores_precios_orden_precio_desc
+    ON precios.mejores_precios ((COALESCE(precio_final_centavos, -1)), producto_id);
+
+-- Carga inicial (equivale a python -m utils.mejores_precios)
+INSERT INTO precios.mejores_precios (
+    producto_id, precio_oferta_centavos, tienda_id, oferta_id,
+    cantidad_ofertas, precio_final_centavos, actualizado_en
+)
+SELECT
+    p.id, o.precio_centavos, o.tienda_id, o.id,
+    COALESCE(c.cantidad, 0),
+    LEAST(p.precio_base_centavos, o.precio_centavos),
+    now()
+FROM catalogo.productos p
+LEFT JOIN LATERAL (
+    SELECT id, tienda_id, precio_centavos
+    FROM precios.ofertas_actuales
+    WHERE producto_id = p.id
+    ORDER BY precio_centavos, fecha_scraping DESC
+    LIMIT 1
+) o ON true
+LEFT JOIN LATERAL (
+    SELECT count(*) AS cantidad
+    FROM precios.ofertas_actuales
+    WHERE producto_id = p.id
+) c ON true
+WHERE true
+ON CONFLICT (producto_id) DO NOTHING;
@@ -0,0 +1,29 @@
+-- 014: trabajos de scraping pedidos desde la API, en la BD
+--
+-- POST /scraping/guardar solo inserta una fila aquí; el worker la toma con
+-- FOR UPDATE SKIP LOCKED y la ejecuta (scraper/trabajos.py). Así la API no
+-- scrapea en su proceso y GET /scraping/trabajos/{id} responde igual desde
+-- cualquier proceso de uvicorn.
+
+CREATE TABLE IF NOT EXISTS operaciones.trabajos_scraping (
+    id UUID PRIMARY KEY,
+    url TEXT NOT NULL,
+    tienda_id UUID NOT NULL REFERENCES catalogo.tiendas(id) ON DELETE CASCADE,
+    estado VARCHAR NOT NULL DEFAULT 'pendiente',
+    creado_en TIMESTAMPTZ NOT NULL DEFAULT now(),
+    reintentar_en TIMESTAMPTZ,
+    worker TEXT,
+    inicio_en TIMESTAMPTZ,
+    fin_en TIMESTAMPTZ,
+    resultado JSONB,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS ix_trabajos_scraping_pendientes
+    ON operaciones.trabajos_scraping (creado_en)
+    WHERE estado = 'pendiente';
+
+-- Una URL tiene a lo más un trabajo sin terminar
+CREATE UNIQUE INDEX IF NOT EXISTS ux_trabajos_scraping_url_activa
+    ON operaciones.trabajos_scraping (url)
+    WHERE estado IN ('pendiente', 'en_curso');
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Integer, Text, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Integer, BigInteger, Text, Boolean, Index, Date, DDL, event, text
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from datetime import datetime
 import uuid
 from database import Base
+from utils.texto import normalizar_nombre
 
 
 # ============================
@@ -56,13 +57,22 @@ class Perfil(Base):
 # ============================
 class Producto(Base):
     __tablename__ = "productos"
-    __table_args__ = {"schema": "catalogo"}
+    __table_args__ = (
+        # Paginación por nombre en GET /api/productos/ (clave nombre, id)
+        Index("ix_productos_nombre_id", "nombre", "id"),
+        Index("ix_productos_marca", "marca"),
+        {"schema": "catalogo"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nombre = Column(String, nullable=False)
+    nombre_normalizado = Column(String, nullable=True, index=True)
     marca = Column(String)
     modelo = Column(String)
     imagen_url = Column(String, nullable=True)
+    # Miniaturas locales de imagen_url (scraper/imagenes.py): tamaño → /media/...
+    imagen_origen_url = Column(String, nullable=True)
+    miniaturas = Column(JSONB, nullable=True)
     descripcion = Column(Text, nullable=True)
     url_fuente = Column(String, nullable=True)
     especificaciones = Column(JSONB, nullable=True)
@@ -79,17 +89,27 @@ class Producto(Base):
     alertas_precio = relationship("AlertaPrecio", back_populates="producto")
     tiendas_producto = relationship("TiendaProducto", back_populates="producto")
 
+    @validates("nombre")
+    def _actualizar_nombre_normalizado(self, key, nombre):
+        # Clave que usa el scraper para reconocer el producto
+        self.nombre_normalizado = normalizar_nombre(nombre)
+        return nombre
+
 
 # ============================
 # 🔹 MODELO: TIENDA_PRODUCTO
 # ============================
 class TiendaProducto(Base):
     __tablename__ = "tienda_productos"
-    __table_args__ = {"schema": "catalogo"}
+    __table_args__ = (
+        Index("ix_tienda_productos_tienda_url", "tienda_id", "url_producto"),
+        {"schema": "catalogo"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tienda_id = Column(UUID(as_uuid=True), ForeignKey("catalogo.tiendas.id"), nullable=False)
-    producto_id = Column(UUID(as_uuid=True), ForeignKey("catalogo.productos.id"), nullable=False)
+    # NULL = URL descubierta que aún no se scrapea (scraper/descubrimiento.py)
+    producto_id = Column(UUID(as_uuid=True), ForeignKey("catalogo.productos.id"), nullable=True)
 
     sku_tienda = Column(String, nullable=True)
     url_producto = Column(String, nullable=False)
@@ -124,7 +144,12 @@ class Tienda(Base):
 # ============================
 class OfertaActual(Base):
     __tablename__ = "ofertas_actuales"
-    __table_args__ = {"schema": "precios"}
+    __table_args__ = (
+        # MIN(precio) por producto, con o sin filtro de tienda
+        Index("ix_ofertas_actuales_producto_precio", "producto_id", "precio_centavos"),
+        Index("ix_ofertas_actuales_tienda_producto", "tienda_id", "producto_id"),
+        {"schema": "precios"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tienda_producto_id = Column(UUID(as_uuid=True), nullable=False)
@@ -141,12 +166,47 @@ class OfertaActual(Base):
     tienda = relationship("Tienda", back_populates="ofertas")
 
 
+# ============================
+# 🔹 MODELO: MEJOR PRECIO POR PRODUCTO
+# ============================
+class MejorPrecio(Base):
+    """
+    Proyección de la oferta más barata de cada producto, mantenida al escribir
+    ofertas (utils/mejores_precios.py). precio_final_centavos ya combina la
+    oferta con precio_base_centavos.
+    """
+    __tablename__ = "mejores_precios"
+    __table_args__ = (
+        # Orden por precio del listado, sin precio al final en ambos sentidos
+        Index("ix_mejores_precios_orden_precio", text("COALESCE(precio_final_centavos, 2147483647)"), "producto_id"),
+        Index("ix_mejores_precios_orden_precio_desc", text("COALESCE(precio_final_centavos, -1)"), "producto_id"),
+        {"schema": "precios"},
+    )
+
+    producto_id = Column(
+        UUID(as_uuid=True), ForeignKey("catalogo.productos.id", ondelete="CASCADE"), primary_key=True
+    )
+    precio_oferta_centavos = Column(Integer, nullable=True)
+    tienda_id = Column(UUID(as_uuid=True), nullable=True)
+    oferta_id = Column(UUID(as_uuid=True), nullable=True)
+    cantidad_ofertas = Column(Integer, nullable=False, default=0)
+    precio_final_centavos = Column(Integer, nullable=True)
+    actualizado_en = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+
 # ============================
 # 🔹 MODELO: HISTORIAL DE PRECIOS
 # ============================
 class HistorialPrecio(Base):
+    """
+    Cada fila es un tramo con el mismo precio/disponibilidad:
+    vigente desde valido_desde y confirmado por última vez en confirmado_hasta.
+    """
     __tablename__ = "historial_precios"
-    __table_args__ = {"schema": "precios"}
+    __table_args__ = (
+        Index("ix_historial_precios_tp_valido_desde", "tienda_producto_id", "valido_desde"),
+        {"schema": "precios"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tienda_producto_id = Column(UUID(as_uuid=True), nullable=False)
@@ -156,6 +216,7 @@ class HistorialPrecio(Base):
     valido_desde = Column(DateTime(timezone=True))
     fuente = Column(String)
     fecha_scraping = Column(DateTime(timezone=True), default=datetime.utcnow)
+    confirmado_hasta = Column(DateTime(timezone=True), nullable=True)
 
 
 # ============================
@@ -264,33 +325,182 @@ class ReporteMensajeForo(Base):
 # ============================
 # 🔹 SCRAPING
 # ============================
+# Tablas de auditoría particionadas por día (scraper/mantenimiento_scraping.py
+# crea las particiones por adelantado y borra las vencidas). La clave de
+# partición es parte de la PK, y resultados → tareas no lleva FK en la BD
+# para poder borrar particiones de cada tabla por separado.
 class TareaScraping(Base):
     __tablename__ = "tareas_scraping"
-    __table_args__ = {"schema": "operaciones"}
+    __table_args__ = {"schema": "operaciones", "postgresql_partition_by": "RANGE (inicio_en)"}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tienda_id = Column(UUID(as_uuid=True), ForeignKey("catalogo.tiendas.id"), nullable=False)
-    inicio_en = Column(DateTime(timezone=True), server_default=func.now())
+    inicio_en = Column(
+        DateTime(timezone=True), primary_key=True, default=datetime.utcnow, server_default=func.now()
+    )
     fin_en = Column(DateTime(timezone=True))
     estado = Column(String, nullable=False, default="pendiente")
     detalle = Column(Text)
+    # Agregado de tiempos por fase de la corrida (scraper/metricas.py)
+    metricas = Column(JSONB, nullable=True)
 
     tienda = relationship("Tienda", back_populates="tareas_scraping")
-    resultados = relationship("ResultadoScraping", back_populates="tarea", cascade="all, delete-orphan")
+    resultados = relationship(
+        "ResultadoScraping",
+        back_populates="tarea",
+        primaryjoin="TareaScraping.id == foreign(ResultadoScraping.tarea_id)",
+        cascade="all, delete-orphan",
+    )
 
 
 class ResultadoScraping(Base):
     __tablename__ = "resultados_scraping"
-    __table_args__ = {"schema": "operaciones"}
+    __table_args__ = {"schema": "operaciones", "postgresql_partition_by": "RANGE (obtenido_en)"}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    tarea_id = Column(UUID(as_uuid=True), ForeignKey("operaciones.tareas_scraping.id"), nullable=False)
+    tarea_id = Column(UUID(as_uuid=True), nullable=False, index=True)
     url_producto = Column(Text, nullable=False)
     datos_extraidos = Column(JSONB, nullable=False)
-    obtenido_en = Column(DateTime(timezone=True), server_default=func.now())
+    obtenido_en = Column(
+        DateTime(timezone=True),
+        primary_key=True,
+        default=datetime.utcnow,
+        server_default=func.now(),
+        index=True,
+    )
     estado = Column(String, nullable=False, default="ok")
 
-    tarea = relationship("TareaScraping", back_populates="resultados")
+    # Tiempos por fase de esta página (ms) y cómo se descargó
+    nivel_descarga = Column(String, nullable=True)
+    bytes_descargados = Column(Integer, nullable=True)
+    descarga_ms = Column(Integer, nullable=True)
+    espera_render_ms = Column(Integer, nullable=True)
+    parseo_ms = Column(Integer, nullable=True)
+    bd_ms = Column(Integer, nullable=True)
+
+    tarea = relationship(
+        "TareaScraping",
+        back_populates="resultados",
+        primaryjoin="TareaScraping.id == foreign(ResultadoScraping.tarea_id)",
+    )
+
+
+# Partición por defecto: una BD nueva (create_all) puede insertar de inmediato,
+# antes de que el mantenimiento cree las particiones diarias
+for _tabla in (TareaScraping.__table__, ResultadoScraping.__table__):
+    event.listen(
+        _tabla,
+        "after_create",
+        DDL(f"CREATE TABLE IF NOT EXISTS {_tabla.fullname}_default PARTITION OF {_tabla.fullname} DEFAULT"),
+    )
+
+
+class ResumenScrapingDiario(Base):
+    """Resumen por tienda y día de los resultados de scraping ya borrados."""
+    __tablename__ = "resumen_scraping_diario"
+    __table_args__ = {"schema": "operaciones"}
+
+    fecha = Column(Date, primary_key=True)
+    tienda_id = Column(UUID(as_uuid=True), ForeignKey("catalogo.tiendas.id", ondelete="CASCADE"), primary_key=True)
+    paginas = Column(Integer, nullable=False, default=0)
+    ok = Column(Integer, nullable=False, default=0)
+    errores = Column(Integer, nullable=False, default=0)
+    bytes_descargados = Column(BigInteger, nullable=False, default=0)
+    descarga_ms_total = Column(BigInteger, nullable=False, default=0)
+    espera_render_ms_total = Column(BigInteger, nullable=False, default=0)
+    parseo_ms_total = Column(BigInteger, nullable=False, default=0)
+    bd_ms_total = Column(BigInteger, nullable=False, default=0)
+    descarga_ms_p95 = Column(Integer, nullable=True)
+
+
+class EstadoScrapingProducto(Base):
+    """Último estado conocido de cada URL scrapeada (para no repetir trabajo)."""
+    __tablename__ = "estado_scraping_productos"
+    __table_args__ = {"schema": "operaciones"}
+
+    tienda_producto_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("catalogo.tienda_productos.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    etag = Column(Text, nullable=True)
+    last_modified = Column(Text, nullable=True)
+    hash_contenido = Column(String(64), nullable=True)
+    ultimo_scraping_en = Column(DateTime(timezone=True), nullable=True)
+    intervalo_segundos = Column(Integer, nullable=True)
+    proximo_scraping_en = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    # Cola de trabajo: qué worker la tiene tomada y hasta cuándo
+    arrendado_por = Column(Text, nullable=True)
+    arrendado_hasta = Column(DateTime(timezone=True), nullable=True)
+    intentos = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Último HTML descargado, en el almacén de snapshots (scraper/snapshots.py)
+    snapshot_hash = Column(String(64), nullable=True)
+    snapshot_en = Column(DateTime(timezone=True), nullable=True)
+
+
+class CircuitoTienda(Base):
+    """Salud de cada tienda para el scraping (scraper/circuito.py)."""
+    __tablename__ = "circuitos_tiendas"
+    __table_args__ = {"schema": "operaciones"}
+
+    tienda_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("catalogo.tiendas.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # cerrado | abierto | semiabierto
+    estado = Column(String, nullable=False, default="cerrado", server_default="cerrado")
+    fallos_consecutivos = Column(Integer, nullable=False, default=0, server_default="0")
+    # Aperturas seguidas sin una sonda exitosa (la espera se duplica con cada una)
+    aperturas = Column(Integer, nullable=False, default=0, server_default="0")
+    abierto_hasta = Column(DateTime(timezone=True), nullable=True)
+    actualizado_en = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CheckpointScraping(Base):
+    """
+    Corrida completa en curso (scraper/checkpoint.py). Lo hecho se deduce de
+    estado_scraping_productos.ultimo_scraping_en >= iniciado_en.
+    """
+    __tablename__ = "checkpoints_scraping"
+    __table_args__ = {"schema": "operaciones"}
+
+    clave = Column(String, primary_key=True)
+    iniciado_en = Column(DateTime(timezone=True), nullable=False)
+    actualizado_en = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TrabajoScraping(Base):
+    """
+    Scraping de una URL pedido desde la API (POST /scraping/guardar). La API
+    solo inserta la fila; la ejecuta el worker (scraper/trabajos.py).
+    """
+    __tablename__ = "trabajos_scraping"
+    __table_args__ = (
+        Index("ix_trabajos_scraping_pendientes", "creado_en", postgresql_where=text("estado = 'pendiente'")),
+        # Una URL tiene a lo más un trabajo sin terminar
+        Index(
+            "ux_trabajos_scraping_url_activa", "url",
+            unique=True, postgresql_where=text("estado IN ('pendiente', 'en_curso')"),
+        ),
+        {"schema": "operaciones"},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    url = Column(Text, nullable=False)
+    tienda_id = Column(UUID(as_uuid=True), ForeignKey("catalogo.tiendas.id", ondelete="CASCADE"), nullable=False)
+    # pendiente | en_curso | ok | error
+    estado = Column(String, nullable=False, default="pendiente", server_default="pendiente")
+    creado_en = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, server_default=func.now())
+    # La URL estaba arrendada por otro worker: se vuelve a intentar desde aquí
+    reintentar_en = Column(DateTime(timezone=True), nullable=True)
+    worker = Column(Text, nullable=True)
+    inicio_en = Column(DateTime(timezone=True), nullable=True)
+    fin_en = Column(DateTime(timezone=True), nullable=True)
+    resultado = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
 
 
 # ============================
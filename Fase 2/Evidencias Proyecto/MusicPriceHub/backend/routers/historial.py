@@ -17,17 +17,25 @@ def get_db():
 @router.get("/historial/{producto_id}")
 def historial_precios(producto_id: str, db: Session = Depends(get_db)):
 
+    # Cada fila del historial es un tramo con el mismo precio:
+    # se devuelve su inicio y, si aplica, su última confirmación.
     sql = """
         SELECT
             h.precio_centavos,
             h.moneda,
-            h.fecha_scraping AS fecha,
+            p.fecha,
             t.nombre AS tienda
         FROM precios.historial_precios h
         JOIN catalogo.tienda_productos tp
             ON tp.id = h.tienda_producto_id
         JOIN catalogo.tiendas t
             ON t.id = tp.tienda_id
+        CROSS JOIN LATERAL (
+            SELECT h.fecha_scraping AS fecha
+            UNION ALL
+            SELECT h.confirmado_hasta
+            WHERE h.confirmado_hasta > h.fecha_scraping
+        ) p
         WHERE tp.producto_id = :pid
         ORDER BY fecha ASC;
     """
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, func, literal_column, or_, select
+from sqlalchemy.orm import Session
 from database import SessionLocal
 import models, schemas
 from datetime import datetime
+from typing import Optional
+import base64
+import json
 import uuid
+from utils.mejores_precios import recalcular as recalcular_mejores_precios
 from utils.seguridad import get_current_user
 router = APIRouter(prefix="/api/productos", tags=["Productos"])
 
@@ -48,33 +53,122 @@ def get_db():
         db.close()
 
 # ==========================================================
-# GET GENERAL → Lista productos + precio_final
+# GET GENERAL → Lista paginada de productos + precio_final
 # ==========================================================
+# precio_final = el menor entre precio_base_centavos y la oferta más barata,
+# leído de precios.mejores_precios (utils/mejores_precios.py); solo con
+# filtro de tienda se calcula al vuelo contra esa tienda. La paginación es por clave (orden, id): la respuesta
+# trae a lo más `limite` productos y, si hay más, el header
+# X-Siguiente-Cursor con el valor a mandar como ?cursor= para la página
+# siguiente.
+LIMITE_PAGINA = 48
+LIMITE_PAGINA_MAXIMO = 100
+ORDENES = ("nombre", "precio", "precio_desc", "recientes")
+
+# Los productos sin precio quedan al final en ambos sentidos. Mismas
+# expresiones que los índices ix_mejores_precios_orden_precio(_desc)
+SIN_PRECIO_ASC = literal_column("2147483647")
+SIN_PRECIO_DESC = literal_column("-1")
+SIN_FECHA = datetime(1970, 1, 1)
+
+
+def _codificar_cursor(valor, producto_id) -> str:
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    crudo = json.dumps([valor, str(producto_id)]).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def _decodificar_cursor(cursor: str, orden: str):
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valor, producto_id = json.loads(crudo)
+        if orden == "recientes":
+            valor = datetime.fromisoformat(valor)
+        return valor, uuid.UUID(producto_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
 @router.get("/", response_model=list[schemas.ProductoMostrar])
-def listar_productos_con_ofertas(db: Session = Depends(get_db)):
-    productos = (
-        db.query(models.Producto)
-        .options(joinedload(models.Producto.ofertas))
-        .all()
-    )
-    
-    respuesta = []
-    for p in productos:
+def listar_productos_con_ofertas(
+    response: Response,
+    orden: str = Query("nombre", pattern="^(" + "|".join(ORDENES) + ")$"),
+    marca: Optional[str] = None,
+    tienda_id: Optional[uuid.UUID] = None,
+    precio_min: Optional[int] = Query(None, ge=0),
+    precio_max: Optional[int] = Query(None, ge=0),
+    limite: int = Query(LIMITE_PAGINA, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    Producto, OfertaActual, MejorPrecio = models.Producto, models.OfertaActual, models.MejorPrecio
 
-        # PRECIO SEGÚN OFERTAS
+    if tienda_id is None:
+        precio_final = MejorPrecio.precio_final_centavos
+    else:
+        # Oferta más barata en esa tienda: subconsulta correlacionada sobre
+        # ix_ofertas_actuales_producto_precio
         precio_oferta = (
-            min(o.precio_centavos for o in p.ofertas)
-            if p.ofertas else None
+            select(func.min(OfertaActual.precio_centavos))
+            .where(OfertaActual.producto_id == Producto.id, OfertaActual.tienda_id == tienda_id)
+            .scalar_subquery()
         )
-
-        # PRECIO FINAL
-        if p.precio_base_centavos is not None and precio_oferta is not None:
-            precio_final = min(p.precio_base_centavos, precio_oferta)
-        elif p.precio_base_centavos is not None:
-            precio_final = p.precio_base_centavos
+        # LEAST ignora los NULL: sirve igual si falta el precio base
+        precio_final = func.least(Producto.precio_base_centavos, precio_oferta)
+
+    if orden == "nombre":
+        clave, desempate, descendente = Producto.nombre, Producto.id, False
+    elif orden == "precio":
+        clave, desempate, descendente = func.coalesce(precio_final, SIN_PRECIO_ASC), MejorPrecio.producto_id, False
+    elif orden == "precio_desc":
+        clave, desempate, descendente = func.coalesce(precio_final, SIN_PRECIO_DESC), MejorPrecio.producto_id, True
+    else:
+        clave = func.coalesce(Producto.actualizado_en, Producto.creado_en, SIN_FECHA)
+        desempate, descendente = Producto.id, True
+
+    consulta = (
+        db.query(Producto, precio_final.label("precio_final"), clave.label("clave"))
+        .join(MejorPrecio, MejorPrecio.producto_id == Producto.id)
+    )
+    if marca:
+        consulta = consulta.filter(Producto.marca == marca)
+    if tienda_id is not None:
+        consulta = consulta.filter(precio_oferta.isnot(None))
+    if precio_min is not None:
+        consulta = consulta.filter(precio_final >= precio_min)
+    if precio_max is not None:
+        consulta = consulta.filter(precio_final <= precio_max)
+
+    if cursor:
+        valor, ultimo_id = _decodificar_cursor(cursor, orden)
+        if descendente:
+            consulta = consulta.filter(or_(clave < valor, and_(clave == valor, desempate < ultimo_id)))
         else:
-            precio_final = precio_oferta
+            consulta = consulta.filter(or_(clave > valor, and_(clave == valor, desempate > ultimo_id)))
+
+    if descendente:
+        consulta = consulta.order_by(clave.desc(), desempate.desc())
+    else:
+        consulta = consulta.order_by(clave.asc(), desempate.asc())
+
+    # Una fila de más para saber si hay página siguiente
+    filas = consulta.limit(limite + 1).all()
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultimo = filas[-1]
+        response.headers["X-Siguiente-Cursor"] = _codificar_cursor(ultimo.clave, ultimo.Producto.id)
+
+    # Ofertas solo de los productos de esta página
+    ofertas = {}
+    if filas:
+        for oferta in db.query(OfertaActual).filter(
+            OfertaActual.producto_id.in_([f.Producto.id for f in filas])
+        ):
+            ofertas.setdefault(oferta.producto_id, []).append(oferta)
 
+    respuesta = []
+    for p, precio, _ in filas:
         respuesta.append({
             "id": p.id,
             "nombre": p.nombre,
@@ -82,11 +176,12 @@ def listar_productos_con_ofertas(db: Session = Depends(get_db)):
             "modelo": p.modelo,
             "descripcion": p.descripcion,
             "imagen_url": p.imagen_url,
+            "miniaturas": p.miniaturas,
             "url_fuente": p.url_fuente,
             "especificaciones": p.especificaciones,
             "precio_base_centavos": p.precio_base_centavos,
-            "precio_final": precio_final,      # 👈 ESTA LÍNEA FALTABA
-            "ofertas": p.ofertas
+            "precio_final": precio,
+            "ofertas": ofertas.get(p.id, []),
         })
 
     return respuesta
@@ -109,8 +204,10 @@ def detalle_frontend(producto_id: str, db: Session = Depends(get_db)):
             models.OfertaActual.tienda_producto_id == models.TiendaProducto.id
         )
         .filter(models.OfertaActual.producto_id == producto_id)
+        .order_by(models.OfertaActual.precio_centavos)
         .all()
     )
+    mejor = db.get(models.MejorPrecio, producto.id)
 
     precios = []
     for oferta, tienda, tienda_prod in ofertas:
@@ -122,8 +219,6 @@ def detalle_frontend(producto_id: str, db: Session = Depends(get_db)):
             "disponibilidad": oferta.disponibilidad,
         })
 
-    precios_ordenados = sorted(precios, key=lambda x: x["precio"])
-
     return {
         "producto": {
             "id": producto.id,
@@ -134,9 +229,11 @@ def detalle_frontend(producto_id: str, db: Session = Depends(get_db)):
             "especificaciones": producto.especificaciones,
             "precio_base_centavos": producto.precio_base_centavos,
             "imagen_url": producto.imagen_url,
+            "miniaturas": producto.miniaturas,
             "url_fuente": producto.url_fuente,
+            "precio_final": mejor.precio_final_centavos if mejor else None,
         },
-        "precios": precios_ordenados
+        "precios": precios
     }
 
 # ==========================================================
@@ -157,6 +254,8 @@ def crear_producto(prod: schemas.ProductoCrear, db: Session = Depends(get_db)):
     )
 
     db.add(nuevo)
+    db.flush()
+    recalcular_mejores_precios(db, [nuevo.id])
     db.commit()
     db.refresh(nuevo)
     return nuevo
@@ -196,6 +295,9 @@ def actualizar_producto(producto_id: str, prod: dict, db: Session = Depends(get_
         fecha_scraping=datetime.utcnow()
     )
     db.add(historial)
+    db.flush()
+    # precio_final depende del precio base
+    recalcular_mejores_precios(db, [producto.id])
     db.commit()
     db.refresh(historial)
     db.commit()
@@ -246,15 +348,19 @@ def historial_precios_producto(producto_id: str, db: Session = Depends(get_db)):
     historial = []
     for h, nombre_tienda in registros:
         fecha = h.fecha_scraping or h.valido_desde
-
-        historial.append(
-            {
-                "fecha": fecha.isoformat() if fecha else None,
-                "tienda": nombre_tienda,
-                "precio": h.precio_centavos if h.precio_centavos else 0,
-                "moneda": h.moneda,
-            }
-        )
+        punto = {
+            "fecha": fecha.isoformat() if fecha else None,
+            "tienda": nombre_tienda,
+            "precio": h.precio_centavos if h.precio_centavos else 0,
+            "moneda": h.moneda,
+        }
+        historial.append(punto)
+
+        # Cada fila es un tramo: también se grafica hasta dónde se confirmó
+        if h.confirmado_hasta and fecha and h.confirmado_hasta > fecha:
+            historial.append({**punto, "fecha": h.confirmado_hasta.isoformat()})
+
+    historial.sort(key=lambda p: p["fecha"] or "")
     return {
         "producto_id": producto_id,
         "historial": historial,
@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import text
 from database import SessionLocal
-from models import Producto, Tienda, OfertaActual
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
-import uuid
+from scraper.trabajos import TERMINADOS, ColaLlena, TiendaNoRegistrada, encolar_trabajo, obtener_trabajo
 
 router = APIRouter(prefix="/scraping", tags=["Scraping"])
 
+# Espera máxima que puede pedir un cliente antes de recibir el id del trabajo
+ESPERA_MAXIMA = 30
+# Cada cuánto se relee el trabajo mientras el cliente espera
+ESPERA_SONDEO = 0.5
+
 # Dependencia para obtener una sesión de base de datos
 def get_db():
     db = SessionLocal()
@@ -17,92 +22,154 @@ def get_db():
     finally:
         db.close()
 
-@router.post("/guardar")
-def scrape_y_guardar(url: str, db: Session = Depends(get_db)):
+
+def _con_sesion(funcion, *args):
+    db = SessionLocal()
+    try:
+        return funcion(db, *args)
+    finally:
+        db.close()
+
+
+async def _responder(trabajo: dict, esperar: float, response: Response) -> dict:
+    # Lo ejecuta el worker: se relee de la BD (en un hilo, sin bloquear el
+    # event loop) hasta que termine o venza la espera
+    limite = time.monotonic() + esperar
+    while trabajo["estado"] not in TERMINADOS and time.monotonic() < limite:
+        await asyncio.sleep(min(ESPERA_SONDEO, max(limite - time.monotonic(), 0)))
+        trabajo = await asyncio.to_thread(_con_sesion, obtener_trabajo, trabajo["id"]) or trabajo
+    response.status_code = 200 if trabajo["estado"] in TERMINADOS else 202
+    return trabajo
+
+
+@router.post("/guardar", status_code=202)
+async def scrape_y_guardar(
+    url: str,
+    response: Response,
+    esperar: float = Query(0, ge=0, le=ESPERA_MAXIMA),
+):
     """
-    Scrapea datos de un producto y los guarda en la base de datos.
-    Devuelve los datos insertados.
+    Encola el scraping de un producto de una tienda registrada y devuelve
+    el trabajo de inmediato (202); lo ejecuta el worker de scraping. Con
+    `esperar` (segundos) responde apenas termine, o con el trabajo aún en
+    curso al vencer el plazo. El estado se consulta en
+    GET /scraping/trabajos/{id}.
     """
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
-        )
-    }
-
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.text, "lxml")
-
-    # 🔹 Extracción básica
-    nombre = soup.select_one("h1, .product-title, .titulo")
-    precio = soup.select_one(".price, .precio, .product-price")
-    descripcion = soup.select_one(".descripcion, .product-description")
-    tienda = soup.select_one(".store-name, .seller, .vendedor")
-
-    nombre = nombre.get_text(strip=True) if nombre else "Producto desconocido"
-    precio_texto = precio.get_text(strip=True) if precio else "0"
-    descripcion = descripcion.get_text(strip=True) if descripcion else "Sin descripción"
-    tienda_nombre = tienda.get_text(strip=True) if tienda else "Tienda desconocida"
-
-    # 🔹 Limpieza del precio (para formato chileno)
-    precio_limpio = (
-        precio_texto.replace("$", "")
-        .replace(".", "")
-        .replace(",", ".")
-        .strip()
-    )
-
+    if not url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=422, detail="La URL debe empezar con http:// o https://")
     try:
-        precio_numerico = float(precio_limpio)
-    except ValueError:
-        precio_numerico = 0.0
-
-    # 🔹 Verificar o crear tienda
-    tienda_existente = db.query(Tienda).filter(Tienda.nombre == tienda_nombre).first()
-    if not tienda_existente:
-        tienda_nueva = Tienda(id=uuid.uuid4(), nombre=tienda_nombre or "Desconocida", url=url)
-        db.add(tienda_nueva)
-        db.commit()
-        db.refresh(tienda_nueva)
-        tienda_existente = tienda_nueva
-
-    # 🔹 Verificar o crear producto
-    producto_existente = db.query(Producto).filter(Producto.nombre == nombre).first()
-    if not producto_existente:
-        producto_nuevo = Producto(
-            id=uuid.uuid4(),
-            nombre=nombre,
-            marca=None,
-            modelo=None
+        trabajo = await asyncio.to_thread(_con_sesion, encolar_trabajo, url)
+    except TiendaNoRegistrada as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ColaLlena as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return await _responder(trabajo, esperar, response)
+
+
+@router.get("/trabajos/{trabajo_id}")
+async def estado_trabajo(
+    trabajo_id: str,
+    response: Response,
+    esperar: float = Query(0, ge=0, le=ESPERA_MAXIMA),
+):
+    """Estado y resultado de un trabajo de scraping (200 si terminó, 202 si no)."""
+    trabajo = await asyncio.to_thread(_con_sesion, obtener_trabajo, trabajo_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return await _responder(trabajo, esperar, response)
+
+
+SQL_METRICAS_TIENDA = """
+    SELECT
+        t.id AS tienda_id,
+        t.nombre AS tienda,
+        COUNT(*) AS paginas,
+        COUNT(*) FILTER (WHERE r.estado = 'ok') AS ok,
+        COUNT(*) FILTER (WHERE r.estado <> 'ok') AS errores,
+        COALESCE(SUM(r.bytes_descargados), 0) AS bytes,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY r.descarga_ms) AS descarga_p50,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY r.descarga_ms) AS descarga_p95,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY r.espera_render_ms) AS espera_render_p50,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY r.espera_render_ms) AS espera_render_p95,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY r.parseo_ms) AS parseo_p50,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY r.parseo_ms) AS parseo_p95,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY r.bd_ms) AS bd_p50,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY r.bd_ms) AS bd_p95
+    FROM operaciones.resultados_scraping r
+    JOIN operaciones.tareas_scraping ta ON ta.id = r.tarea_id
+    JOIN catalogo.tiendas t ON t.id = ta.tienda_id
+    WHERE r.obtenido_en >= now() - make_interval(hours => :horas)
+    GROUP BY t.id, t.nombre
+    ORDER BY t.nombre
+"""
+
+SQL_NIVELES_TIENDA = """
+    SELECT ta.tienda_id, COALESCE(r.nivel_descarga, 'desconocido') AS nivel, COUNT(*) AS paginas
+    FROM operaciones.resultados_scraping r
+    JOIN operaciones.tareas_scraping ta ON ta.id = r.tarea_id
+    WHERE r.obtenido_en >= now() - make_interval(hours => :horas)
+    GROUP BY ta.tienda_id, COALESCE(r.nivel_descarga, 'desconocido')
+"""
+
+
+def _ms(valor):
+    return None if valor is None else round(float(valor), 1)
+
+
+@router.get("/metricas")
+def metricas_scraping(horas: int = Query(24, ge=1, le=24 * 90), db: Session = Depends(get_db)):
+    """
+    Tiempos por fase del scraping, agregados por tienda en las últimas `horas`:
+    descarga, espera de render, parseo y escritura en BD (p50 / p95 en ms),
+    bytes descargados y cuántas páginas usó cada nivel de descarga.
+    """
+    params = {"horas": horas}
+
+    niveles = {}
+    for fila in db.execute(text(SQL_NIVELES_TIENDA), params):
+        niveles.setdefault(fila.tienda_id, {})[fila.nivel] = fila.paginas
+
+    return [
+        {
+            "tienda_id": str(f.tienda_id),
+            "tienda": f.tienda,
+            "paginas": f.paginas,
+            "ok": f.ok,
+            "errores": f.errores,
+            "bytes": int(f.bytes),
+            "niveles": niveles.get(f.tienda_id, {}),
+            "fases_ms": {
+                "descarga": {"p50": _ms(f.descarga_p50), "p95": _ms(f.descarga_p95)},
+                "espera_render": {"p50": _ms(f.espera_render_p50), "p95": _ms(f.espera_render_p95)},
+                "parseo": {"p50": _ms(f.parseo_p50), "p95": _ms(f.parseo_p95)},
+                "bd": {"p50": _ms(f.bd_p50), "p95": _ms(f.bd_p95)},
+            },
+        }
+        for f in db.execute(text(SQL_METRICAS_TIENDA), params)
+    ]
+
+
+@router.get("/circuitos")
+def circuitos_tiendas(db: Session = Depends(get_db)):
+    """Estado del circuito de cada tienda (scraper/circuito.py)."""
+    filas = db.execute(
+        text(
+            """
+            SELECT t.id, t.nombre, c.estado, c.fallos_consecutivos, c.aperturas, c.abierto_hasta
+            FROM operaciones.circuitos_tiendas c
+            JOIN catalogo.tiendas t ON t.id = c.tienda_id
+            ORDER BY t.nombre
+            """
         )
-        db.add(producto_nuevo)
-        db.commit()
-        db.refresh(producto_nuevo)
-        producto_existente = producto_nuevo
-
-    # 🔹 Crear nueva oferta actual (modelo actualizado)
-    nueva_oferta = OfertaActual(
-        id=uuid.uuid4(),
-        tienda_producto_id=uuid.uuid4(),  # genera automáticamente un identificador válido
-        producto_id=producto_existente.id,
-        tienda_id=tienda_existente.id,
-        precio_centavos=int(precio_numerico),
-        moneda="CLP",
-        disponibilidad="Disponible",
-        fecha_listado=datetime.now(),
-        fecha_scraping=datetime.now(),
     )
-
-    db.add(nueva_oferta)
-    db.commit()
-    db.refresh(nueva_oferta)
-
-    # 🔹 Respuesta con datos útiles
-    return {
-        "producto": nombre,
-        "descripcion": descripcion,
-        "precio": precio_numerico,
-        "tienda": tienda_nombre,
-        "fecha_scraping": nueva_oferta.fecha_scraping.strftime("%Y-%m-%d %H:%M:%S"),
-        "link": url
-    }
+    return [
+        {
+            "tienda_id": str(f.id),
+            "tienda": f.nombre,
+            "estado": f.estado,
+            "fallos_consecutivos": f.fallos_consecutivos,
+            "aperturas": f.aperturas,
+            "abierto_hasta": f.abierto_hasta,
+        }
+        for f in filas
+    ]
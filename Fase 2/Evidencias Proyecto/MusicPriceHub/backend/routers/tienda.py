@@ -4,6 +4,7 @@ from database import SessionLocal
 import models, schemas
 from datetime import datetime
 from uuid import UUID
+from utils.mejores_precios import recalcular as recalcular_mejores_precios
 
 router = APIRouter(prefix="/api/tiendas", tags=["Tiendas"])
 
@@ -143,6 +144,9 @@ def agregar_oferta(
     if not tp:
         raise HTTPException(status_code=404, detail="TiendaProducto no encontrado")
 
+    if tp.producto_id is None:
+        raise HTTPException(status_code=409, detail="TiendaProducto descubierto aún sin producto asociado")
+
     oferta_existente = db.query(models.OfertaActual).filter(
         models.OfertaActual.tienda_producto_id == datos.tienda_producto_id
     ).first()
@@ -156,6 +160,8 @@ def agregar_oferta(
         oferta_existente.moneda = datos.moneda
         oferta_existente.fecha_scraping = ahora
 
+        db.flush()
+        recalcular_mejores_precios(db, [oferta_existente.producto_id])
         db.commit()
         db.refresh(oferta_existente)
 
@@ -176,6 +182,8 @@ def agregar_oferta(
     )
 
     db.add(nueva)
+    db.flush()
+    recalcular_mejores_precios(db, [nueva.producto_id])
     db.commit()
     db.refresh(nueva)
 
@@ -248,7 +256,18 @@ def eliminar_tienda_producto(
     if not tp:
         raise HTTPException(status_code=404, detail="Relación tienda-producto no encontrada")
 
+    # ofertas_actuales no tiene FK a tienda_productos: su oferta se borra a mano
+    productos = {tp.producto_id}
+    ofertas = db.query(models.OfertaActual).filter(
+        models.OfertaActual.tienda_producto_id == tp.id
+    ).all()
+    for oferta in ofertas:
+        productos.add(oferta.producto_id)
+        db.delete(oferta)
+
     db.delete(tp)
+    db.flush()
+    recalcular_mejores_precios(db, productos)
     db.commit()
 
     return {"message": "Relación tienda-producto eliminada correctamente"}
@@ -264,7 +283,11 @@ def eliminar_tienda(tienda_id: str, db: Session = Depends(get_db)):
     if not tienda:
         raise HTTPException(status_code=404, detail="Tienda no encontrada")
 
+    # Sus ofertas quedan sin tienda: el mejor precio de esos productos cambia
+    productos = [o.producto_id for o in tienda.ofertas]
     db.delete(tienda)
+    db.flush()
+    recalcular_mejores_precios(db, productos)
     db.commit()
 
     return {"message": "Tienda eliminada correctamente"}
@@ -278,6 +301,7 @@ def listar_ofertas_producto(producto_id: UUID, db: Session = Depends(get_db)):
         .join(models.TiendaProducto, models.TiendaProducto.id == models.OfertaActual.tienda_producto_id)
         .join(models.Tienda, models.Tienda.id == models.OfertaActual.tienda_id)
         .filter(models.OfertaActual.producto_id == producto_id)
+        .order_by(models.OfertaActual.precio_centavos)
         .all()
     )
 
@@ -310,6 +334,8 @@ def editar_oferta(oferta_id: UUID, datos: schemas.OfertaCrear, db: Session = Dep
     oferta.moneda = datos.moneda
     oferta.fecha_scraping = datetime.utcnow()
 
+    db.flush()
+    recalcular_mejores_precios(db, [oferta.producto_id])
     db.commit()
     db.refresh(oferta)
 
@@ -323,6 +349,8 @@ def eliminar_oferta(oferta_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Oferta no encontrada")
 
     db.delete(oferta)
+    db.flush()
+    recalcular_mejores_precios(db, [oferta.producto_id])
     db.commit()
 
     return {"message": "Oferta eliminada correctamente"}
\ No newline at end of file
@@ -36,6 +36,7 @@ class ProductoMostrar(BaseModel):
     modelo: Optional[str]
     descripcion: Optional[str]
     imagen_url: Optional[str]
+    miniaturas: Optional[dict] = None          # tamaño → /media/productos/...webp
     url_fuente: Optional[str]
     especificaciones: Optional[dict]
     precio_base_centavos: Optional[int]
@@ -470,7 +471,7 @@ class TiendaProductoEditar(BaseModel):
 class TiendaProductoOut(BaseModel):
     id: UUID
     tienda_id: UUID
-    producto_id: UUID
+    producto_id: Optional[UUID] = None
     tienda_nombre: str
     url_producto: str
 
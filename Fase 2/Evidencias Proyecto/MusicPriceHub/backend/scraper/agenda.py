@@ -0,0 +1,97 @@
+# scraper/agenda.py
+"""
+Agenda adaptativa: cada TiendaProducto se vuelve a scrapear según
+  - qué tan seguido cambió su precio (tramos en HistorialPrecio en los
+    últimos VENTANA_DIAS días),
+  - cuántas alertas de precio activas tiene el producto,
+  - un máximo de antigüedad (INTERVALO_MAXIMO) que nunca se supera.
+
+Qué URLs vencidas toma cada worker lo decide la cola (scraper/cola.py).
+"""
+import os
+from datetime import timedelta
+
+from sqlalchemy import text
+
+INTERVALO_BASE = int(os.getenv("SCRAPER_INTERVALO_BASE", str(6 * 3600)))
+INTERVALO_MINIMO = int(os.getenv("SCRAPER_INTERVALO_MINIMO", str(15 * 60)))
+INTERVALO_MAXIMO = int(os.getenv("SCRAPER_INTERVALO_MAXIMO", str(24 * 3600)))
+VENTANA_DIAS = int(os.getenv("SCRAPER_VENTANA_CAMBIOS_DIAS", "14"))
+
+
+def calcular_intervalo(cambios: int, alertas: int, ya_scrapeado: bool = True) -> int:
+    """
+    Segundos hasta el próximo scraping.
+
+    Un producto que cambia una vez al día se visita ~5 veces más seguido que
+    uno estable; cada alerta activa lo acelera otro tanto. Uno que no cambió
+    en toda la ventana se espacia al doble (hasta INTERVALO_MAXIMO).
+    """
+    cambios_por_dia = cambios / VENTANA_DIAS
+    factor = (1 + 4 * cambios_por_dia) * (1 + alertas)
+
+    intervalo = INTERVALO_BASE / factor
+    if ya_scrapeado and cambios == 0 and alertas == 0:
+        intervalo *= 2
+
+    return int(min(max(intervalo, INTERVALO_MINIMO), INTERVALO_MAXIMO))
+
+
+def proximo_scraping(ahora, intervalo_segundos: int):
+    return ahora + timedelta(seconds=intervalo_segundos or INTERVALO_BASE)
+
+
+SQL_DATOS_AGENDA = """
+SELECT
+    tp.id,
+    tp.tienda_id,
+    tp.producto_id,
+    tp.url_producto,
+    COALESCE(c.cambios, 0) AS cambios,
+    COALESCE(a.alertas, 0) AS alertas,
+    e.ultimo_scraping_en
+FROM catalogo.tienda_productos tp
+LEFT JOIN operaciones.estado_scraping_productos e
+    ON e.tienda_producto_id = tp.id
+LEFT JOIN LATERAL (
+    SELECT COUNT(*) AS cambios
+    FROM precios.historial_precios h
+    WHERE h.tienda_producto_id = tp.id
+      AND h.valido_desde >= now() - make_interval(days => :dias)
+) c ON TRUE
+LEFT JOIN (
+    SELECT producto_id, COUNT(*) AS alertas
+    FROM alertas.alertas_precio
+    WHERE activa
+    GROUP BY producto_id
+) a ON a.producto_id = tp.producto_id
+WHERE tp.id = ANY(CAST(:ids AS uuid[]))
+ORDER BY e.proximo_scraping_en NULLS FIRST
+"""
+
+
+class ItemAgenda:
+    """TiendaProducto a scrapear, con el intervalo que le toca después."""
+
+    __slots__ = ("id", "tienda_id", "producto_id", "url_producto", "intervalo_segundos")
+
+    def __init__(self, fila):
+        self.id = fila.id
+        self.tienda_id = fila.tienda_id
+        self.producto_id = fila.producto_id
+        self.url_producto = fila.url_producto
+        self.intervalo_segundos = calcular_intervalo(
+            fila.cambios,
+            fila.alertas,
+            ya_scrapeado=fila.ultimo_scraping_en is not None,
+        )
+
+
+def items_agenda(db, tienda_producto_ids) -> list:
+    if not tienda_producto_ids:
+        return []
+    filas = db.execute(
+        text(SQL_DATOS_AGENDA),
+        {"dias": VENTANA_DIAS, "ids": [str(i) for i in tienda_producto_ids]},
+    )
+    return [ItemAgenda(fila) for fila in filas]
@@ -1,86 +1,481 @@
 # scraper/base_scraper.py
-from playwright.sync_api import sync_playwright
+import asyncio
+import hashlib
+import json
+import time
+from collections import Counter
+from bs4 import BeautifulSoup
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from models import TareaScraping, ResultadoScraping, Tienda
-from scraper.services.catalogo_service import sync_producto_desde_scraping
+from models import Tienda, TiendaProducto, EstadoScrapingProducto
+from scraper.agenda import INTERVALO_BASE, proximo_scraping
+from scraper.browser_pool import PerfilCarga, get_browser_pool
+from scraper.cola import liberar_fallidos, postergar
+from scraper.corpus import corpus_desde_entorno
+from scraper.estadisticas import estadisticas_fetch
+from scraper.http_client import get_http_client
+from scraper.metricas import MedicionPagina, ms_desde
+from scraper.services.catalogo_service import confirmar_precios_vigentes
+from scraper.services.persistencia import PersistenciaScraping
+from scraper.snapshots import GUARDAR_SNAPSHOTS, guardar as guardar_snapshot
+
+
+def hash_datos(datos: dict) -> str:
+    """Hash estable de los campos extraídos (sin la URL)."""
+    campos = {k: v for k, v in datos.items() if k != "url"}
+    return hashlib.sha256(
+        json.dumps(campos, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
 
 
 class BaseScraper:
+    # Selectores que deben existir para dar por buena una descarga HTTP simple.
+    # Si están vacíos no se puede validar y se usa siempre el navegador.
+    selectores_requeridos = ()
+
+    # True para tiendas que solo renderizan con JavaScript
+    requiere_navegador = False
+
+    # Carga en el navegador: por defecto se bloquean imágenes, fuentes, CSS y
+    # terceros, y se espera a selectores_requeridos. Una tienda puede definir
+    # su propio PerfilCarga (p. ej. para permitir el CDN que sirve sus scripts).
+    perfil_carga = None
+
+    # Dónde encontrar las URLs de producto de la tienda (scraper/descubrimiento.py):
+    # {"sitemaps": [...], "categorias": [...], "selector_enlaces": "...",
+    #  "selector_siguiente": "...", "patron_producto": "regex"}
+    descubrimiento = None
+
+    # Páginas de categoría de donde cosechar precios de muchos productos a
+    # la vez (EspecificacionListado, scraper/cosecha.py)
+    listado = None
+
     def __init__(self, tienda: Tienda, db: Session):
         self.tienda = tienda
         self.db = db
+        self._estados = {}
+        self._validadores_nuevos = {}
+        self._sin_cambios = set()
+        self._fallidos = set()
+        self._postergados = set()
+        self._intervalos = {}
+        self._mediciones = {}
+        self._snapshots = {}
+        self.persistencia = None
+        self.indice = None
+        # Circuito de la tienda (scraper/circuito.py); None = sin circuito
+        self.circuito = None
+        # Modo repetición: páginas servidas desde un corpus grabado (scraper/corpus.py)
+        self.corpus = corpus_desde_entorno()
+        # Re-parseo de snapshots (scraper/reparsear.py): url → snapshot_en.
+        # Los datos valen a la fecha del snapshot y las URLs no pasan por la cola
+        self.reparseo = None
 
-    def get_page_html(self, url: str) -> str:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.goto(url, wait_until="domcontentloaded")
-            page.wait_for_timeout(1500)
-            html = page.content()
-            browser.close()
-            return html
+    def perfil_navegador(self) -> PerfilCarga:
+        if self.perfil_carga is None:
+            type(self).perfil_carga = PerfilCarga(selectores_listos=self.selectores_requeridos)
+        return self.perfil_carga
 
-    def parse_producto(self, url: str) -> dict:
-        raise NotImplementedError("parse_producto() debe ser implementado por el scraper hijo.")
+    def get_page_html(self, url: str, metricas: dict = None) -> str:
+        # Chromium compartido: no se lanza un navegador por URL
+        return get_browser_pool().get_html(url, perfil=self.perfil_navegador(), metricas=metricas)
 
-    def guardar_en_bd(self, datos_scraping: dict):
-        ahora = datetime.utcnow()
-        tarea = None
+    async def get_page_html_async(self, url: str, metricas: dict = None) -> str:
+        return await get_browser_pool().get_html_async(
+            url, perfil=self.perfil_navegador(), metricas=metricas
+        )
 
-        try:
-            # 1) Registrar tarea de scraping
-            tarea = TareaScraping(
-                tienda_id=self.tienda.id,
-                inicio_en=ahora,
-                estado="pendiente",
-                detalle=f"Scraping de producto {datos_scraping.get('url')}",
-            )
-            self.db.add(tarea)
-            self.db.flush()
-
-            # 2) Crear / actualizar producto + oferta + historial
-            producto = sync_producto_desde_scraping(
-                db=self.db,
-                tienda=self.tienda,
-                datos=datos_scraping,
+    # -----------------------------
+    # Tiempos por fase (scraper/metricas.py)
+    # -----------------------------
+    def medicion(self, url: str) -> MedicionPagina:
+        if url not in self._mediciones:
+            self._mediciones[url] = MedicionPagina()
+        return self._mediciones[url]
+
+    def tomar_medicion(self, url: str):
+        return self._mediciones.pop(url, None)
+
+    def cerrar_medicion(self, url: str, resultado: str):
+        """Para páginas que no llegan a la persistencia (sin cambios, errores)."""
+        medicion = self.tomar_medicion(url)
+        if self.persistencia is not None:
+            self.persistencia.metricas.agregar(medicion, resultado)
+
+    # -----------------------------
+    # Estado por URL (ETag / Last-Modified / hash de lo extraído)
+    # -----------------------------
+    def preparar_estados(self, productos_tienda):
+        """Carga en una sola consulta el estado de todas las URLs de la corrida."""
+        ids = [tp.id for tp in productos_tienda]
+        existentes = {
+            e.tienda_producto_id: e
+            for e in self.db.query(EstadoScrapingProducto)
+            .filter(EstadoScrapingProducto.tienda_producto_id.in_(ids))
+            .all()
+        }
+        for tp in productos_tienda:
+            self._estados[tp.url_producto] = (
+                existentes.get(tp.id) or EstadoScrapingProducto(tienda_producto_id=tp.id)
             )
+            # Viene de la agenda adaptativa (scraper/agenda.py) cuando aplica
+            intervalo = getattr(tp, "intervalo_segundos", None)
+            if intervalo:
+                self._intervalos[tp.url_producto] = intervalo
 
-            # 3) Registrar resultado del scraping
-            resultado = ResultadoScraping(
-                tarea_id=tarea.id,
-                url_producto=datos_scraping.get("url"),
-                datos_extraidos=datos_scraping,
-                obtenido_en=ahora,
-                estado="ok",
+    def _estado(self, url: str):
+        if url not in self._estados:
+            tp = (
+                self.db.query(TiendaProducto)
+                .filter(
+                    TiendaProducto.tienda_id == self.tienda.id,
+                    TiendaProducto.url_producto == url,
+                )
+                .first()
             )
-            self.db.add(resultado)
+            estado = None
+            if tp:
+                estado = (
+                    self.db.get(EstadoScrapingProducto, tp.id)
+                    or EstadoScrapingProducto(tienda_producto_id=tp.id)
+                )
+            self._estados[url] = estado
+        return self._estados[url]
+
+    def sin_cambios(self, datos: dict) -> bool:
+        estado = self._estado(datos.get("url"))
+        return bool(estado and estado.hash_contenido == hash_datos(datos))
+
+    def marcar_sin_cambios(self, url: str):
+        estado = self._estado(url)
+        if estado is not None:
+            self._sin_cambios.add(estado.tienda_producto_id)
+
+    def confirmar_sin_cambios(self):
+        """
+        Extiende en bloque el tramo de historial vigente (y fecha_scraping de
+        la oferta) de todas las URLs marcadas sin cambios: una transacción
+        para toda la corrida.
+        """
+        if not self._sin_cambios:
+            return
+        ahora = datetime.utcnow()
+        try:
+            confirmar_precios_vigentes(self.db, self._sin_cambios, ahora)
+            for url, estado in self._estados.items():
+                if estado is not None and estado.tienda_producto_id in self._sin_cambios:
+                    self._reagendar(estado, url, ahora)
+                    self.db.add(estado)
+            self.db.commit()
+            self._sin_cambios.clear()
+        except Exception as e:
+            self.db.rollback()
+            print("ERROR al confirmar precios sin cambios:", str(e))
+
+    def _reagendar(self, estado: EstadoScrapingProducto, url: str, ahora: datetime):
+        intervalo = self._intervalos.get(url) or estado.intervalo_segundos or INTERVALO_BASE
+        estado.ultimo_scraping_en = ahora
+        estado.intervalo_segundos = intervalo
+        estado.proximo_scraping_en = proximo_scraping(ahora, intervalo)
+        # Procesada: se suelta el arriendo de la cola (scraper/cola.py)
+        estado.arrendado_por = None
+        estado.arrendado_hasta = None
+        estado.intentos = 0
+        # ETag / Last-Modified de esta descarga, también si lo extraído no
+        # cambió: si no, el servidor nunca vuelve a contestar 304
+        validadores = self._validadores_nuevos.pop(url, None)
+        if validadores:
+            estado.etag, estado.last_modified = validadores
+        snapshot = self._snapshots.pop(url, None)
+        if snapshot:
+            estado.snapshot_hash = snapshot
+            estado.snapshot_en = ahora
 
-            # 4) Finalizar tarea
-            tarea.estado = "ok"
-            tarea.fin_en = datetime.utcnow()
+    def marcar_fallo(self, url: str):
+        # Solo lo que ya está en memoria: se llama desde rutas de error
+        estado = self._estados.get(url)
+        if estado is not None and estado.tienda_producto_id is not None:
+            self._fallidos.add(estado.tienda_producto_id)
 
+    def liberar_fallidos(self):
+        """Devuelve a la cola, con espera de reintento, las URLs que fallaron."""
+        if not self._fallidos:
+            return
+        try:
+            # Justo las páginas que no se pudieron extraer son las que más
+            # interesa poder re-parsear (scraper/reparsear.py)
+            ahora = datetime.utcnow()
+            for url, estado in self._estados.items():
+                if estado is not None and estado.tienda_producto_id in self._fallidos and url in self._snapshots:
+                    estado.snapshot_hash = self._snapshots.pop(url)
+                    estado.snapshot_en = ahora
+                    self.db.add(estado)
+            liberar_fallidos(self.db, self._fallidos)
             self.db.commit()
-            return producto
+            self._fallidos.clear()
+        except Exception as e:
+            self.db.rollback()
+            print("ERROR al liberar URLs fallidas:", str(e))
+
+    # -----------------------------
+    # Circuito de la tienda
+    # -----------------------------
+    def permite_descarga(self) -> bool:
+        return self.circuito is None or self.circuito.permite()
+
+    def registrar_descarga(self, ok: bool):
+        if self.circuito is None:
+            return
+        if ok:
+            self.circuito.exito()
+        else:
+            self.circuito.fallo()
 
+    def marcar_postergado(self, url: str):
+        estado = self._estados.get(url)
+        if estado is not None and estado.tienda_producto_id is not None:
+            self._postergados.add(estado.tienda_producto_id)
+
+    def cerrar_circuito(self):
+        """Guarda el estado del circuito y devuelve a la cola lo que no se intentó."""
+        if self.circuito is None:
+            return
+        try:
+            self.circuito.guardar(self.db)
+            if self._postergados:
+                postergar(self.db, self._postergados, self.circuito.abierto_hasta or datetime.utcnow())
+            self.db.commit()
+            self._postergados.clear()
         except Exception as e:
             self.db.rollback()
-            if tarea:
-                tarea.estado = "error"
-                tarea.detalle = f"Error: {str(e)}"
-                tarea.fin_en = datetime.utcnow()
-                self.db.commit()
-            print("ERROR al guardar en BD:", str(e))
+            print("ERROR al guardar el circuito de la tienda:", str(e))
+
+    def olvidar_estado(self, url: str):
+        # Tras un rollback el estado en memoria ya no refleja la BD
+        self._estados.pop(url, None)
+        self._validadores_nuevos.pop(url, None)
+
+    def obtenido_en(self, url: str, ahora: datetime) -> datetime:
+        """Fecha a la que valen los datos de `url`: la de su snapshot si se re-parsea."""
+        if self.reparseo is not None:
+            return self.reparseo.get(url) or ahora
+        return ahora
+
+    def registrar_estado(self, datos: dict, ahora: datetime):
+        url = datos.get("url")
+        if self._estados.get(url) is None:
+            # URL nueva: el TiendaProducto recién se creó en este guardado
+            self._estados.pop(url, None)
+
+        estado = self._estado(url)
+        if estado is None:
+            return
+
+        estado.hash_contenido = hash_datos(datos)
+        if self.reparseo is None:
+            # Al re-parsear no hubo descarga: la agenda, el arriendo de la
+            # cola (quizá de otro worker) y los validadores quedan como están
+            self._reagendar(estado, url, ahora)
+        self.db.add(estado)
+
+    # -----------------------------
+    # Descarga por niveles: HTTP → navegador
+    # -----------------------------
+    def _usar_http(self) -> bool:
+        if self.requiere_navegador or not self.selectores_requeridos:
+            return False
+        return not estadisticas_fetch.solo_navegador(self.tienda.nombre)
+
+    def html_completo(self, html: str) -> bool:
+        soup = BeautifulSoup(html, "lxml")
+        return all(soup.select_one(sel) for sel in self.selectores_requeridos)
+
+    def _validadores(self, url: str):
+        estado = self._estado(url)
+        if estado is None:
+            return None, None
+        return estado.etag, estado.last_modified
+
+    def _respuesta_http(self, url: str, etag=None, last_modified=None):
+        # Se ejecuta en un hilo aparte: no debe tocar la sesión de BD
+        try:
+            resp = get_http_client().get_condicional(url, etag, last_modified)
+        except Exception as e:
+            print(f"⚠️ HTTP simple falló para {url}: {e}")
+            return None
+        if resp.status == 304 or self.html_completo(resp.html):
+            return resp
+        return None
+
+    def _aceptar_respuesta(self, url: str, resp) -> str:
+        medicion = self.medicion(url)
+        medicion.bytes = resp.bytes
+        if resp.status == 304:
+            medicion.nivel = "http_304"
+            estadisticas_fetch.registrar(self.tienda.nombre, "http_304")
             return None
 
+        # Los validadores nuevos se guardan recién junto con los datos
+        self._validadores_nuevos[url] = (resp.etag, resp.last_modified)
+        medicion.nivel = "http"
+        estadisticas_fetch.registrar(self.tienda.nombre, "http")
+        return resp.html
+
+    def _registrar_navegador(self, url: str, metricas: dict, error: bool = False):
+        medicion = self.medicion(url)
+        medicion.nivel = "error" if error else "navegador"
+        medicion.espera_render_ms = metricas.get("espera_render_ms")
+        medicion.bytes = metricas.get("bytes", 0)
+        estadisticas_fetch.registrar(self.tienda.nombre, medicion.nivel)
+
+    def _guardar_snapshot(self, url: str, html: str):
+        # El puntero se escribe con el estado de la URL (_reagendar)
+        if not GUARDAR_SNAPSHOTS or not html:
+            return
+        try:
+            self._snapshots[url] = guardar_snapshot(html)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el snapshot de {url}: {e}")
+
+    def obtener_html(self, url: str):
+        """
+        Devuelve el HTML de la página, o None si el servidor respondió
+        304 (no cambió desde el último scraping guardado).
+        """
+        if self.corpus is not None:
+            return self.corpus.html(url)
+
+        inicio = time.perf_counter()
+        try:
+            if self._usar_http():
+                resp = self._respuesta_http(url, *self._validadores(url))
+                if resp:
+                    html = self._aceptar_respuesta(url, resp)
+                    self._guardar_snapshot(url, html)
+                    return html
+
+            metricas = {}
+            try:
+                html = self.get_page_html(url, metricas=metricas)
+            except Exception:
+                self._registrar_navegador(url, metricas, error=True)
+                raise
+            self._registrar_navegador(url, metricas)
+            self._guardar_snapshot(url, html)
+            return html
+        finally:
+            self.medicion(url).descarga_ms = ms_desde(inicio, time.perf_counter())
+
+    async def obtener_html_async(self, url: str):
+        if self.corpus is not None:
+            return self.corpus.html(url)
+
+        inicio = time.perf_counter()
+        try:
+            if self._usar_http():
+                resp = await asyncio.to_thread(self._respuesta_http, url, *self._validadores(url))
+                if resp:
+                    html = self._aceptar_respuesta(url, resp)
+                    await asyncio.to_thread(self._guardar_snapshot, url, html)
+                    return html
+
+            metricas = {}
+            try:
+                html = await self.get_page_html_async(url, metricas=metricas)
+            except Exception:
+                self._registrar_navegador(url, metricas, error=True)
+                raise
+            self._registrar_navegador(url, metricas)
+            await asyncio.to_thread(self._guardar_snapshot, url, html)
+            return html
+        finally:
+            self.medicion(url).descarga_ms = ms_desde(inicio, time.perf_counter())
+
+    def extraer_datos(self, html: str, url: str) -> dict:
+        raise NotImplementedError("extraer_datos() debe ser implementado por el scraper hijo.")
+
+    @classmethod
+    def referencia_parseo(cls):
+        """
+        "modulo:Clase" para recrear el scraper en un proceso de parseo
+        (scraper/parseo.py), o None si extraer_datos debe correr aquí.
+        """
+        if "<locals>" in cls.__qualname__:
+            return None
+        return f"{cls.__module__}:{cls.__qualname__}"
+
+    def extraer_medido(self, html: str, url: str) -> dict:
+        inicio = time.perf_counter()
+        try:
+            return self.extraer_datos(html, url)
+        finally:
+            self.medicion(url).parseo_ms = ms_desde(inicio, time.perf_counter())
+
+    def parse_producto(self, url: str) -> dict:
+        html = self.obtener_html(url)
+        if html is None:
+            return None
+        return self.extraer_medido(html, url)
+
+    # -----------------------------
+    # Persistencia (por lotes dentro de una corrida)
+    # -----------------------------
+    def iniciar_corrida(self, detalle: str = None, indice=None):
+        """
+        Abre una TareaScraping para toda la corrida y activa el buffer.
+        `indice` (IndiceCatalogo) evita consultar la BD por productos conocidos.
+        """
+        self.indice = indice
+        self.persistencia = PersistenciaScraping(self, detalle=detalle)
+
+    def finalizar_corrida(self):
+        if self.persistencia is None:
+            return Counter()
+        persistencia, self.persistencia = self.persistencia, None
+        persistencia.finalizar()
+        self.indice = None
+        return persistencia.resumen
+
+    def guardar_en_bd(self, datos_scraping: dict):
+        # Dentro de una corrida: se encola y se escribe con el lote
+        if self.persistencia is not None:
+            self.persistencia.agregar(datos_scraping)
+            return None
+
+        # Fuera de una corrida: un lote de un solo ítem
+        persistencia = PersistenciaScraping(
+            self,
+            detalle=f"Scraping de producto {datos_scraping.get('url')}",
+            tamano=1,
+        )
+        salida = persistencia.agregar(datos_scraping)
+        persistencia.finalizar()
+        return salida[0][1] if salida else None
+
     def run(self, url: str):
         print(f"Scrapeando: {url}")
 
-        datos = self.parse_producto(url)
+        html = self.obtener_html(url)
+        if html is None:
+            print("⏭️ Página sin cambios (304), no se vuelve a procesar.")
+            self.cerrar_medicion(url, "sin_cambios")
+            self.marcar_sin_cambios(url)
+            self.confirmar_sin_cambios()
+            return None
+
+        datos = self.extraer_medido(html, url)
 
         if not datos:
             print("❌ Error: el scraper no devolvió datos.")
+            self.cerrar_medicion(url, "sin_datos")
+            return None
+
+        if self.sin_cambios(datos):
+            print("⏭️ Datos idénticos al último scraping, no se guarda.")
+            self.cerrar_medicion(url, "sin_cambios")
+            self.marcar_sin_cambios(url)
+            self.confirmar_sin_cambios()
             return None
 
         return self.guardar_en_bd(datos)
@@ -0,0 +1,166 @@
+# scraper/benchmark.py
+"""
+Benchmark offline de los scrapers sobre el corpus grabado (scraper/corpus.py).
+
+Por dominio reporta páginas/segundo, latencia de extracción (p50/p90/p99)
+y precisión contra los datos esperados de cada página. No usa red ni BD.
+
+Uso (desde /backend):
+    python -m scraper.benchmark                               # todo el corpus
+    python -m scraper.benchmark --dominio fender.cl -n 50     # 50 repeticiones
+    python -m scraper.benchmark --clase mi_modulo:OtroScraper # comparar otro parser
+    python -m scraper.benchmark --minimo-precision 1.0        # sale con 1 si baja (CI)
+    python -m scraper.benchmark --grabar URL [URL ...]        # graba páginas en vivo
+
+Al grabar, `esperado` queda con lo que extrae hoy el scraper: conviene
+revisarlo a mano antes de commitear la página al corpus. Los dominios sin
+scraper registrado se miden con la especificación genérica, igual que
+POST /scraping/guardar. tests/test_benchmark.py corre el corpus commiteado
+con precisión mínima 100%.
+"""
+import argparse
+import importlib
+import json
+import sys
+import time
+
+from scraper.corpus import Corpus, DIRECTORIO_CORPUS
+from scraper.declarativo import scraper_generico
+from scraper.http_client import get_http_client
+from scraper.motor import dominio_de
+from scraper.registro import scraper_para_dominio
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def _cargar_clase(ruta: str):
+    modulo, _, nombre = ruta.partition(":")
+    return getattr(importlib.import_module(modulo), nombre)
+
+
+def _scraper(clase):
+    # Solo se usa extraer_datos: no hace falta tienda ni sesión de BD
+    return clase(tienda=None, db=None)
+
+
+def medir_dominio(paginas: list, clase, repeticiones: int) -> dict:
+    scraper = _scraper(clase)
+    htmls = [(p, p.html()) for p in paginas]
+
+    latencias = []
+    campos_ok = campos_total = paginas_ok = 0
+    inicio = time.perf_counter()
+
+    for vuelta in range(repeticiones):
+        for pagina, html in htmls:
+            t0 = time.perf_counter()
+            datos = scraper.extraer_datos(html, pagina.url) or {}
+            latencias.append((time.perf_counter() - t0) * 1000)
+
+            if vuelta or not pagina.esperado:
+                continue
+            esperados = {k: v for k, v in pagina.esperado.items() if k != "url"}
+            aciertos = sum(1 for k, v in esperados.items() if datos.get(k) == v)
+            campos_ok += aciertos
+            campos_total += len(esperados)
+            paginas_ok += aciertos == len(esperados)
+
+    total = time.perf_counter() - inicio
+    return {
+        "scraper": clase.__name__,
+        "paginas": len(paginas),
+        "paginas_por_segundo": round(len(latencias) / total, 1) if total else 0.0,
+        "latencia_ms": {
+            "p50": round(percentil(latencias, 50), 3),
+            "p90": round(percentil(latencias, 90), 3),
+            "p99": round(percentil(latencias, 99), 3),
+        },
+        "precision_campos": round(campos_ok / campos_total, 4) if campos_total else None,
+        "paginas_exactas": paginas_ok,
+    }
+
+
+def grabar(corpus: Corpus, urls: list):
+    for url in urls:
+        dominio = dominio_de(url)
+        clase = scraper_para_dominio(dominio) or scraper_generico()
+        scraper = _scraper(clase)
+        # Igual que en producción: HTTP simple si alcanza, si no Chromium
+        html = None
+        if scraper.selectores_requeridos and not scraper.requiere_navegador:
+            try:
+                html = get_http_client().get_html(url)
+                if not scraper.html_completo(html):
+                    html = None
+            except Exception as e:
+                print(f"⚠️ HTTP simple falló para {url}: {e}")
+        if html is None:
+            html = scraper.get_page_html(url)
+
+        ruta = corpus.grabar(dominio, url, html, scraper.extraer_datos(html, url))
+        print(f"📼 Grabada {url} → {ruta}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline de scrapers")
+    parser.add_argument("--corpus", default=str(DIRECTORIO_CORPUS))
+    parser.add_argument("--dominio")
+    parser.add_argument("-n", "--repeticiones", type=int, default=10)
+    parser.add_argument("--clase", help="modulo:Clase a medir en vez del scraper registrado")
+    parser.add_argument("--minimo-precision", type=float)
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    parser.add_argument("--grabar", nargs="+", metavar="URL")
+    args = parser.parse_args(argv)
+
+    corpus = Corpus(args.corpus)
+    if args.grabar:
+        grabar(corpus, args.grabar)
+        return 0
+
+    clase_fija = _cargar_clase(args.clase) if args.clase else None
+    dominios = [args.dominio] if args.dominio else corpus.dominios()
+    if not dominios:
+        print(f"⚠️ Corpus vacío en {corpus.directorio}. Graba páginas con --grabar URL.")
+        return 1
+
+    reporte = {}
+    for dominio in dominios:
+        paginas = corpus.paginas(dominio)
+        clase = clase_fija or scraper_para_dominio(dominio) or scraper_generico()
+        if not paginas:
+            print(f"⚠️ {dominio}: sin páginas, se omite")
+            continue
+        reporte[dominio] = medir_dominio(paginas, clase, max(1, args.repeticiones))
+
+    if args.json:
+        print(json.dumps(reporte, ensure_ascii=False, indent=2))
+    else:
+        for dominio, r in reporte.items():
+            lat = r["latencia_ms"]
+            precision = "—" if r["precision_campos"] is None else f"{r['precision_campos']:.1%}"
+            print(
+                f"🏁 {dominio} ({r['scraper']}): {r['paginas']} páginas, "
+                f"{r['paginas_por_segundo']} pág/s, "
+                f"p50 {lat['p50']} ms · p90 {lat['p90']} ms · p99 {lat['p99']} ms, "
+                f"precisión {precision} ({r['paginas_exactas']} exactas)"
+            )
+
+    if args.minimo_precision is not None:
+        bajos = [
+            d for d, r in reporte.items()
+            if r["precision_campos"] is not None and r["precision_campos"] < args.minimo_precision
+        ]
+        if bajos:
+            print(f"❌ Precisión bajo {args.minimo_precision:.1%} en: {', '.join(bajos)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+# scraper/browser_pool.py
+"""
+Pool persistente de Chromium compartido por todos los scrapers del worker.
+
+Se lanza UN navegador y se reutilizan N páginas (cada una con su propio
+contexto). Cada página se recicla después de MAX_NAVEGACIONES o cuando falla
+una navegación; si el navegador completo se cae, se vuelve a lanzar.
+
+Playwright corre en un hilo propio con su event loop, de modo que el pool
+puede usarse tanto desde código síncrono (get_html) como desde otro event
+loop (get_html_async) sin pelear por el mismo loop.
+
+Cada carga usa un PerfilCarga: qué tipos de recurso se abortan (imágenes,
+fuentes, CSS, video), qué dominios de terceros se permiten (el resto
+—analytics, píxeles, chats— se bloquea) y qué selectores indican que la
+página ya está lista, en vez de esperar un tiempo fijo.
+"""
+import asyncio
+import atexit
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from playwright.async_api import async_playwright
+
+POOL_PAGINAS = int(os.getenv("SCRAPER_POOL_PAGINAS", "4"))
+MAX_NAVEGACIONES = int(os.getenv("SCRAPER_MAX_NAVEGACIONES", "50"))
+TIMEOUT_NAVEGACION_MS = int(os.getenv("SCRAPER_TIMEOUT_MS", "30000"))
+ESPERA_RENDER_MS = 1500
+ESPERA_SELECTORES_MS = int(os.getenv("SCRAPER_ESPERA_SELECTORES_MS", "10000"))
+
+TIPOS_NO_ESENCIALES = ("image", "media", "font", "stylesheet", "texttrack", "manifest")
+
+
+def _host(url: str) -> str:
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _mismo_sitio(host: str, dominio: str) -> bool:
+    return host == dominio or host.endswith("." + dominio)
+
+
+class PerfilCarga:
+    """Cómo cargar las páginas de una tienda en el navegador."""
+
+    def __init__(
+        self,
+        bloquear_tipos=TIPOS_NO_ESENCIALES,
+        bloquear_terceros: bool = True,
+        dominios_permitidos=(),
+        selectores_listos=(),
+        espera_max_ms: int = ESPERA_SELECTORES_MS,
+    ):
+        self.bloquear_tipos = frozenset(bloquear_tipos)
+        self.bloquear_terceros = bloquear_terceros
+        # CDNs propios de la tienda en otro dominio (scripts necesarios para renderizar)
+        self.dominios_permitidos = tuple(dominios_permitidos)
+        self.selectores_listos = tuple(selectores_listos)
+        self.espera_max_ms = espera_max_ms
+
+    def bloquea(self, tipo: str, url: str, dominio_pagina: str) -> bool:
+        if tipo == "document":
+            return False
+        if tipo in self.bloquear_tipos:
+            return True
+        if not self.bloquear_terceros:
+            return False
+        host = _host(url)
+        if not host or _mismo_sitio(host, dominio_pagina):
+            return False
+        return not any(_mismo_sitio(host, d) for d in self.dominios_permitidos)
+
+
+# Sin bloqueo ni selectores: el comportamiento original (carga completa + espera fija)
+PERFIL_COMPLETO = PerfilCarga(bloquear_tipos=(), bloquear_terceros=False)
+
+
+class _Slot:
+    """Un contexto + página reutilizable dentro del pool."""
+
+    def __init__(self, context, page, generacion: int):
+        self.context = context
+        self.page = page
+        self.generacion = generacion
+        self.navegaciones = 0
+
+        # Perfil y dominio de la navegación en curso (los lee el interceptor)
+        self.perfil = PERFIL_COMPLETO
+        self.dominio = ""
+        self.bloqueados = 0
+
+    async def interceptar(self, route):
+        request = route.request
+        if self.perfil.bloquea(request.resource_type, request.url, self.dominio):
+            self.bloqueados += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def esperar_lista(self, espera_ms: int):
+        """Espera a que aparezcan los selectores del perfil (o el tiempo fijo si no hay)."""
+        selectores = self.perfil.selectores_listos
+        if not selectores:
+            await self.page.wait_for_timeout(espera_ms)
+            return
+        try:
+            await asyncio.gather(
+                *(
+                    self.page.wait_for_selector(sel, state="attached", timeout=self.perfil.espera_max_ms)
+                    for sel in selectores
+                )
+            )
+        except Exception:
+            # Se devuelve lo que haya; la validación de lo extraído decide
+            pass
+
+    async def cerrar(self):
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+
+
+class BrowserPool:
+    def __init__(self, paginas: int = POOL_PAGINAS, max_navegaciones: int = MAX_NAVEGACIONES):
+        self.paginas = paginas
+        self.max_navegaciones = max_navegaciones
+
+        self._loop = None
+        self._hilo = None
+        self._lock_hilo = threading.Lock()
+
+        # Estos atributos solo se tocan desde el hilo del pool
+        self._playwright = None
+        self._browser = None
+        self._generacion = 0
+        self._slots = None
+        self._lock_inicio = None
+
+    # -----------------------------
+    # Hilo / event loop propio
+    # -----------------------------
+    def _asegurar_hilo(self):
+        with self._lock_hilo:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            hilo = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+            hilo.start()
+            self._loop = loop
+            self._hilo = hilo
+
+    def _enviar(self, coro):
+        self._asegurar_hilo()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    # -----------------------------
+    # Navegador y slots
+    # -----------------------------
+    async def _iniciar(self):
+        if self._lock_inicio is None:
+            self._lock_inicio = asyncio.Lock()
+            self._slots = asyncio.Queue()
+            for _ in range(self.paginas):
+                # None = slot todavía sin página, se crea al primer uso
+                self._slots.put_nowait(None)
+
+        async with self._lock_inicio:
+            if self._browser is not None and self._browser.is_connected():
+                return
+
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            # Nueva generación: los slots del navegador anterior se descartan al sacarlos
+            self._generacion += 1
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            print(f"🧭 Chromium lanzado (generación {self._generacion}, {self.paginas} páginas)")
+
+    async def _nuevo_slot(self) -> _Slot:
+        context = await self._browser.new_context()
+        page = await context.new_page()
+        page.set_default_navigation_timeout(TIMEOUT_NAVEGACION_MS)
+        slot = _Slot(context, page, self._generacion)
+        await context.route("**/*", slot.interceptar)
+        return slot
+
+    async def _obtener_html(self, url: str, espera_ms: int, perfil: PerfilCarga, metricas: dict = None) -> str:
+        await self._iniciar()
+        slot = await self._slots.get()
+
+        try:
+            if slot is not None and (
+                slot.generacion != self._generacion
+                or slot.navegaciones >= self.max_navegaciones
+            ):
+                await slot.cerrar()
+                slot = None
+
+            if slot is None:
+                slot = await self._nuevo_slot()
+
+            slot.navegaciones += 1
+            slot.perfil = perfil or PERFIL_COMPLETO
+            slot.dominio = _host(url)
+            await slot.page.goto(url, wait_until="domcontentloaded")
+            inicio_espera = time.perf_counter()
+            await slot.esperar_lista(espera_ms)
+            html = await slot.page.content()
+            if metricas is not None:
+                metricas["espera_render_ms"] = int(round((time.perf_counter() - inicio_espera) * 1000))
+                # Tamaño del documento final (los recursos bloqueados no se descargan)
+                metricas["bytes"] = len(html.encode("utf-8"))
+            return html
+
+        except Exception:
+            # Página (o navegador) en mal estado → se recicla el slot
+            if slot is not None:
+                await slot.cerrar()
+                slot = None
+            raise
+
+        finally:
+            self._slots.put_nowait(slot)
+
+    async def _cerrar(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    # -----------------------------
+    # API pública
+    # -----------------------------
+    def get_html(
+        self, url: str, espera_ms: int = ESPERA_RENDER_MS, perfil: PerfilCarga = None, metricas: dict = None
+    ) -> str:
+        """
+        Versión síncrona: bloquea el hilo llamador hasta tener el HTML.
+        Si se pasa `metricas` (dict), se completa con espera_render_ms y bytes.
+        """
+        return self._enviar(self._obtener_html(url, espera_ms, perfil, metricas)).result()
+
+    async def get_html_async(
+        self, url: str, espera_ms: int = ESPERA_RENDER_MS, perfil: PerfilCarga = None, metricas: dict = None
+    ) -> str:
+        """Versión para usar desde otro event loop (motor async)."""
+        return await asyncio.wrap_future(self._enviar(self._obtener_html(url, espera_ms, perfil, metricas)))
+
+    def cerrar(self):
+        if self._loop is None:
+            return
+        try:
+            self._enviar(self._cerrar()).result(timeout=10)
+        except Exception as e:
+            print("⚠️ Error cerrando Chromium:", e)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+# ============================
+# Pool compartido del proceso
+# ============================
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(cerrar_browser_pool)
+        return _pool
+
+
+def cerrar_browser_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.cerrar()
+            _pool = None
@@ -0,0 +1,49 @@
+# scraper/checkpoint.py
+"""
+Checkpoints de corridas completas (todas las URLs de una tienda).
+
+La fila de operaciones.checkpoints_scraping solo guarda cuándo empezó la
+corrida: qué URLs ya están hechas lo dice estado_scraping_productos, que se
+escribe en la misma transacción que los datos de cada lote. Si el proceso
+se reinicia, la corrida se retoma con las URLs cuyo ultimo_scraping_en es
+anterior al inicio. Al terminar sin interrupción se borra el checkpoint.
+"""
+from datetime import datetime
+
+from sqlalchemy import or_
+
+from models import CheckpointScraping, EstadoScrapingProducto, TiendaProducto
+
+
+def abrir_checkpoint(db, clave: str):
+    """Devuelve (iniciado_en, retomada)."""
+    fila = db.get(CheckpointScraping, clave)
+    if fila is not None:
+        return fila.iniciado_en, True
+
+    ahora = datetime.utcnow()
+    db.add(CheckpointScraping(clave=clave, iniciado_en=ahora, actualizado_en=ahora))
+    db.commit()
+    return ahora, False
+
+
+def pendientes(db, tienda_id, desde: datetime) -> list:
+    """TiendaProducto activos de la tienda que no se scrapearon desde `desde`."""
+    return (
+        db.query(TiendaProducto)
+        .outerjoin(EstadoScrapingProducto, EstadoScrapingProducto.tienda_producto_id == TiendaProducto.id)
+        .filter(
+            TiendaProducto.tienda_id == tienda_id,
+            TiendaProducto.activo.is_(True),
+            or_(
+                EstadoScrapingProducto.ultimo_scraping_en.is_(None),
+                EstadoScrapingProducto.ultimo_scraping_en < desde,
+            ),
+        )
+        .all()
+    )
+
+
+def cerrar_checkpoint(db, clave: str):
+    db.query(CheckpointScraping).filter(CheckpointScraping.clave == clave).delete()
+    db.commit()
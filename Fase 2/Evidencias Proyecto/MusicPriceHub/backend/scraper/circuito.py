@@ -0,0 +1,111 @@
+# scraper/circuito.py
+"""
+Circuito por tienda: deja de pedirle páginas a una tienda caída.
+
+  cerrado      → normal; cada descarga fallida suma un fallo consecutivo y
+                 cualquier descarga exitosa los pone en cero.
+  abierto      → tras UMBRAL_FALLOS fallos seguidos. No se arriendan URLs
+                 de la tienda hasta abierto_hasta y las que ya estaban en la
+                 corrida se postergan sin contar como intento.
+  semiabierto  → vencida la espera, el siguiente ciclo arrienda solo SONDAS
+                 URLs: si una descarga funciona se cierra, si falla se
+                 vuelve a abrir.
+
+La espera se duplica con cada apertura seguida (APERTURA_BASE × 2^n, hasta
+APERTURA_MAXIMA) con jitter, para que varias tiendas caídas a la vez no
+vuelvan todas en el mismo ciclo. El estado vive en
+operaciones.circuitos_tiendas, así que lo comparten todos los workers.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+from models import CircuitoTienda
+
+UMBRAL_FALLOS = int(os.getenv("SCRAPER_CIRCUITO_UMBRAL", "5"))
+APERTURA_BASE = int(os.getenv("SCRAPER_CIRCUITO_APERTURA", "300"))
+APERTURA_MAXIMA = int(os.getenv("SCRAPER_CIRCUITO_APERTURA_MAXIMA", str(6 * 3600)))
+SONDAS = int(os.getenv("SCRAPER_CIRCUITO_SONDAS", "2"))
+
+
+def espera_con_jitter(base: float, intento: int, maximo: float) -> float:
+    """base × 2^intento (tope `maximo`), entre la mitad y el total."""
+    espera = min(base * 2 ** intento, maximo)
+    return espera * random.uniform(0.5, 1.0)
+
+
+class Circuito:
+    """Estado del circuito de una tienda durante una corrida."""
+
+    def __init__(self, tienda, fila: CircuitoTienda = None, ahora: datetime = None):
+        ahora = ahora or datetime.utcnow()
+        self.tienda = tienda
+        self.estado = fila.estado if fila else "cerrado"
+        self.fallos = fila.fallos_consecutivos if fila else 0
+        self.aperturas = fila.aperturas if fila else 0
+        self.abierto_hasta = fila.abierto_hasta if fila else None
+        self.sondas = 0
+
+        # Vencida la espera, toca probar
+        if self.estado == "abierto" and not self.sigue_abierto(ahora):
+            self.estado = "semiabierto"
+
+    def sigue_abierto(self, ahora: datetime) -> bool:
+        if self.estado != "abierto" or self.abierto_hasta is None:
+            return False
+        return self.abierto_hasta.replace(tzinfo=None) > ahora
+
+    def permite(self) -> bool:
+        if self.estado == "abierto":
+            return False
+        if self.estado == "semiabierto":
+            if self.sondas >= SONDAS:
+                return False
+            self.sondas += 1
+        return True
+
+    def exito(self):
+        self.fallos = 0
+        if self.estado == "semiabierto":
+            print(f"🔌 Circuito cerrado para {self.tienda.nombre}: la sonda respondió")
+            self.estado = "cerrado"
+            self.aperturas = 0
+            self.abierto_hasta = None
+
+    def fallo(self):
+        self.fallos += 1
+        if self.estado == "semiabierto" or (self.estado == "cerrado" and self.fallos >= UMBRAL_FALLOS):
+            self._abrir()
+
+    def _abrir(self):
+        espera = espera_con_jitter(APERTURA_BASE, self.aperturas, APERTURA_MAXIMA)
+        self.estado = "abierto"
+        self.abierto_hasta = datetime.utcnow() + timedelta(seconds=espera)
+        self.aperturas += 1
+        print(
+            f"🔌 Circuito abierto para {self.tienda.nombre} tras {self.fallos} fallos: "
+            f"se reintenta en {espera / 60:.0f} min"
+        )
+
+    def guardar(self, db):
+        """Escribe el estado en operaciones.circuitos_tiendas (sin commit)."""
+        db.merge(
+            CircuitoTienda(
+                tienda_id=self.tienda.id,
+                estado=self.estado,
+                fallos_consecutivos=self.fallos,
+                aperturas=self.aperturas,
+                abierto_hasta=self.abierto_hasta,
+                actualizado_en=datetime.utcnow(),
+            )
+        )
+
+
+def cargar_circuitos(db, tiendas) -> dict:
+    """tienda_id → Circuito, con una sola consulta."""
+    filas = {
+        fila.tienda_id: fila
+        for fila in db.query(CircuitoTienda).filter(CircuitoTienda.tienda_id.in_([t.id for t in tiendas]))
+    }
+    ahora = datetime.utcnow()
+    return {t.id: Circuito(t, filas.get(t.id), ahora) for t in tiendas}
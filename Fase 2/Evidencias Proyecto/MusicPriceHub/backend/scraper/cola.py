@@ -0,0 +1,196 @@
+# scraper/cola.py
+"""
+Cola de scraping en la BD para correr varios workers a la vez.
+
+Cada worker arrienda un lote de URLs vencidas con
+SELECT ... FOR UPDATE SKIP LOCKED (dos workers nunca toman la misma fila),
+renueva el arriendo mientras trabaja (heartbeat) y lo libera al terminar.
+Si un worker muere, su arriendo vence y otro worker retoma esas URLs.
+
+El estado vive en operaciones.estado_scraping_productos:
+  arrendado_por / arrendado_hasta  → quién la tiene y hasta cuándo
+  intentos                         → fallos consecutivos
+
+Una URL que falla vuelve a la cola con espera exponencial y jitter
+(ESPERA_REINTENTO × 2^(intentos-1), entre la mitad y el total); si la
+tienda entera está caída la corta antes el circuito (scraper/circuito.py).
+"""
+import os
+import socket
+
+from sqlalchemy import text
+
+from database import engine
+from scraper.agenda import INTERVALO_MAXIMO, items_agenda
+
+WORKER_ID = os.getenv("SCRAPER_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+LOTE_ARRIENDO = int(os.getenv("SCRAPER_LOTE_ARRIENDO", "500"))
+DURACION_ARRIENDO = int(os.getenv("SCRAPER_DURACION_ARRIENDO", "300"))
+INTERVALO_HEARTBEAT = int(os.getenv("SCRAPER_INTERVALO_HEARTBEAT", "60"))
+ESPERA_REINTENTO = int(os.getenv("SCRAPER_ESPERA_REINTENTO", "300"))
+MAXIMO_INTENTOS = int(os.getenv("SCRAPER_MAXIMO_INTENTOS", "5"))
+
+SQL_CREAR_ESTADOS = """
+INSERT INTO operaciones.estado_scraping_productos (tienda_producto_id, intentos)
+SELECT tp.id, 0
+FROM catalogo.tienda_productos tp
+WHERE tp.activo
+  AND tp.tienda_id = ANY(CAST(:tiendas AS uuid[]))
+  AND NOT EXISTS (
+      SELECT 1 FROM operaciones.estado_scraping_productos e
+      WHERE e.tienda_producto_id = tp.id
+  )
+ON CONFLICT (tienda_producto_id) DO NOTHING
+"""
+
+SQL_ARRENDAR = """
+WITH candidatos AS (
+    SELECT e.tienda_producto_id
+    FROM operaciones.estado_scraping_productos e
+    JOIN catalogo.tienda_productos tp ON tp.id = e.tienda_producto_id
+    WHERE tp.activo
+      AND tp.tienda_id = ANY(CAST(:tiendas AS uuid[]))
+      AND (e.proximo_scraping_en IS NULL OR e.proximo_scraping_en <= now())
+      AND (e.arrendado_hasta IS NULL OR e.arrendado_hasta < now())
+    ORDER BY e.proximo_scraping_en NULLS FIRST
+    LIMIT :limite
+    FOR UPDATE OF e SKIP LOCKED
+)
+UPDATE operaciones.estado_scraping_productos e
+SET arrendado_por = :worker,
+    arrendado_hasta = now() + make_interval(secs => :duracion),
+    intentos = e.intentos + 1
+FROM candidatos c
+WHERE e.tienda_producto_id = c.tienda_producto_id
+RETURNING e.tienda_producto_id
+"""
+
+# SKIP LOCKED: las filas que la corrida está escribiendo en ese momento ya
+# están soltando su arriendo; esperarlas solo arriesga un deadlock
+SQL_HEARTBEAT = """
+UPDATE operaciones.estado_scraping_productos
+SET arrendado_hasta = now() + make_interval(secs => :duracion)
+WHERE tienda_producto_id IN (
+    SELECT tienda_producto_id
+    FROM operaciones.estado_scraping_productos
+    WHERE arrendado_por = :worker
+    FOR UPDATE SKIP LOCKED
+)
+"""
+
+SQL_LIBERAR_FALLIDOS = """
+UPDATE operaciones.estado_scraping_productos
+SET arrendado_por = NULL,
+    arrendado_hasta = NULL,
+    proximo_scraping_en = CASE
+        WHEN intentos >= :maximo THEN now() + make_interval(secs => :estacionar)
+        ELSE now() + make_interval(
+            secs => LEAST(:espera * power(2, GREATEST(intentos - 1, 0)), :estacionar)
+                    * (0.5 + random() / 2)
+        )
+    END,
+    intentos = CASE WHEN intentos >= :maximo THEN 0 ELSE intentos END
+WHERE tienda_producto_id = ANY(CAST(:ids AS uuid[]))
+  AND arrendado_por = :worker
+"""
+
+# El circuito de la tienda se abrió: no es culpa de la URL, no cuenta como intento
+SQL_POSTERGAR = """
+UPDATE operaciones.estado_scraping_productos
+SET arrendado_por = NULL,
+    arrendado_hasta = NULL,
+    proximo_scraping_en = :hasta,
+    intentos = GREATEST(intentos - 1, 0)
+WHERE tienda_producto_id = ANY(CAST(:ids AS uuid[]))
+  AND arrendado_por = :worker
+"""
+
+# Lo que sigue arrendado al final de un ciclo no se alcanzó a intentar
+SQL_LIBERAR_TODO = """
+UPDATE operaciones.estado_scraping_productos
+SET arrendado_por = NULL,
+    arrendado_hasta = NULL,
+    intentos = GREATEST(intentos - 1, 0)
+WHERE arrendado_por = :worker
+"""
+
+
+def arrendar_lote(db, tienda_ids, limite: int = LOTE_ARRIENDO) -> list:
+    """
+    Toma hasta `limite` URLs vencidas de las tiendas indicadas para este
+    worker y devuelve sus ItemAgenda. El arriendo se confirma de inmediato
+    para que los demás workers lo vean.
+    """
+    tiendas = [str(t) for t in tienda_ids]
+    if not tiendas:
+        return []
+
+    try:
+        db.execute(text(SQL_CREAR_ESTADOS), {"tiendas": tiendas})
+        ids = [
+            fila.tienda_producto_id
+            for fila in db.execute(
+                text(SQL_ARRENDAR),
+                {
+                    "tiendas": tiendas,
+                    "limite": limite,
+                    "worker": WORKER_ID,
+                    "duracion": DURACION_ARRIENDO,
+                },
+            )
+        ]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    print(f"📥 {WORKER_ID} arrendó {len(ids)} URLs")
+    return items_agenda(db, ids)
+
+
+def renovar_arriendos():
+    """Heartbeat: extiende los arriendos vigentes de este worker."""
+    # Conexión propia: no interfiere con la transacción de la corrida
+    with engine.begin() as conn:
+        conn.execute(text(SQL_HEARTBEAT), {"worker": WORKER_ID, "duracion": DURACION_ARRIENDO})
+
+
+def liberar_fallidos(db, tienda_producto_ids):
+    """
+    Suelta las URLs que fallaron para que se reintenten más tarde
+    (ESPERA_REINTENTO × 2^(intentos-1), con jitter). Después de MAXIMO_INTENTOS fallos
+    seguidos se estacionan por INTERVALO_MAXIMO.
+    """
+    if not tienda_producto_ids:
+        return
+    db.execute(
+        text(SQL_LIBERAR_FALLIDOS),
+        {
+            "ids": [str(i) for i in tienda_producto_ids],
+            "worker": WORKER_ID,
+            "maximo": MAXIMO_INTENTOS,
+            "espera": ESPERA_REINTENTO,
+            "estacionar": INTERVALO_MAXIMO,
+        },
+    )
+
+
+def postergar(db, tienda_producto_ids, hasta):
+    """Suelta URLs sin procesar hasta `hasta` (circuito abierto)."""
+    if not tienda_producto_ids:
+        return
+    db.execute(
+        text(SQL_POSTERGAR),
+        {"ids": [str(i) for i in tienda_producto_ids], "worker": WORKER_ID, "hasta": hasta},
+    )
+
+
+def liberar_todo():
+    """
+    Devuelve a la cola lo que este worker no alcanzó a procesar. Al arrancar,
+    recupera de inmediato lo que dejó tomado una instancia anterior con el
+    mismo WORKER_ID (p. ej. el mismo contenedor reiniciado) sin esperar a
+    que venza el arriendo.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(SQL_LIBERAR_TODO), {"worker": WORKER_ID})
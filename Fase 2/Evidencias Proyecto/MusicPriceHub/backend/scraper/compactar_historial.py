@@ -0,0 +1,101 @@
+# scraper/compactar_historial.py
+"""
+Compactación (una sola vez) del historial de precios antiguo.
+
+Antes se insertaba una fila por scraping aunque el precio no cambiara.
+Este script deja solo la primera fila de cada racha con el mismo
+precio/disponibilidad/moneda/fuente y le asigna confirmado_hasta = fecha
+de la última fila de la racha. El resto de la racha se elimina.
+
+Uso (desde /backend, después de migraciones/001_historial_confirmado_hasta.sql):
+    python -m scraper.compactar_historial            # compacta
+    python -m scraper.compactar_historial --simular  # solo cuenta
+"""
+import sys
+
+from sqlalchemy import text
+
+from database import SessionLocal
+
+SQL_SEGMENTOS = """
+CREATE TEMP TABLE _segmentos_historial ON COMMIT DROP AS
+WITH ordenado AS (
+    SELECT
+        id,
+        tienda_producto_id,
+        COALESCE(valido_desde, fecha_scraping) AS fecha,
+        CASE
+            WHEN LAG(id) OVER w IS NULL THEN 1
+            WHEN LAG(precio_centavos) OVER w IS DISTINCT FROM precio_centavos THEN 1
+            WHEN LAG(disponibilidad) OVER w IS DISTINCT FROM disponibilidad THEN 1
+            WHEN LAG(moneda) OVER w IS DISTINCT FROM moneda THEN 1
+            WHEN LAG(fuente) OVER w IS DISTINCT FROM fuente THEN 1
+            ELSE 0
+        END AS inicia_tramo
+    FROM precios.historial_precios
+    WINDOW w AS (
+        PARTITION BY tienda_producto_id
+        ORDER BY COALESCE(valido_desde, fecha_scraping), id
+    )
+),
+numerado AS (
+    SELECT
+        *,
+        SUM(inicia_tramo) OVER (
+            PARTITION BY tienda_producto_id
+            ORDER BY fecha, id
+        ) AS tramo
+    FROM ordenado
+)
+SELECT
+    id,
+    inicia_tramo,
+    MAX(fecha) OVER (PARTITION BY tienda_producto_id, tramo) AS fin_tramo
+FROM numerado;
+"""
+
+SQL_CERRAR_TRAMOS = """
+UPDATE precios.historial_precios h
+SET confirmado_hasta = GREATEST(COALESCE(h.confirmado_hasta, s.fin_tramo), s.fin_tramo)
+FROM _segmentos_historial s
+WHERE s.id = h.id AND s.inicia_tramo = 1;
+"""
+
+SQL_BORRAR_REPETIDOS = """
+DELETE FROM precios.historial_precios h
+USING _segmentos_historial s
+WHERE s.id = h.id AND s.inicia_tramo = 0;
+"""
+
+
+def compactar_historial(simular: bool = False):
+    db = SessionLocal()
+    try:
+        db.execute(text(SQL_SEGMENTOS))
+
+        total, repetidas = db.execute(
+            text("SELECT COUNT(*), COUNT(*) FILTER (WHERE inicia_tramo = 0) FROM _segmentos_historial")
+        ).one()
+        print(f"📦 Filas de historial: {total} — repetidas: {repetidas}")
+
+        if simular:
+            db.rollback()
+            print("🔎 Simulación: no se modificó nada.")
+            return
+
+        db.execute(text(SQL_CERRAR_TRAMOS))
+        db.execute(text(SQL_BORRAR_REPETIDOS))
+        db.commit()
+        print(f"✅ Historial compactado: {total - repetidas} filas restantes.")
+
+    except Exception as e:
+        db.rollback()
+        print("❌ Error compactando historial:", e)
+        raise
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    compactar_historial(simular="--simular" in sys.argv)
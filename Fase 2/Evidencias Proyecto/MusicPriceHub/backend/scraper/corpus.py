@@ -0,0 +1,90 @@
+# scraper/corpus.py
+"""
+Corpus de páginas de producto grabadas, para trabajar sin tocar los sitios.
+
+Estructura (una carpeta por dominio):
+    scraper/corpus/fender.cl/<clave>.html   → HTML tal como se descargó
+    scraper/corpus/fender.cl/<clave>.json   → {"url": ..., "esperado": {...}}
+
+`esperado` son los datos que debe extraer el scraper; el benchmark
+(scraper/benchmark.py) los usa para medir la precisión de la extracción.
+
+Modo repetición: con SCRAPER_CORPUS=<directorio> (o scraper.corpus = Corpus(...))
+BaseScraper sirve las páginas desde el corpus en vez de descargarlas.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+DIRECTORIO_CORPUS = Path(__file__).parent / "corpus"
+
+
+def clave_url(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+class PaginaCorpus:
+    __slots__ = ("dominio", "url", "ruta_html", "esperado")
+
+    def __init__(self, dominio: str, url: str, ruta_html: Path, esperado: dict):
+        self.dominio = dominio
+        self.url = url
+        self.ruta_html = ruta_html
+        self.esperado = esperado
+
+    def html(self) -> str:
+        return self.ruta_html.read_text(encoding="utf-8")
+
+
+class Corpus:
+    def __init__(self, directorio=DIRECTORIO_CORPUS):
+        self.directorio = Path(directorio)
+        self._por_url = None
+
+    def _indexar(self):
+        if self._por_url is None:
+            self._por_url = {p.url: p for p in self.paginas()}
+        return self._por_url
+
+    def paginas(self, dominio: str = None) -> list:
+        if not self.directorio.exists():
+            return []
+        carpetas = [self.directorio / dominio] if dominio else sorted(
+            p for p in self.directorio.iterdir() if p.is_dir()
+        )
+        paginas = []
+        for carpeta in carpetas:
+            for meta in sorted(carpeta.glob("*.json")):
+                datos = json.loads(meta.read_text(encoding="utf-8"))
+                paginas.append(
+                    PaginaCorpus(carpeta.name, datos["url"], meta.with_suffix(".html"), datos.get("esperado"))
+                )
+        return paginas
+
+    def dominios(self) -> list:
+        return sorted({p.dominio for p in self.paginas()})
+
+    def html(self, url: str) -> str:
+        pagina = self._indexar().get(url)
+        if pagina is None:
+            raise KeyError(f"URL no grabada en el corpus: {url}")
+        return pagina.html()
+
+    def grabar(self, dominio: str, url: str, html: str, esperado: dict = None) -> Path:
+        carpeta = self.directorio / dominio
+        carpeta.mkdir(parents=True, exist_ok=True)
+        base = carpeta / clave_url(url)
+        base.with_suffix(".html").write_text(html, encoding="utf-8")
+        base.with_suffix(".json").write_text(
+            json.dumps({"url": url, "esperado": esperado}, ensure_ascii=False, indent=2, default=str),
+            encoding="utf-8",
+        )
+        self._por_url = None
+        return base.with_suffix(".html")
+
+
+def corpus_desde_entorno():
+    """Corpus de repetición configurado por SCRAPER_CORPUS, o None."""
+    directorio = os.getenv("SCRAPER_CORPUS")
+    return Corpus(directorio) if directorio else None
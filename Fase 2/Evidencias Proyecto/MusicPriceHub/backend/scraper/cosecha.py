@@ -0,0 +1,235 @@
+# scraper/cosecha.py
+"""
+Cosecha de precios desde páginas de categoría.
+
+Un listado muestra nombre y precio de 24–48 productos: con UNA descarga se
+refrescan todas esas ofertas, en vez de renderizar cada ficha. Por tienda,
+según el bloque `listado` de su especificación (EspecificacionListado):
+
+  - ofertas conocidas y vinculadas → se actualizan en bloque (oferta actual +
+    historial, igual que el scraping de fichas) y su próximo scraping de
+    ficha se posterga, sin pasar de FICHA_MAXIMA desde la última ficha,
+  - URLs nuevas → se crean sin producto, para que la cola scrapee su ficha,
+  - URLs sin producto vinculado o ambiguas (sin precio, o con precios
+    distintos en el mismo listado) → su ficha queda vencida ahora.
+
+Uso (desde /backend):
+    python -m scraper.cosecha                    # todas las tiendas con listado
+    python -m scraper.cosecha --tienda fender.cl # una tienda (dominio o nombre)
+    python -m scraper.cosecha --simular          # solo muestra lo que haría
+"""
+import argparse
+import os
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import SessionLocal
+from models import TareaScraping, Tienda
+from scraper.agenda import INTERVALO_BASE
+from scraper.descubrimiento import Descubrimiento, clave_url, insertar_urls, urls_por_clave
+from scraper.motor import dominio_de
+from scraper.registro import scraper_para
+from scraper.services.catalogo_service import LoteCatalogo, disponibilidad_de, registrar_precio
+from scraper.services.indice_catalogo import IndiceCatalogo
+
+COSECHA_CADA = int(os.getenv("SCRAPER_COSECHA_CADA", "1800"))
+# Aunque el listado la refresque, cada ficha se vuelve a scrapear al menos
+# así de seguido (nombre, imagen, descripción)
+FICHA_MAXIMA = int(os.getenv("SCRAPER_COSECHA_FICHA_MAXIMA", str(7 * 24 * 3600)))
+MAXIMO_PAGINAS_LISTADO = int(os.getenv("SCRAPER_COSECHA_MAXIMO_PAGINAS", "200"))
+
+SQL_POSTERGAR = """
+UPDATE operaciones.estado_scraping_productos
+SET proximo_scraping_en = LEAST(
+        :ahora + make_interval(secs => COALESCE(intervalo_segundos, :base)),
+        COALESCE(ultimo_scraping_en, :ahora) + make_interval(secs => :ficha)
+    ),
+    -- Si el listado trajo otro precio, la próxima ficha no puede darse por
+    -- "sin cambios" contra el hash anterior
+    hash_contenido = CASE
+        WHEN tienda_producto_id = ANY(CAST(:cambiados AS uuid[])) THEN NULL
+        ELSE hash_contenido
+    END
+WHERE tienda_producto_id = ANY(CAST(:ids AS uuid[]))
+"""
+
+SQL_VENCER = """
+UPDATE operaciones.estado_scraping_productos
+SET proximo_scraping_en = :ahora
+WHERE tienda_producto_id = ANY(CAST(:ids AS uuid[]))
+  AND (proximo_scraping_en IS NULL OR proximo_scraping_en > :ahora)
+"""
+
+
+class Cosecha(Descubrimiento):
+    """Recorre los listados de una tienda y junta url → (precio, disponibilidad)."""
+
+    def __init__(self, scraper):
+        super().__init__(scraper)
+        self.listado = scraper.listado
+        self.precios = {}
+        self.ambiguas = set()
+        self.paginas = 0
+
+    def _agregar_item(self, item: dict):
+        url = self.normalizar(item.get("url") or "")
+        if not url:
+            return
+        precio = item.get("precio")
+        if precio is None:
+            self.ambiguas.add(url)
+            return
+        valor = (precio, disponibilidad_de(item))
+        if self.precios.setdefault(url, valor) != valor:
+            self.ambiguas.add(url)
+
+    def ejecutar(self) -> dict:
+        categorias = self.listado.categorias or tuple(self.config.get("categorias", ()))
+        for inicio in categorias:
+            url, paginas = inicio, 0
+            while url and paginas < MAXIMO_PAGINAS_LISTADO:
+                paginas += 1
+                try:
+                    items, url = self.listado.extraer(self._html(url), url)
+                except Exception as e:
+                    print(f"⚠️ Listado ilegible {url}: {e}")
+                    self.completo = False
+                    break
+                for item in items:
+                    self._agregar_item(item)
+            self.paginas += paginas
+
+        for url in self.ambiguas:
+            self.precios.pop(url, None)
+        return self.precios
+
+
+def aplicar_cosecha(db, tienda, cosecha: Cosecha, simular: bool = False) -> dict:
+    """Escribe las ofertas cosechadas y reordena la agenda de fichas en una transacción."""
+    indice = IndiceCatalogo.cargar(db, [tienda.id])
+    ahora = datetime.utcnow()
+    lote = LoteCatalogo()
+    # Cada URL del listado se busca con la forma guardada de la misma página
+    # (clave_url): "www.", "/" final o utm_* no crean un TiendaProducto nuevo
+    guardadas = urls_por_clave(url for tienda_id, url in indice.tienda_productos if tienda_id == tienda.id)
+
+    def _tienda_producto(url):
+        return indice.tienda_producto(tienda.id, guardadas.get(clave_url(url), url))
+
+    refrescadas, cambiadas, a_ficha, nuevas = [], [], [], []
+    for url, (precio, disponibilidad) in cosecha.precios.items():
+        tp_id, producto_id = _tienda_producto(url)
+        if tp_id is None:
+            nuevas.append(url)
+        elif producto_id is None:
+            a_ficha.append(tp_id)
+        else:
+            ultimo = indice.ultimo_historial(tp_id)
+            if not ultimo or ultimo[1] != precio or ultimo[2] != disponibilidad:
+                cambiadas.append(tp_id)
+            registrar_precio(
+                db, lote, indice,
+                tienda_id=tienda.id,
+                tienda_producto_id=tp_id,
+                producto_id=producto_id,
+                precio_centavos=precio,
+                disponibilidad=disponibilidad,
+                ahora=ahora,
+            )
+            refrescadas.append(tp_id)
+
+    for url in cosecha.ambiguas:
+        tp_id, _ = _tienda_producto(url)
+        if tp_id is None:
+            nuevas.append(url)
+        else:
+            a_ficha.append(tp_id)
+
+    resumen = {
+        "paginas": cosecha.paginas,
+        "items": len(cosecha.precios) + len(cosecha.ambiguas),
+        "refrescadas": len(refrescadas),
+        "cambios": len(cambiadas),
+        "a_ficha": len(a_ficha),
+        "ambiguas": len(cosecha.ambiguas),
+        "nuevas": len(nuevas),
+    }
+    if simular:
+        return resumen
+
+    try:
+        lote.aplicar(db)
+        if refrescadas:
+            db.execute(
+                text(SQL_POSTERGAR),
+                {
+                    "ahora": ahora,
+                    "base": INTERVALO_BASE,
+                    "ficha": FICHA_MAXIMA,
+                    "ids": [str(i) for i in refrescadas],
+                    "cambiados": [str(i) for i in cambiadas],
+                },
+            )
+        if a_ficha:
+            db.execute(text(SQL_VENCER), {"ahora": ahora, "ids": [str(i) for i in a_ficha]})
+        insertar_urls(db, tienda.id, nuevas, ahora)
+        db.add(
+            TareaScraping(
+                tienda_id=tienda.id,
+                inicio_en=ahora,
+                fin_en=datetime.utcnow(),
+                estado="ok" if cosecha.completo else "parcial",
+                detalle=f"Cosecha de listados {tienda.nombre}",
+                metricas={"cosecha": resumen},
+            )
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return resumen
+
+
+def cosechar_tienda(db, tienda, simular: bool = False):
+    clase = scraper_para(tienda)
+    if clase is None or clase.listado is None:
+        return None
+
+    cosecha = Cosecha(clase(tienda=tienda, db=db))
+    cosecha.ejecutar()
+    resumen = aplicar_cosecha(db, tienda, cosecha, simular)
+    print(f"🌾 {tienda.nombre}: {resumen}")
+    return resumen
+
+
+def cosechar(tienda: str = None, simular: bool = False):
+    db = SessionLocal()
+    try:
+        tiendas = db.query(Tienda).all()
+        if tienda:
+            filtro = tienda.lower()
+            tiendas = [
+                t for t in tiendas
+                if filtro in (t.nombre or "").lower()
+                or filtro == dominio_de(t.sitio_web or t.url or "")
+            ]
+        for t in tiendas:
+            try:
+                cosechar_tienda(db, t, simular=simular)
+            except Exception as e:
+                print(f"❌ Error cosechando {t.nombre}: {e}")
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cosecha de precios desde listados")
+    parser.add_argument("--tienda", help="dominio o nombre de la tienda")
+    parser.add_argument("--simular", action="store_true")
+    args = parser.parse_args(argv)
+    cosechar(args.tienda, args.simular)
+
+
+if __name__ == "__main__":
+    main()
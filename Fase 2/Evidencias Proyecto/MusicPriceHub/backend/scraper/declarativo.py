@@ -0,0 +1,85 @@
+# scraper/declarativo.py
+"""
+Scrapers definidos por especificación (scraper/especificaciones/*.json).
+
+Cada archivo JSON describe una tienda (dominios + campos a extraer, ver
+scraper/extraccion.py). Al cargar los scrapers se compila cada
+especificación una sola vez y se registra una subclase de
+ScraperDeclarativo para sus dominios: agregar una tienda es agregar un
+archivo JSON, sin código.
+"""
+import json
+from pathlib import Path
+
+from scraper.base_scraper import BaseScraper
+from scraper.extraccion import EspecificacionExtraccion, EspecificacionListado
+
+DIRECTORIO_ESPECIFICACIONES = Path(__file__).parent / "especificaciones"
+
+_clases = {}
+
+
+class ScraperDeclarativo(BaseScraper):
+    especificacion: EspecificacionExtraccion = None
+    # Nombre del JSON en scraper/especificaciones/ (None si se armó en memoria)
+    archivo_especificacion = None
+
+    @classmethod
+    def referencia_parseo(cls):
+        # Las clases se crean con type(): en otro proceso se recompilan desde el JSON
+        if cls.archivo_especificacion is None:
+            return None
+        return f"especificacion:{cls.archivo_especificacion}"
+
+    def html_completo(self, html: str) -> bool:
+        # Mismo parser (lxml) que la extracción
+        return self.especificacion.html_completo(html)
+
+    def extraer_datos(self, html: str, url: str) -> dict:
+        return self.especificacion.extraer(html, url)
+
+
+def _nombre_clase(nombre: str) -> str:
+    partes = "".join(c if c.isalnum() else " " for c in nombre).split()
+    return "".join(p.capitalize() for p in partes) + "Scraper"
+
+
+def scraper_desde_especificacion(spec: dict, nombre: str):
+    especificacion = EspecificacionExtraccion(spec, nombre=nombre)
+    return type(
+        _nombre_clase(especificacion.nombre),
+        (ScraperDeclarativo,),
+        {
+            "especificacion": especificacion,
+            "selectores_requeridos": especificacion.selectores_requeridos,
+            "requiere_navegador": especificacion.requiere_navegador,
+            "descubrimiento": spec.get("descubrimiento"),
+            "listado": (
+                EspecificacionListado(spec["listado"], nombre=especificacion.nombre)
+                if spec.get("listado") else None
+            ),
+        },
+    )
+
+
+def scraper_declarativo(archivo: str):
+    """Clase (compilada una vez) para scraper/especificaciones/<archivo>.json."""
+    if archivo not in _clases:
+        ruta = DIRECTORIO_ESPECIFICACIONES / f"{archivo}.json"
+        spec = json.loads(ruta.read_text(encoding="utf-8"))
+        clase = scraper_desde_especificacion(spec, spec.get("tienda") or archivo)
+        clase.archivo_especificacion = archivo
+        _clases[archivo] = clase
+    return _clases[archivo]
+
+
+def especificaciones_disponibles() -> list:
+    # Las que empiezan con "_" no son de una tienda (p. ej. _generica)
+    return sorted(
+        p.stem for p in DIRECTORIO_ESPECIFICACIONES.glob("*.json") if not p.stem.startswith("_")
+    )
+
+
+def scraper_generico():
+    """Selectores comunes (h1, .price, og:image…) para tiendas sin scraper propio."""
+    return scraper_declarativo("_generica")
@@ -0,0 +1,309 @@
+# scraper/descubrimiento.py
+"""
+Descubrimiento de URLs de producto por tienda.
+
+Lee los sitemaps (incluidos índices de sitemaps y .xml.gz) y/o las páginas
+de categoría (siguiendo la paginación) definidos en `descubrimiento` del
+scraper de la tienda, y en UNA pasada:
+  - inserta en bloque los TiendaProducto nuevos (sin producto todavía: se
+    vinculan en su primer scraping),
+  - reactiva los que habían desaparecido y volvieron,
+  - desactiva los que ya no aparecen.
+
+Para no vaciar una tienda por un sitemap roto, solo se desactiva si todas
+las fuentes respondieron y las bajas no superan MAXIMO_BAJAS del catálogo.
+
+Las URLs se comparan por clave_url(): sin esquema, sin "www.", sin "/"
+final y sin parámetros de seguimiento (utm_*, gclid…). Un sitemap que pasa
+de http a https o agrega "www." no desactiva y vuelve a crear el catálogo.
+
+Uso (desde /backend):
+    python -m scraper.descubrimiento                    # todas las tiendas
+    python -m scraper.descubrimiento --tienda fender.cl # una tienda (dominio o nombre)
+    python -m scraper.descubrimiento --simular          # solo muestra el diff
+"""
+import argparse
+import gzip
+import os
+import re
+import uuid
+from datetime import datetime
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+
+import lxml.etree
+import lxml.html
+from lxml.cssselect import CSSSelector
+from sqlalchemy import insert, update
+
+from database import SessionLocal
+from models import Tienda, TiendaProducto
+from scraper.http_client import get_http_client
+from scraper.motor import dominio_de
+from scraper.registro import scraper_para
+
+MAXIMO_BAJAS = float(os.getenv("SCRAPER_DESCUBRIMIENTO_MAXIMO_BAJAS", "0.3"))
+MAXIMO_PAGINAS_CATEGORIA = int(os.getenv("SCRAPER_DESCUBRIMIENTO_MAXIMO_PAGINAS", "200"))
+MAXIMO_SITEMAPS = 500
+LOTE_INSERCION = 1000
+
+_LOC = "{http://www.sitemaps.org/schemas/sitemap/0.9}loc"
+
+# Parámetros que solo marcan de dónde vino la visita: no cambian la página
+_SEGUIMIENTO = re.compile(r"^(utm_\w+|gclid|fbclid|msclkid|mc_cid|mc_eid|_ga|_gl)$", re.IGNORECASE)
+_PUERTOS_POR_DEFECTO = {("http", 80), ("https", 443)}
+
+
+def limpiar_url(url: str):
+    """
+    URL absoluta http(s) sin fragmento ni parámetros de seguimiento, con
+    esquema y host en minúsculas. Sigue siendo una URL descargable; None si
+    no es http(s).
+    """
+    partes = urlsplit(urldefrag(url.strip())[0])
+    esquema = partes.scheme.lower()
+    if esquema not in ("http", "https") or not partes.hostname:
+        return None
+    host = partes.hostname
+    if partes.port and (esquema, partes.port) not in _PUERTOS_POR_DEFECTO:
+        host = f"{host}:{partes.port}"
+    query = [(k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True) if not _SEGUIMIENTO.match(k)]
+    return urlunsplit((esquema, host, partes.path or "/", urlencode(query), ""))
+
+
+def clave_url(url: str):
+    """
+    Clave para comparar URLs de la misma página: limpiar_url() sin esquema,
+    sin "www.", sin "/" final y con los parámetros ordenados.
+    """
+    limpia = limpiar_url(url)
+    if limpia is None:
+        return None
+    partes = urlsplit(limpia)
+    host = partes.netloc[4:] if partes.netloc.startswith("www.") else partes.netloc
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    return f"{host}{partes.path.rstrip('/') or '/'}" + (f"?{query}" if query else "")
+
+
+class Descubrimiento:
+    """URLs encontradas para una tienda y si todas las fuentes respondieron."""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.config = scraper.descubrimiento or {}
+        self.dominio = dominio_de(scraper.tienda.sitio_web or scraper.tienda.url or "")
+        patron = self.config.get("patron_producto")
+        self.patron = re.compile(patron) if patron else None
+        self.urls = set()
+        self.completo = True
+
+    # -----------------------------
+    # Descarga
+    # -----------------------------
+    def _descargar(self, url: str) -> bytes:
+        respuesta = get_http_client().session.get(url, timeout=get_http_client().timeout)
+        respuesta.raise_for_status()
+        contenido = respuesta.content
+        if url.endswith(".gz") or contenido[:2] == b"\x1f\x8b":
+            contenido = gzip.decompress(contenido)
+        return contenido
+
+    def _html(self, url: str) -> str:
+        if self.scraper.requiere_navegador:
+            return self.scraper.get_page_html(url)
+        return self._descargar(url).decode("utf-8", errors="replace")
+
+    def normalizar(self, url: str):
+        """limpiar_url(url) si es de la tienda y parece de producto; si no, None."""
+        url = limpiar_url(url)
+        if url is None:
+            return None
+        dominio = dominio_de(url)
+        if self.dominio and dominio != self.dominio and not dominio.endswith("." + self.dominio):
+            return None
+        if self.patron and not self.patron.search(url):
+            return None
+        return url
+
+    def _agregar(self, url: str):
+        url = self.normalizar(url)
+        if url:
+            self.urls.add(url)
+
+    # -----------------------------
+    # Fuentes
+    # -----------------------------
+    def leer_sitemaps(self):
+        pendientes = list(self.config.get("sitemaps", ()))
+        vistos = set()
+        while pendientes and len(vistos) < MAXIMO_SITEMAPS:
+            url = pendientes.pop()
+            if url in vistos:
+                continue
+            vistos.add(url)
+            try:
+                raiz = lxml.etree.fromstring(self._descargar(url))
+            except Exception as e:
+                print(f"⚠️ Sitemap ilegible {url}: {e}")
+                self.completo = False
+                continue
+
+            locs = [loc.text for loc in raiz.iter(_LOC) if loc.text]
+            if lxml.etree.QName(raiz).localname == "sitemapindex":
+                pendientes.extend(locs)
+            else:
+                for loc in locs:
+                    self._agregar(loc)
+
+    def leer_categorias(self):
+        selector = self.config.get("selector_enlaces")
+        if not selector:
+            return
+        enlaces = CSSSelector(selector)
+        siguiente = CSSSelector(self.config["selector_siguiente"]) if self.config.get("selector_siguiente") else None
+
+        for inicio in self.config.get("categorias", ()):
+            url, paginas = inicio, 0
+            while url and paginas < MAXIMO_PAGINAS_CATEGORIA:
+                paginas += 1
+                try:
+                    arbol = lxml.html.fromstring(self._html(url))
+                except Exception as e:
+                    print(f"⚠️ Categoría ilegible {url}: {e}")
+                    self.completo = False
+                    break
+
+                for a in enlaces(arbol):
+                    if a.get("href"):
+                        self._agregar(urljoin(url, a.get("href")))
+
+                proxima = siguiente(arbol) if siguiente is not None else []
+                url = urljoin(url, proxima[0].get("href")) if proxima and proxima[0].get("href") else None
+
+    def ejecutar(self) -> set:
+        self.leer_sitemaps()
+        self.leer_categorias()
+        return self.urls
+
+
+def insertar_urls(db, tienda_id, urls, ahora: datetime):
+    """
+    TiendaProducto nuevos, sin producto todavía: se vinculan en su primer
+    scraping de ficha. No hace commit.
+    """
+    urls = list(urls)
+    for i in range(0, len(urls), LOTE_INSERCION):
+        db.execute(
+            insert(TiendaProducto),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "tienda_id": tienda_id,
+                    "producto_id": None,
+                    "url_producto": url,
+                    "sku_tienda": "DESCUBIERTO",
+                    "activo": True,
+                    "creado_en": ahora,
+                    "actualizado_en": ahora,
+                }
+                for url in urls[i:i + LOTE_INSERCION]
+            ],
+        )
+
+
+def urls_por_clave(urls) -> dict:
+    """clave_url → URL; si varias comparten clave, gana la primera en orden."""
+    por_clave = {}
+    for url in sorted(urls):
+        clave = clave_url(url)
+        if clave is not None:
+            por_clave.setdefault(clave, url)
+    return por_clave
+
+
+def aplicar_descubrimiento(db, tienda, urls: set, completo: bool, simular: bool = False) -> dict:
+    """Compara con los TiendaProducto existentes y aplica el diff en una transacción."""
+    existentes = {}
+    for tp_id, url, activo in db.query(
+        TiendaProducto.id, TiendaProducto.url_producto, TiendaProducto.activo
+    ).filter(TiendaProducto.tienda_id == tienda.id):
+        clave = clave_url(url) or url
+        # Si ya hay duplicados de la misma página, manda el activo
+        if clave not in existentes or (activo and not existentes[clave][1]):
+            existentes[clave] = (tp_id, activo)
+    activos = {clave for clave, (_, activo) in existentes.items() if activo}
+
+    encontradas = urls_por_clave(urls)
+    nuevas = sorted(encontradas[clave] for clave in encontradas.keys() - existentes.keys())
+    reactivar = [existentes[clave][0] for clave in encontradas.keys() & existentes.keys() if not existentes[clave][1]]
+    bajas = [existentes[clave][0] for clave in activos - encontradas.keys()]
+
+    omitir_bajas = None
+    if not completo:
+        omitir_bajas = "alguna fuente no respondió"
+    elif not encontradas:
+        omitir_bajas = "no se encontró ninguna URL"
+    elif activos and len(bajas) / len(activos) > MAXIMO_BAJAS:
+        omitir_bajas = f"{len(bajas)} de {len(activos)} supera el máximo de {MAXIMO_BAJAS:.0%}"
+    if omitir_bajas:
+        if bajas:
+            print(f"⚠️ {tienda.nombre}: no se desactivan {len(bajas)} URLs ({omitir_bajas})")
+        bajas = []
+
+    resumen = {"encontradas": len(encontradas), "nuevas": len(nuevas), "reactivadas": len(reactivar), "desactivadas": len(bajas)}
+    if simular:
+        return resumen
+
+    ahora = datetime.utcnow()
+    try:
+        insertar_urls(db, tienda.id, nuevas, ahora)
+        cambios = [{"id": i, "activo": True, "actualizado_en": ahora} for i in reactivar]
+        cambios += [{"id": i, "activo": False, "actualizado_en": ahora} for i in bajas]
+        if cambios:
+            db.execute(update(TiendaProducto), cambios)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return resumen
+
+
+def descubrir_tienda(db, tienda, simular: bool = False):
+    clase = scraper_para(tienda)
+    if clase is None or not clase.descubrimiento:
+        print(f"⏭️ {tienda.nombre}: sin configuración de descubrimiento")
+        return None
+
+    descubrimiento = Descubrimiento(clase(tienda=tienda, db=db))
+    urls = descubrimiento.ejecutar()
+    resumen = aplicar_descubrimiento(db, tienda, urls, descubrimiento.completo, simular)
+    print(f"🔎 {tienda.nombre}: {resumen}")
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Descubrimiento de URLs de producto")
+    parser.add_argument("--tienda", help="dominio o nombre de la tienda")
+    parser.add_argument("--simular", action="store_true")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        tiendas = db.query(Tienda).all()
+        if args.tienda:
+            filtro = args.tienda.lower()
+            tiendas = [
+                t for t in tiendas
+                if filtro in (t.nombre or "").lower()
+                or filtro == dominio_de(t.sitio_web or t.url or "")
+            ]
+        for tienda in tiendas:
+            try:
+                descubrir_tienda(db, tienda, simular=args.simular)
+            except Exception as e:
+                print(f"❌ Error descubriendo {tienda.nombre}: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# scraper/estadisticas.py
+"""
+Contadores en memoria de cómo se descargó cada página, por tienda.
+
+Niveles:
+  - "http":       bastó con la descarga HTTP simple
+  - "navegador":  hubo que escalar a Chromium
+  - "error":      ningún nivel pudo descargar la página
+"""
+import threading
+from collections import Counter, defaultdict
+
+# A partir de cuántos intentos se confía en la estadística de una tienda
+MINIMO_MUESTRAS = 20
+
+
+class EstadisticasFetch:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conteos = defaultdict(Counter)
+
+    def registrar(self, tienda: str, nivel: str):
+        with self._lock:
+            self._conteos[tienda][nivel] += 1
+
+    def solo_navegador(self, tienda: str) -> bool:
+        """
+        True si la tienda nunca ha funcionado con HTTP simple después de
+        MINIMO_MUESTRAS páginas: no vale la pena seguir intentándolo.
+        """
+        with self._lock:
+            conteo = self._conteos.get(tienda)
+            if not conteo:
+                return False
+            return conteo["http"] == 0 and conteo["navegador"] >= MINIMO_MUESTRAS
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {tienda: dict(conteo) for tienda, conteo in self._conteos.items()}
+
+
+estadisticas_fetch = EstadisticasFetch()
@@ -0,0 +1,204 @@
+# scraper/extraccion.py
+"""
+Motor de extracción declarativo sobre lxml.
+
+Una especificación describe los campos a extraer de una página de producto:
+
+    {
+      "campos": {
+        "nombre": ".product-name h1",
+        "precio": {"selectores": [".price-box .price"], "post": ["precio_a_centavos"]},
+        "imagen": {
+          "selectores": [
+            {"css": ".MagicZoom img", "atributo": ["src", "data-zoom-image"]},
+            {"css": "img", "atributo": "src"}
+          ]
+        },
+        "descripcion": {"selectores": [".short-description .std"], "modo": "texto_unido"}
+      }
+    }
+
+Cada campo prueba sus selectores en orden (el primero que entrega un valor
+gana) y luego aplica los post-procesadores. Una tienda de una sola marca
+puede fijarla con "marca": "Fender" en la raíz; si no, la marca sale del
+campo "marca" (si lo define) o queda vacía. Los selectores CSS se compilan a
+XPath una sola vez (EspecificacionExtraccion), así que extraer una página es
+parsearla con lxml y evaluar XPaths ya compilados.
+"""
+import re
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml.cssselect import CSSSelector
+
+from scraper.services.catalogo_service import precio_a_centavos
+
+_ESPACIOS = re.compile(r"\s+")
+
+
+def _texto(valor):
+    return _ESPACIOS.sub(" ", valor).strip() if isinstance(valor, str) else valor
+
+
+# Post-procesadores disponibles por nombre en las especificaciones.
+# Reciben (valor, url de la página).
+POST_PROCESADORES = {
+    "texto": lambda v, url: _texto(v),
+    "minusculas": lambda v, url: v.lower() if isinstance(v, str) else v,
+    "precio_a_centavos": lambda v, url: precio_a_centavos(v),
+    "url_absoluta": lambda v, url: urljoin(url, v),
+}
+
+
+class ErrorEspecificacion(ValueError):
+    pass
+
+
+class _Selector:
+    """Un selector CSS compilado + cómo leer el valor del nodo encontrado."""
+
+    def __init__(self, spec, modo_campo: str):
+        if isinstance(spec, str):
+            spec = {"css": spec}
+        try:
+            self.css = spec["css"]
+            self.compilado = CSSSelector(self.css)
+        except Exception as e:
+            raise ErrorEspecificacion(f"Selector inválido {spec!r}: {e}") from e
+
+        atributos = spec.get("atributo")
+        if isinstance(atributos, str):
+            atributos = [atributos]
+        self.atributos = tuple(atributos or ())
+        self.modo = spec.get("modo", modo_campo)
+        if self.modo not in ("texto", "texto_unido"):
+            raise ErrorEspecificacion(f"Modo desconocido: {self.modo}")
+
+    def leer(self, arbol):
+        for nodo in self.compilado(arbol):
+            if self.atributos:
+                for atributo in self.atributos:
+                    valor = nodo.get(atributo)
+                    if valor:
+                        return valor
+                continue
+
+            if self.modo == "texto_unido":
+                valor = " ".join(t.strip() for t in nodo.itertext() if t.strip())
+            else:
+                valor = nodo.text_content().strip()
+            # Igual que BeautifulSoup: el primer nodo que calza decide
+            return valor or None
+        return None
+
+
+class _Campo:
+    def __init__(self, nombre: str, spec):
+        if isinstance(spec, (str, list)):
+            spec = {"selectores": spec if isinstance(spec, list) else [spec]}
+
+        self.nombre = nombre
+        modo = spec.get("modo", "texto")
+        self.selectores = [_Selector(s, modo) for s in spec.get("selectores", [])]
+        if not self.selectores:
+            raise ErrorEspecificacion(f"El campo {nombre} no tiene selectores")
+
+        self.post = []
+        for nombre_post in spec.get("post", []):
+            if nombre_post not in POST_PROCESADORES:
+                raise ErrorEspecificacion(f"Post-procesador desconocido: {nombre_post}")
+            self.post.append(POST_PROCESADORES[nombre_post])
+
+    def extraer(self, arbol, url: str):
+        valor = None
+        for selector in self.selectores:
+            valor = selector.leer(arbol)
+            if valor:
+                break
+        if valor is None:
+            return None
+
+        for post in self.post:
+            valor = post(valor, url)
+        return valor
+
+
+class EspecificacionExtraccion:
+    """Especificación compilada: se construye una vez y se reutiliza por página."""
+
+    def __init__(self, spec: dict, nombre: str = None):
+        self.nombre = nombre or spec.get("tienda") or "especificacion"
+        self.dominios = tuple(d.lower() for d in spec.get("dominios", ()))
+        self.requiere_navegador = bool(spec.get("requiere_navegador", False))
+        self.marca = spec.get("marca")
+        self.campos = [_Campo(n, s) for n, s in spec.get("campos", {}).items()]
+        if not self.campos:
+            raise ErrorEspecificacion(f"{self.nombre}: la especificación no define campos")
+
+        # Por defecto, los primeros selectores de nombre y precio validan la descarga HTTP
+        requeridos = spec.get("selectores_requeridos")
+        if requeridos is None:
+            requeridos = [c.selectores[0].css for c in self.campos if c.nombre in ("nombre", "precio")]
+        self.selectores_requeridos = tuple(requeridos)
+        self._requeridos = [CSSSelector(s) for s in self.selectores_requeridos]
+
+    @staticmethod
+    def parsear(html: str):
+        return lxml.html.fromstring(html)
+
+    def html_completo(self, html: str) -> bool:
+        arbol = self.parsear(html)
+        return all(sel(arbol) for sel in self._requeridos)
+
+    def extraer(self, html: str, url: str) -> dict:
+        arbol = self.parsear(html)
+        datos = {campo.nombre: campo.extraer(arbol, url) for campo in self.campos}
+        if self.marca and not datos.get("marca"):
+            datos["marca"] = self.marca
+        datos["url"] = url
+        return datos
+
+
+class EspecificacionListado:
+    """
+    Páginas de categoría/búsqueda: un selector por ítem y, dentro de cada
+    ítem, campos igual que en la ficha (al menos url y precio).
+
+        "listado": {
+          "categorias": ["https://tienda.cl/guitarras.html"],
+          "selector_item": ".products-grid .item",
+          "selector_siguiente": ".pages a.next",
+          "campos": {
+            "url": {"selectores": [{"css": "a", "atributo": "href"}], "post": ["url_absoluta"]},
+            "precio": [".special-price .price", ".price"],
+            "agotado": ".out-of-stock"
+          }
+        }
+    """
+
+    def __init__(self, spec: dict, nombre: str = "listado"):
+        self.nombre = nombre
+        self.categorias = tuple(spec.get("categorias", ()))
+        try:
+            self.items = CSSSelector(spec["selector_item"])
+            self.siguiente = CSSSelector(spec["selector_siguiente"]) if spec.get("selector_siguiente") else None
+        except KeyError as e:
+            raise ErrorEspecificacion(f"{nombre}: falta {e} en el listado") from e
+        self.campos = [_Campo(n, s) for n, s in spec.get("campos", {}).items()]
+        if not {"url", "precio"} <= {c.nombre for c in self.campos}:
+            raise ErrorEspecificacion(f"{nombre}: el listado necesita los campos url y precio")
+
+    def extraer(self, html: str, url: str):
+        """Devuelve ([{url, precio, ...}, ...], url de la página siguiente | None)."""
+        arbol = lxml.html.fromstring(html)
+        items = [
+            {campo.nombre: campo.extraer(item, url) for campo in self.campos}
+            for item in self.items(arbol)
+        ]
+
+        siguiente = None
+        if self.siguiente is not None:
+            enlaces = self.siguiente(arbol)
+            if enlaces and enlaces[0].get("href"):
+                siguiente = urljoin(url, enlaces[0].get("href"))
+        return items, siguiente
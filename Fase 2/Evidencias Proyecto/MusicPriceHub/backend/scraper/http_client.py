@@ -0,0 +1,78 @@
+# scraper/http_client.py
+"""
+Cliente HTTP liviano (requests + pool de conexiones) para páginas que
+no necesitan JavaScript. Es el primer nivel de descarga de BaseScraper.
+"""
+import os
+import threading
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TIMEOUT_HTTP = float(os.getenv("SCRAPER_TIMEOUT_HTTP", "15"))
+CONEXIONES_POR_HOST = int(os.getenv("SCRAPER_CONEXIONES_HTTP", "10"))
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "es-CL,es;q=0.9",
+}
+
+
+# status 304 → html es None (la página no cambió desde la última visita)
+# bytes: tamaño del cuerpo recibido (ya descomprimido)
+RespuestaHttp = namedtuple(
+    "RespuestaHttp", ["status", "html", "etag", "last_modified", "bytes"], defaults=(0,)
+)
+
+
+class HttpClient:
+    def __init__(self, timeout: float = TIMEOUT_HTTP):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=CONEXIONES_POR_HOST, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_html(self, url: str) -> str:
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def get_condicional(self, url: str, etag: str = None, last_modified: str = None) -> RespuestaHttp:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return RespuestaHttp(304, None, etag, last_modified)
+
+        response.raise_for_status()
+        return RespuestaHttp(
+            response.status_code,
+            response.text,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            len(response.content),
+        )
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = HttpClient()
+        return _cliente
@@ -0,0 +1,267 @@
+# scraper/imagenes.py
+"""
+Miniaturas locales de las imágenes de producto.
+
+El catálogo mostraba Producto.imagen_url directo desde la tienda: cada
+visita descargaba la foto original (a veces varios MB) desde un servidor
+ajeno. Aquí cada imagen se descarga UNA vez y se guardan miniaturas WebP
+(TAMANOS, por defecto 160/480/960 px de lado mayor) en
+    <DIRECTORIO_MEDIA>/productos/<sha256[:2]>/<sha256>-<tamaño>.webp
+donde sha256 es el hash de la imagen descargada: dos productos (o dos
+tiendas) con la misma foto comparten los archivos. La API las sirve como
+/media/productos/... y quedan en Producto.miniaturas ({"160": url, ...}).
+
+Producto.imagen_origen_url guarda la URL desde la que se generaron: un
+producto solo vuelve a descargarse cuando el scraper le cambia imagen_url.
+Las descargas y el redimensionado corren en un pool de IMAGENES_HILOS
+hilos (Pillow suelta el GIL al redimensionar y codificar), fuera del ciclo
+de scraping; el worker procesa a lo más IMAGENES_LOTE productos cada
+IMAGENES_CADA segundos.
+
+El worker y la API deben ver el mismo directorio de media
+(SCRAPER_MEDIA_DIR, por defecto backend/media).
+
+Uso (desde /backend):
+    python -m scraper.imagenes                # productos con imagen nueva o cambiada
+    python -m scraper.imagenes --limite 50
+    python -m scraper.imagenes --todas        # regenera aunque la URL no haya cambiado
+    python -m scraper.imagenes --limpiar      # borra miniaturas que ningún producto usa
+"""
+import argparse
+import hashlib
+import io
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+from PIL import Image, ImageOps
+from sqlalchemy import or_, update
+
+from database import SessionLocal
+from models import Producto
+from scraper.http_client import get_http_client
+
+IMAGENES_CADA = int(os.getenv("SCRAPER_IMAGENES_CADA", "600"))
+IMAGENES_HILOS = int(os.getenv("SCRAPER_IMAGENES_HILOS", "4"))
+IMAGENES_LOTE = int(os.getenv("SCRAPER_IMAGENES_LOTE", "200"))
+TAMANOS = tuple(int(t) for t in os.getenv("SCRAPER_MINIATURAS_TAMANOS", "160,480,960").split(","))
+CALIDAD_WEBP = int(os.getenv("SCRAPER_MINIATURAS_CALIDAD", "80"))
+MAXIMO_BYTES = int(os.getenv("SCRAPER_IMAGENES_MAXIMO_BYTES", str(15 * 1024 * 1024)))
+
+DIRECTORIO_MEDIA = Path(
+    os.getenv("SCRAPER_MEDIA_DIR") or Path(__file__).resolve().parent.parent / "media"
+)
+URL_MEDIA = "/media"
+
+# 4xx que no dicen nada de la imagen (timeout, límite de tasa): se reintentan
+HTTP_REINTENTABLES = (408, 429)
+
+
+class ImagenInvalida(ValueError):
+    """La URL no entrega una imagen usable; no vale la pena reintentar."""
+
+
+def _descargar(url: str) -> bytes:
+    cliente = get_http_client()
+    with cliente.session.get(
+        url, timeout=cliente.timeout, stream=True, headers={"Accept": "image/*"}
+    ) as response:
+        if 400 <= response.status_code < 500 and response.status_code not in HTTP_REINTENTABLES:
+            raise ImagenInvalida(f"HTTP {response.status_code}")
+        # 408 / 429 / 5xx → HTTPError: queda pendiente para la próxima vuelta
+        response.raise_for_status()
+
+        partes, total = [], 0
+        for parte in response.iter_content(64 * 1024):
+            total += len(parte)
+            if total > MAXIMO_BYTES:
+                raise ImagenInvalida(f"más de {MAXIMO_BYTES} bytes")
+            partes.append(parte)
+    return b"".join(partes)
+
+
+def _abrir(contenido: bytes):
+    imagen = Image.open(io.BytesIO(contenido))
+    # open() es perezoso: load() decodifica todo y destapa los archivos truncados
+    imagen.load()
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode not in ("RGB", "RGBA"):
+        imagen = imagen.convert("RGBA" if "A" in imagen.getbands() else "RGB")
+    return imagen
+
+
+def _webp(imagen, tamano: int) -> bytes:
+    miniatura = imagen.copy()
+    miniatura.thumbnail((tamano, tamano), Image.LANCZOS)
+    salida = io.BytesIO()
+    miniatura.save(salida, "WEBP", quality=CALIDAD_WEBP, method=4)
+    return salida.getvalue()
+
+
+def _escribir(ruta: Path, datos: bytes):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: la API nunca sirve un archivo a medias
+    temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.tmp")
+    temporal.write_bytes(datos)
+    os.replace(temporal, ruta)
+
+
+def generar(contenido: bytes, directorio: Path = None) -> dict:
+    """Miniaturas de `contenido` (las que falten); devuelve tamaño → URL pública."""
+    directorio = directorio or DIRECTORIO_MEDIA
+    sha = hashlib.sha256(contenido).hexdigest()
+    relativa = f"productos/{sha[:2]}"
+
+    imagen = None
+    miniaturas = {}
+    for tamano in TAMANOS:
+        nombre = f"{sha}-{tamano}.webp"
+        ruta = directorio / relativa / nombre
+        if ruta.exists():
+            # Se renueva la fecha para que limpiar() no la tome por huérfana
+            os.utime(ruta)
+        else:
+            # Todo lo que falle al decodificar o redimensionar es de la imagen
+            # (no es imagen, truncada, bomba de descompresión…): no se
+            # reintenta. Los errores de disco, en cambio, quedan pendientes.
+            try:
+                if imagen is None:
+                    imagen = _abrir(contenido)
+                datos = _webp(imagen, tamano)
+            except Exception as e:
+                raise ImagenInvalida(f"no se pudo procesar la imagen: {type(e).__name__}: {e}")
+            _escribir(ruta, datos)
+        miniaturas[str(tamano)] = f"{URL_MEDIA}/{relativa}/{nombre}"
+    return miniaturas
+
+
+def procesar(url: str) -> dict:
+    return generar(_descargar(url))
+
+
+def pendientes(db, limite: int = IMAGENES_LOTE, todas: bool = False) -> dict:
+    """imagen_url → [producto_id, ...] de los productos sin miniaturas al día."""
+    consulta = db.query(Producto.id, Producto.imagen_url).filter(
+        Producto.imagen_url.isnot(None),
+        Producto.imagen_url.like("http%"),
+    )
+    if not todas:
+        consulta = consulta.filter(
+            or_(Producto.imagen_origen_url.is_(None), Producto.imagen_origen_url != Producto.imagen_url)
+        )
+    por_url = {}
+    for producto_id, url in consulta.order_by(Producto.actualizado_en.desc()).limit(limite):
+        por_url.setdefault(url, []).append(producto_id)
+    return por_url
+
+
+def generar_miniaturas(db, limite: int = IMAGENES_LOTE, todas: bool = False, hilos: int = IMAGENES_HILOS) -> Counter:
+    por_url = pendientes(db, limite, todas)
+    resumen = Counter()
+    if not por_url:
+        return resumen
+
+    filas = []
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="miniaturas") as pool:
+        futuros = {pool.submit(procesar, url): url for url in por_url}
+        for futuro in as_completed(futuros):
+            url = futuros[futuro]
+            try:
+                miniaturas = futuro.result()
+                resumen["ok"] += 1
+            except ImagenInvalida as e:
+                # Queda marcada con la URL: no se reintenta hasta que cambie
+                print(f"⚠️ Imagen inválida {url}: {e}")
+                miniaturas = None
+                resumen["invalida"] += 1
+            except (requests.RequestException, OSError) as e:
+                # Error de red / disco: sigue pendiente para la próxima vuelta
+                print(f"❌ Error descargando imagen {url}: {e}")
+                resumen["error"] += 1
+                continue
+            except Exception as e:
+                # Cualquier otro error queda en esta imagen: el resto del lote se guarda
+                print(f"❌ Error inesperado con la imagen {url}: {type(e).__name__}: {e}")
+                resumen["error"] += 1
+                continue
+            filas.extend(
+                {"id": producto_id, "imagen_origen_url": url, "miniaturas": miniaturas}
+                for producto_id in por_url[url]
+            )
+
+    if filas:
+        db.execute(update(Producto), filas)
+        db.commit()
+    return resumen
+
+
+def limpiar(referenciadas: set, directorio: Path = None, antiguedad_minima: int = 86400) -> int:
+    """
+    Borra las miniaturas que ningún producto usa. Las más nuevas que
+    `antiguedad_minima` segundos se respetan: pueden ser de una vuelta que
+    todavía no hace commit.
+    """
+    directorio = (directorio or DIRECTORIO_MEDIA) / "productos"
+    if not directorio.exists():
+        return 0
+    limite = time.time() - antiguedad_minima
+    borradas = 0
+    for ruta in directorio.glob("*/*.webp"):
+        if ruta.name in referenciadas:
+            continue
+        try:
+            if ruta.stat().st_mtime < limite:
+                ruta.unlink()
+                borradas += 1
+        except FileNotFoundError:
+            pass
+    return borradas
+
+
+def limpiar_huerfanas(db) -> int:
+    referenciadas = {
+        url.rsplit("/", 1)[-1]
+        for (miniaturas,) in db.query(Producto.miniaturas).filter(Producto.miniaturas.isnot(None))
+        for url in miniaturas.values()
+    }
+    borradas = limpiar(referenciadas)
+    print(f"🧹 Miniaturas huérfanas borradas: {borradas}")
+    return borradas
+
+
+def actualizar_miniaturas(limite: int = IMAGENES_LOTE, todas: bool = False):
+    db = SessionLocal()
+    try:
+        resumen = generar_miniaturas(db, limite, todas)
+        if resumen:
+            print(f"🖼️ Miniaturas: {dict(resumen)}")
+        return resumen
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Miniaturas locales de las imágenes de producto")
+    parser.add_argument("--limite", type=int, default=IMAGENES_LOTE)
+    parser.add_argument("--todas", action="store_true", help="regenera aunque imagen_url no haya cambiado")
+    parser.add_argument("--limpiar", action="store_true", help="borra miniaturas que ningún producto usa")
+    args = parser.parse_args(argv)
+
+    if args.limpiar:
+        db = SessionLocal()
+        try:
+            limpiar_huerfanas(db)
+        finally:
+            db.close()
+        return
+    actualizar_miniaturas(args.limite, args.todas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# scraper/mantenimiento_scraping.py
+"""
+Mantenimiento de las tablas de auditoría del scraping (particionadas por día,
+ver migraciones/006_particiones_scraping.sql):
+
+  1. crea por adelantado las particiones de los próximos DIAS_ADELANTE días,
+  2. resume por tienda y día (operaciones.resumen_scraping_diario) los
+     resultados que vencen, si SCRAPER_RESUMEN_DIARIO está activo,
+  3. borra con DROP las particiones más antiguas que RETENCION_DIAS
+     (las tareas se guardan un día más que sus resultados).
+
+El worker lo ejecuta cada MANTENIMIENTO_CADA segundos; también se puede
+correr a mano (desde /backend):
+    python -m scraper.mantenimiento_scraping            # aplica
+    python -m scraper.mantenimiento_scraping --simular  # solo muestra
+"""
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from database import engine
+
+RETENCION_DIAS = int(os.getenv("SCRAPER_RETENCION_DIAS", "30"))
+DIAS_ADELANTE = int(os.getenv("SCRAPER_PARTICIONES_ADELANTE", "7"))
+RESUMEN_DIARIO = os.getenv("SCRAPER_RESUMEN_DIARIO", "1") not in ("0", "false", "no")
+MANTENIMIENTO_CADA = int(os.getenv("SCRAPER_MANTENIMIENTO_CADA", "3600"))
+
+ESQUEMA = "operaciones"
+# tabla → columna de partición
+TABLAS = {
+    "resultados_scraping": "obtenido_en",
+    "tareas_scraping": "inicio_en",
+}
+
+SQL_PARTICIONES = """
+SELECT c.relname AS nombre, pg_get_expr(c.relpartbound, c.oid) AS limites
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+JOIN pg_class p ON p.oid = i.inhparent
+JOIN pg_namespace n ON n.oid = p.relnamespace
+WHERE n.nspname = :esquema AND p.relname = :tabla
+"""
+
+SQL_RESUMIR = """
+INSERT INTO operaciones.resumen_scraping_diario AS d (
+    fecha, tienda_id, paginas, ok, errores, bytes_descargados,
+    descarga_ms_total, espera_render_ms_total, parseo_ms_total, bd_ms_total,
+    descarga_ms_p95
+)
+SELECT
+    r.obtenido_en::date,
+    ta.tienda_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE r.estado = 'ok'),
+    COUNT(*) FILTER (WHERE r.estado <> 'ok'),
+    COALESCE(SUM(r.bytes_descargados), 0),
+    COALESCE(SUM(r.descarga_ms), 0),
+    COALESCE(SUM(r.espera_render_ms), 0),
+    COALESCE(SUM(r.parseo_ms), 0),
+    COALESCE(SUM(r.bd_ms), 0),
+    percentile_disc(0.95) WITHIN GROUP (ORDER BY r.descarga_ms)
+FROM {origen} r
+JOIN operaciones.tareas_scraping ta ON ta.id = r.tarea_id
+WHERE r.obtenido_en < :hasta
+GROUP BY 1, 2
+ON CONFLICT (fecha, tienda_id) DO UPDATE SET
+    paginas = d.paginas + EXCLUDED.paginas,
+    ok = d.ok + EXCLUDED.ok,
+    errores = d.errores + EXCLUDED.errores,
+    bytes_descargados = d.bytes_descargados + EXCLUDED.bytes_descargados,
+    descarga_ms_total = d.descarga_ms_total + EXCLUDED.descarga_ms_total,
+    espera_render_ms_total = d.espera_render_ms_total + EXCLUDED.espera_render_ms_total,
+    parseo_ms_total = d.parseo_ms_total + EXCLUDED.parseo_ms_total,
+    bd_ms_total = d.bd_ms_total + EXCLUDED.bd_ms_total,
+    descarga_ms_p95 = GREATEST(d.descarga_ms_p95, EXCLUDED.descarga_ms_p95)
+"""
+
+_HASTA = re.compile(r"TO \('([^']+)'\)")
+
+
+def _particiones(conn, tabla: str) -> list:
+    """[(nombre, limite_superior | None), ...]; None para la partición DEFAULT."""
+    salida = []
+    for fila in conn.execute(text(SQL_PARTICIONES), {"esquema": ESQUEMA, "tabla": tabla}):
+        hasta = _HASTA.search(fila.limites or "")
+        salida.append((fila.nombre, datetime.fromisoformat(hasta.group(1)).date() if hasta else None))
+    return salida
+
+
+def asegurar_particiones(hoy: date, simular: bool = False) -> list:
+    creadas = []
+    for tabla in TABLAS:
+        for i in range(DIAS_ADELANTE + 1):
+            dia = hoy + timedelta(days=i)
+            nombre = f"{tabla}_p{dia:%Y%m%d}"
+            sql = (
+                f"CREATE TABLE IF NOT EXISTS {ESQUEMA}.{nombre} PARTITION OF {ESQUEMA}.{tabla} "
+                f"FOR VALUES FROM ('{dia}') TO ('{dia + timedelta(days=1)}')"
+            )
+            if simular:
+                creadas.append(nombre)
+                continue
+            try:
+                # Una transacción por partición: si una choca (p. ej. con filas
+                # en la partición DEFAULT) las demás se crean igual
+                with engine.begin() as conn:
+                    conn.execute(text(sql))
+                creadas.append(nombre)
+            except Exception as e:
+                print(f"⚠️ No se pudo crear {nombre}: {e}")
+    return creadas
+
+
+def _borrar_vencidas(conn, tabla: str, corte: date, resumir: bool, simular: bool) -> list:
+    borradas = []
+    columna = TABLAS[tabla]
+    for nombre, hasta in _particiones(conn, tabla):
+        if hasta is None:
+            # Partición DEFAULT: se limpia fila a fila (debería estar casi vacía)
+            if resumir and not simular:
+                conn.execute(text(SQL_RESUMIR.format(origen=f"{ESQUEMA}.{nombre}")), {"hasta": corte})
+            if not simular:
+                conn.execute(text(f"DELETE FROM {ESQUEMA}.{nombre} WHERE {columna} < :hasta"), {"hasta": corte})
+            continue
+        if hasta > corte:
+            continue
+        if resumir and not simular:
+            conn.execute(text(SQL_RESUMIR.format(origen=f"{ESQUEMA}.{nombre}")), {"hasta": hasta})
+        if not simular:
+            conn.execute(text(f"DROP TABLE {ESQUEMA}.{nombre}"))
+        borradas.append(nombre)
+    return borradas
+
+
+def aplicar_retencion(hoy: date, simular: bool = False) -> list:
+    corte = hoy - timedelta(days=RETENCION_DIAS)
+    with engine.begin() as conn:
+        # Primero los resultados (el resumen necesita sus tareas), después las tareas
+        borradas = _borrar_vencidas(conn, "resultados_scraping", corte, RESUMEN_DIARIO, simular)
+        borradas += _borrar_vencidas(conn, "tareas_scraping", corte - timedelta(days=1), False, simular)
+    return borradas
+
+
+def mantener(simular: bool = False):
+    hoy = datetime.utcnow().date()
+    creadas = asegurar_particiones(hoy, simular)
+    borradas = aplicar_retencion(hoy, simular)
+    prefijo = "🔎 (simulación) " if simular else "🧹 "
+    print(
+        f"{prefijo}Mantenimiento scraping: {len(creadas)} particiones aseguradas, "
+        f"{len(borradas)} borradas (retención {RETENCION_DIAS} días"
+        f"{', con resumen diario' if RESUMEN_DIARIO else ''})"
+    )
+    for nombre in borradas:
+        print(f"   - {nombre}")
+
+
+if __name__ == "__main__":
+    mantener(simular="--simular" in sys.argv)
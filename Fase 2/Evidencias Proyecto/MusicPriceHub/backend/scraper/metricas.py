@@ -0,0 +1,86 @@
+# scraper/metricas.py
+"""
+Tiempos por fase de cada página scrapeada.
+
+Fases:
+  - descarga_ms:       desde que se pide la página hasta tener el HTML
+                       (en el navegador incluye la espera de render)
+  - espera_render_ms:  parte de la descarga esperando selectores / render
+  - parseo_ms:         extraer_datos
+  - bd_ms:             sincronizar el ítem + su parte de la escritura del lote
+
+Cada página guarda su medición en su ResultadoScraping; la TareaScraping
+guarda el agregado de la corrida (incluye las páginas sin cambios y las
+fallidas, que no generan resultado).
+"""
+import math
+from collections import Counter
+
+FASES = ("descarga_ms", "espera_render_ms", "parseo_ms", "bd_ms")
+
+
+def ms_desde(inicio: float, fin: float) -> int:
+    return int(round((fin - inicio) * 1000))
+
+
+def _percentil(valores: list, p: float):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+class MedicionPagina:
+    __slots__ = ("nivel", "bytes", *FASES)
+
+    def __init__(self):
+        self.nivel = None
+        self.bytes = 0
+        for fase in FASES:
+            setattr(self, fase, None)
+
+    def columnas(self) -> dict:
+        """Valores para las columnas de ResultadoScraping."""
+        return {
+            "nivel_descarga": self.nivel,
+            "bytes_descargados": self.bytes,
+            **{fase: getattr(self, fase) for fase in FASES},
+        }
+
+
+class AcumuladorMetricas:
+    """Agregado de las mediciones de una corrida (por tienda)."""
+
+    def __init__(self):
+        self._fases = {fase: [] for fase in FASES}
+        self.niveles = Counter()
+        self.resultados = Counter()
+        self.bytes = 0
+
+    def agregar(self, medicion: MedicionPagina, resultado: str):
+        self.resultados[resultado] += 1
+        if medicion is None:
+            return
+        self.niveles[medicion.nivel or "sin_descarga"] += 1
+        self.bytes += medicion.bytes or 0
+        for fase in FASES:
+            valor = getattr(medicion, fase)
+            if valor is not None:
+                self._fases[fase].append(valor)
+
+    def resumen(self) -> dict:
+        return {
+            "paginas": sum(self.resultados.values()),
+            "resultados": dict(self.resultados),
+            "niveles": dict(self.niveles),
+            "bytes": self.bytes,
+            "fases": {
+                fase: {
+                    "total": sum(valores),
+                    "p50": _percentil(valores, 50),
+                    "p95": _percentil(valores, 95),
+                    "max": max(valores) if valores else None,
+                }
+                for fase, valores in self._fases.items()
+            },
+        }
@@ -0,0 +1,245 @@
+# scraper/motor.py
+"""
+Motor de scraping concurrente.
+
+Descarga muchas URLs a la vez (asyncio) respetando un tope global y un
+semáforo por dominio, y entrega cada resultado a guardar_en_bd del scraper
+correspondiente, que lo encola en el lote de la corrida
+(scraper/services/persistencia.py).
+
+Con una señal de apagado (scraper/senales.py) no se empiezan páginas
+nuevas: las que ya estaban en vuelo terminan y se guardan, y el resto
+vuelve a la cola.
+
+Dos etapas unidas por una cola acotada (COLA_PARSEO):
+  - descarga: niveles de BaseScraper (HTTP simple y, si no alcanza, el
+    BrowserPool compartido),
+  - parseo: pool de procesos (scraper/parseo.py), uno por núcleo.
+Si la cola se llena, las descargas esperan con su cupo tomado. La
+escritura en BD se hace en el hilo del motor, que es el dueño de la sesión
+SQLAlchemy.
+"""
+import asyncio
+import os
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse
+
+from scraper.browser_pool import POOL_PAGINAS
+from scraper.cola import INTERVALO_HEARTBEAT, renovar_arriendos
+from scraper.estadisticas import estadisticas_fetch
+from scraper.parseo import PROCESOS_PARSEO, cerrar_pool_parseo, get_pool_parseo, parsear
+from scraper.senales import detener
+from scraper.services.persistencia import LOTE_SEGUNDOS
+from scraper.services.indice_catalogo import IndiceCatalogo
+
+CONCURRENCIA_GLOBAL = int(os.getenv("SCRAPER_CONCURRENCIA", str(POOL_PAGINAS)))
+CONCURRENCIA_POR_DOMINIO = int(os.getenv("SCRAPER_CONCURRENCIA_DOMINIO", "2"))
+# Páginas descargadas esperando parser
+COLA_PARSEO = int(os.getenv("SCRAPER_COLA_PARSEO", str(max(8, 2 * PROCESOS_PARSEO))))
+
+
+def dominio_de(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class MotorScraping:
+    def __init__(
+        self,
+        concurrencia: int = CONCURRENCIA_GLOBAL,
+        por_dominio: int = CONCURRENCIA_POR_DOMINIO,
+        parseo_en_procesos: bool = True,
+    ):
+        self.concurrencia = concurrencia
+        self.por_dominio = por_dominio
+        self.parseo_en_procesos = parseo_en_procesos
+        self.resumen = Counter()
+
+        # Se crean dentro del loop en _ejecutar()
+        self._global = None
+        self._dominios = {}
+        self._cola = None
+        self._pool = None
+
+    def _semaforo_dominio(self, scraper, url: str) -> asyncio.Semaphore:
+        dominio = dominio_de(url)
+        if dominio not in self._dominios:
+            # Un scraper puede pedir un límite más bajo para su tienda
+            limite = getattr(scraper, "concurrencia_maxima", None) or self.por_dominio
+            self._dominios[dominio] = asyncio.Semaphore(limite)
+        return self._dominios[dominio]
+
+    async def _descargar(self, scraper, url: str):
+        # Primero el cupo del dominio y después el global: una tienda saturada
+        # no retiene cupos globales que podrían usar las demás
+        async with self._semaforo_dominio(scraper, url):
+            if detener.is_set():
+                self.resumen["interrumpido"] += 1
+                return
+            # Se pregunta ya con cupo: mientras esperaba, el circuito pudo abrirse
+            if not scraper.permite_descarga():
+                self.resumen["circuito_abierto"] += 1
+                scraper.marcar_postergado(url)
+                scraper.cerrar_medicion(url, "circuito_abierto")
+                return
+            async with self._global:
+                try:
+                    html = await scraper.obtener_html_async(url)
+                except Exception as e:
+                    print(f"❌ Error descargando {url}: {e}")
+                    self.resumen["error_descarga"] += 1
+                    scraper.registrar_descarga(ok=False)
+                    scraper.marcar_fallo(url)
+                    scraper.cerrar_medicion(url, "error_descarga")
+                    return
+                scraper.registrar_descarga(ok=True)
+
+                if html is None:
+                    scraper.marcar_sin_cambios(url)
+                    scraper.cerrar_medicion(url, "sin_cambios")
+                    self.resumen["sin_cambios"] += 1
+                    return
+
+                # Todavía con el cupo global: si los parsers van atrasados la
+                # cola se llena y no se empiezan descargas nuevas (contrapresión)
+                await self._cola.put((scraper, url, html))
+
+    async def _parsear(self, scraper, url: str, html: str) -> dict:
+        referencia = scraper.referencia_parseo() if self._pool is not None else None
+        if referencia is None:
+            return scraper.extraer_medido(html, url)
+        try:
+            datos, parseo_ms = await asyncio.get_running_loop().run_in_executor(
+                self._pool, parsear, referencia, html, url
+            )
+        except BrokenProcessPool:
+            # Murió un proceso de parseo: el resto de la corrida parsea aquí
+            print("⚠️ El pool de parseo se cayó; se sigue parseando en el hilo del motor")
+            cerrar_pool_parseo()
+            self._pool = None
+            return scraper.extraer_medido(html, url)
+        scraper.medicion(url).parseo_ms = parseo_ms
+        return datos
+
+    async def _consumir(self):
+        while True:
+            item = await self._cola.get()
+            if item is None:
+                return
+            scraper, url, html = item
+            try:
+                datos = await self._parsear(scraper, url, html)
+            except Exception as e:
+                print(f"❌ Error parseando {url}: {e}")
+                self.resumen["error_parseo"] += 1
+                scraper.marcar_fallo(url)
+                scraper.cerrar_medicion(url, "error_parseo")
+                continue
+            try:
+                self._guardar(scraper, url, datos)
+            except Exception as e:
+                # Un consumidor que muere dejaría la cola llena y las descargas trabadas
+                print(f"❌ Error guardando {url}: {e}")
+                self.resumen["error"] += 1
+                scraper.marcar_fallo(url)
+
+    def _guardar(self, scraper, url: str, datos: dict):
+        if not datos:
+            print(f"❌ El scraper no devolvió datos para {url}")
+            self.resumen["sin_datos"] += 1
+            scraper.marcar_fallo(url)
+            scraper.cerrar_medicion(url, "sin_datos")
+            return
+
+        if scraper.sin_cambios(datos):
+            scraper.marcar_sin_cambios(url)
+            scraper.cerrar_medicion(url, "sin_cambios")
+            self.resumen["sin_cambios"] += 1
+            return
+
+        # Se encola en el lote de la corrida; el resultado final sale de la persistencia
+        scraper.guardar_en_bd(datos)
+
+    async def _vaciar_lotes_vencidos(self, scrapers):
+        # Si las descargas se frenan, los lotes igual se escriben cada LOTE_SEGUNDOS.
+        # Las páginas sin cambios también se confirman con esa frecuencia: si
+        # el proceso muere, lo ya confirmado no se repite
+        ultima_confirmacion = asyncio.get_running_loop().time()
+        while True:
+            await asyncio.sleep(1)
+            for scraper in scrapers:
+                if scraper.persistencia is not None:
+                    scraper.persistencia.flush_si_vencido()
+            if asyncio.get_running_loop().time() - ultima_confirmacion >= LOTE_SEGUNDOS:
+                for scraper in scrapers:
+                    scraper.confirmar_sin_cambios()
+                ultima_confirmacion = asyncio.get_running_loop().time()
+
+    async def _renovar_arriendos(self):
+        # Mientras la corrida siga viva, ningún otro worker toma sus URLs
+        while True:
+            await asyncio.sleep(INTERVALO_HEARTBEAT)
+            try:
+                await asyncio.to_thread(renovar_arriendos)
+            except Exception as e:
+                print("⚠️ No se pudieron renovar los arriendos:", e)
+
+    async def _ejecutar(self, trabajos, scrapers):
+        self._global = asyncio.Semaphore(self.concurrencia)
+        self._dominios = {}
+        self._cola = asyncio.Queue(maxsize=COLA_PARSEO)
+        self._pool = get_pool_parseo() if self.parseo_en_procesos else None
+
+        # Sin pool, un consumidor basta: el parseo bloquea el loop de todos modos
+        consumidores = [
+            asyncio.create_task(self._consumir())
+            for _ in range(PROCESOS_PARSEO if self._pool is not None else 1)
+        ]
+        vigilantes = [
+            asyncio.create_task(self._vaciar_lotes_vencidos(scrapers)),
+            asyncio.create_task(self._renovar_arriendos()),
+        ]
+        try:
+            await asyncio.gather(*(self._descargar(scraper, url) for scraper, url in trabajos))
+            # Descargas terminadas: los parsers vacían la cola y se detienen
+            for _ in consumidores:
+                await self._cola.put(None)
+            await asyncio.gather(*consumidores)
+        finally:
+            for tarea in vigilantes + consumidores:
+                tarea.cancel()
+
+    def ejecutar(self, trabajos, precargar_indice: bool = True) -> Counter:
+        """
+        trabajos: iterable de (scraper, url).
+        Devuelve un Counter con el resultado de cada URL.
+        Con precargar_indice=False (pocas URLs) las identidades se resuelven
+        con consultas indexadas en vez de cargar el índice del catálogo.
+        """
+        self.resumen = Counter()
+        trabajos = list(trabajos)
+        scrapers = list({id(s): s for s, _ in trabajos}.values())
+
+        # Identidades del catálogo precargadas una vez para toda la corrida
+        indice = None
+        if scrapers and precargar_indice:
+            indice = IndiceCatalogo.cargar(scrapers[0].db, {s.tienda.id for s in scrapers})
+
+        for scraper in scrapers:
+            scraper.iniciar_corrida(indice=indice)
+        try:
+            asyncio.run(self._ejecutar(trabajos, scrapers))
+        finally:
+            for scraper in scrapers:
+                # Escribe el último lote y cierra la TareaScraping de la corrida
+                self.resumen.update(scraper.finalizar_corrida())
+                # Un solo UPDATE por scraper para todo lo que no cambió
+                scraper.confirmar_sin_cambios()
+                # Lo que falló vuelve a la cola con espera de reintento
+                scraper.liberar_fallidos()
+                # Estado del circuito de la tienda + lo que no se intentó por él
+                scraper.cerrar_circuito()
+        print(f"📊 Resumen scraping: {dict(self.resumen)}")
+        print(f"📊 Descargas por tienda: {estadisticas_fetch.resumen()}")
+        return self.resumen
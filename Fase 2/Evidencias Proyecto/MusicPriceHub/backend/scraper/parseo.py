@@ -0,0 +1,81 @@
+# scraper/parseo.py
+"""
+Pool de procesos para parsear HTML.
+
+Extraer los datos de una página (lxml / BeautifulSoup) es CPU puro; en el
+hilo del motor ocupa un solo núcleo y frena también las descargas. El motor
+entrega el HTML descargado a este pool (PROCESOS_PARSEO procesos, por
+defecto uno por núcleo) y sigue descargando; el resultado vuelve al hilo
+del motor, que es el único que toca la BD.
+
+Cada proceso recrea el scraper a partir de su referencia_parseo()
+("modulo:Clase" o "especificacion:<archivo>") sin tienda ni sesión de BD,
+igual que el benchmark: extraer_datos solo debe depender del HTML y la URL.
+Con SCRAPER_PROCESOS_PARSEO=0 se parsea en el hilo del motor, como antes.
+"""
+import atexit
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scraper.metricas import ms_desde
+
+PROCESOS_PARSEO = int(os.getenv("SCRAPER_PROCESOS_PARSEO", str(os.cpu_count() or 1)))
+
+# Instancias ya creadas en este proceso de parseo
+_scrapers = {}
+
+
+def _scraper(referencia: str):
+    if referencia not in _scrapers:
+        tipo, _, nombre = referencia.partition(":")
+        if tipo == "especificacion":
+            from scraper.declarativo import scraper_declarativo
+            clase = scraper_declarativo(nombre)
+        else:
+            clase = importlib.import_module(tipo)
+            for parte in nombre.split("."):
+                clase = getattr(clase, parte)
+        _scrapers[referencia] = clase(tienda=None, db=None)
+    return _scrapers[referencia]
+
+
+def parsear(referencia: str, html: str, url: str):
+    """Se ejecuta en el proceso de parseo. Devuelve (datos, parseo_ms)."""
+    inicio = time.perf_counter()
+    datos = _scraper(referencia).extraer_datos(html, url)
+    return datos, ms_desde(inicio, time.perf_counter())
+
+
+# ============================
+# Pool compartido del proceso
+# ============================
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool_parseo():
+    """ProcessPoolExecutor compartido, o None si el parseo va en el hilo del motor."""
+    global _pool
+    if PROCESOS_PARSEO <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: el proceso padre tiene hilos (Chromium, HTTP); fork los copiaría a medias
+            _pool = ProcessPoolExecutor(
+                max_workers=PROCESOS_PARSEO,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(cerrar_pool_parseo)
+        return _pool
+
+
+def cerrar_pool_parseo():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,97 @@
+# scraper/planificador.py
+"""
+Ciclo de scraping multi-tienda.
+
+Arrienda de la cola (scraper/cola.py) un lote de URLs vencidas según la
+agenda adaptativa (scraper/agenda.py) de todas las tiendas que tienen un
+scraper registrado y las entrega al
+MotorScraping intercaladas (tienda A, tienda B, tienda C, A, B, C...), de
+modo que una tienda con miles de URLs no deja esperando a las demás.
+Varios workers pueden ejecutar ciclos a la vez sin repetir URLs.
+
+Las tiendas con el circuito abierto (scraper/circuito.py) se saltan; las
+que cumplieron su espera entran solo con unas pocas URLs de sonda.
+"""
+from collections import defaultdict
+from itertools import chain, zip_longest
+
+from database import SessionLocal
+from models import Tienda
+from scraper.circuito import SONDAS, cargar_circuitos
+from scraper.cola import arrendar_lote, liberar_todo
+from scraper.motor import MotorScraping
+from scraper.registro import scraper_para
+
+_HUECO = object()
+
+
+def intercalar(grupos) -> list:
+    """[[a1, a2, a3], [b1], [c1, c2]] → [a1, b1, c1, a2, c2, a3]"""
+    return [t for t in chain.from_iterable(zip_longest(*grupos, fillvalue=_HUECO)) if t is not _HUECO]
+
+
+def preparar_trabajos(db, tiendas, productos_tienda, circuitos: dict = None) -> list:
+    """
+    Crea un scraper por tienda y devuelve la lista intercalada de
+    (scraper, url) para el motor.
+    """
+    por_tienda = defaultdict(list)
+    for tp in productos_tienda:
+        por_tienda[tp.tienda_id].append(tp)
+
+    grupos = []
+    for tienda in tiendas:
+        productos = por_tienda.get(tienda.id)
+        if not productos:
+            continue
+
+        clase = scraper_para(tienda)
+        if clase is None:
+            print(f"⚠️ Sin scraper registrado para {tienda.nombre} ({tienda.sitio_web or tienda.url})")
+            continue
+
+        scraper = clase(tienda=tienda, db=db)
+        scraper.circuito = (circuitos or {}).get(tienda.id)
+        scraper.preparar_estados(productos)
+        grupos.append([(scraper, tp.url_producto) for tp in productos])
+        print(f"🏪 {tienda.nombre}: {len(productos)} URLs ({clase.__name__})")
+
+    return intercalar(grupos)
+
+
+def ejecutar_ciclo():
+    db = SessionLocal()
+    try:
+        # Solo tiendas con scraper: las demás no deben ocupar cupo de la agenda
+        tiendas = [t for t in db.query(Tienda).all() if scraper_para(t)]
+        circuitos = cargar_circuitos(db, tiendas)
+
+        abiertas = [t for t in tiendas if circuitos[t.id].estado == "abierto"]
+        for tienda in abiertas:
+            print(f"🔌 {tienda.nombre}: circuito abierto hasta {circuitos[tienda.id].abierto_hasta}, se salta")
+
+        arrendados = arrendar_lote(db, [t.id for t in tiendas if circuitos[t.id].estado == "cerrado"])
+        for tienda in tiendas:
+            if circuitos[tienda.id].estado == "semiabierto":
+                print(f"🔌 {tienda.nombre}: circuito semiabierto, {SONDAS} URLs de sonda")
+                arrendados += arrendar_lote(db, [tienda.id], limite=SONDAS)
+
+        trabajos = preparar_trabajos(db, tiendas, arrendados, circuitos)
+        if not trabajos:
+            print("💤 No hay URLs vencidas en tiendas con scraper registrado.")
+            return
+
+        MotorScraping().ejecutar(trabajos)
+        print("\n✅ Ciclo de scraping finalizado.")
+
+    finally:
+        # Lo que quedó tomado sin procesar (p. ej. ciclo interrumpido) vuelve a la cola
+        try:
+            liberar_todo()
+        except Exception as e:
+            print("⚠️ No se pudieron liberar los arriendos:", e)
+        db.close()
+
+
+if __name__ == "__main__":
+    ejecutar_ciclo()
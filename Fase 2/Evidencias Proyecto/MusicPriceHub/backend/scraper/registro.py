@@ -0,0 +1,74 @@
+# scraper/registro.py
+"""
+Registro de scrapers por tienda.
+
+Cada scraper se declara para uno o más dominios:
+
+    @registrar_scraper("fender.cl")
+    class FenderScraper(BaseScraper):
+        ...
+
+y scraper_para(tienda) devuelve la clase que corresponde al dominio de
+tienda.sitio_web (o tienda.url). Agregar una tienda = agregar una
+especificación JSON en scraper/especificaciones/ (scraper/declarativo.py)
+o, si necesita lógica propia, un módulo en scraper/tiendas/. Un módulo
+registrado para el mismo dominio tiene prioridad sobre la especificación.
+"""
+import importlib
+import pkgutil
+
+from scraper.motor import dominio_de
+
+_REGISTRO = {}
+_cargado = False
+
+
+def registrar_scraper(*dominios):
+    def decorador(clase):
+        for dominio in dominios:
+            _REGISTRO[dominio.lower()] = clase
+        return clase
+    return decorador
+
+
+def cargar_scrapers():
+    """Registra las especificaciones JSON y luego los módulos de scraper/tiendas."""
+    global _cargado
+    if _cargado:
+        return
+    from scraper.declarativo import especificaciones_disponibles, scraper_declarativo
+
+    for archivo in especificaciones_disponibles():
+        clase = scraper_declarativo(archivo)
+        registrar_scraper(*(clase.especificacion.dominios or (archivo,)))(clase)
+
+    import scraper.tiendas as paquete
+
+    for modulo in pkgutil.iter_modules(paquete.__path__):
+        importlib.import_module(f"{paquete.__name__}.{modulo.name}")
+    _cargado = True
+
+
+def scraper_para_dominio(dominio: str):
+    cargar_scrapers()
+    # También calza subdominios: tienda.fender.cl → fender.cl
+    while dominio:
+        if dominio in _REGISTRO:
+            return _REGISTRO[dominio]
+        _, _, dominio = dominio.partition(".")
+    return None
+
+
+def scraper_para(tienda):
+    for url in (tienda.sitio_web, tienda.url):
+        if not url:
+            continue
+        clase = scraper_para_dominio(dominio_de(url))
+        if clase is not None:
+            return clase
+    return None
+
+
+def dominios_registrados() -> dict:
+    cargar_scrapers()
+    return {dominio: clase.__name__ for dominio, clase in _REGISTRO.items()}
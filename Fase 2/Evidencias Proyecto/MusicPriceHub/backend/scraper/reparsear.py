@@ -0,0 +1,165 @@
+# scraper/reparsear.py
+"""
+Re-extracción desde los snapshots guardados (scraper/snapshots.py).
+
+Toma el último snapshot de cada URL activa de la tienda, vuelve a correr
+extraer_datos en paralelo (un proceso por núcleo, igual que el motor) y
+guarda con la persistencia normal de la corrida lo que cambió: producto,
+oferta, historial y un ResultadoScraping por página. Las páginas cuya
+extracción da lo mismo que la guardada se saltan.
+
+Oferta e historial se guardan con la fecha del snapshot (snapshot_en), no
+la de hoy. La agenda, el arriendo de la cola y los validadores HTTP de la
+URL no se tocan: no hubo descarga.
+
+Uso (desde /backend):
+    python -m scraper.reparsear --tienda fender.cl                 # re-extrae y guarda
+    python -m scraper.reparsear --tienda fender.cl --simular       # solo cuenta cambios
+    python -m scraper.reparsear --tienda fender.cl --desde 2026-10-01
+    python -m scraper.reparsear --limpiar                          # borra snapshots huérfanos
+"""
+import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from database import SessionLocal
+from models import EstadoScrapingProducto, Tienda, TiendaProducto
+from scraper.motor import dominio_de
+from scraper.parseo import PROCESOS_PARSEO, parsear
+from scraper.registro import scraper_para
+from scraper.services.indice_catalogo import IndiceCatalogo
+from scraper.snapshots import leer, limpiar
+
+
+def extraer_snapshot(referencia: str, sha: str, url: str):
+    """Se ejecuta en el proceso de parseo: lee el snapshot y extrae."""
+    return parsear(referencia, leer(sha), url)[0]
+
+
+def _con_snapshot(db, tienda, desde: datetime = None) -> list:
+    consulta = (
+        db.query(TiendaProducto, EstadoScrapingProducto.snapshot_hash, EstadoScrapingProducto.snapshot_en)
+        .join(EstadoScrapingProducto, EstadoScrapingProducto.tienda_producto_id == TiendaProducto.id)
+        .filter(
+            TiendaProducto.tienda_id == tienda.id,
+            TiendaProducto.activo.is_(True),
+            EstadoScrapingProducto.snapshot_hash.isnot(None),
+        )
+    )
+    if desde is not None:
+        consulta = consulta.filter(EstadoScrapingProducto.snapshot_en >= desde)
+    return consulta.all()
+
+
+def _extracciones(scraper, filas, procesos: int):
+    """(tp, datos | Exception) en el mismo orden de `filas`."""
+    referencia = scraper.referencia_parseo()
+    if referencia is None or procesos <= 1:
+        for tp, sha, _ in filas:
+            try:
+                yield tp, scraper.extraer_datos(leer(sha), tp.url_producto)
+            except Exception as e:
+                yield tp, e
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futuros = [
+            pool.submit(extraer_snapshot, referencia, sha, tp.url_producto)
+            for tp, sha, _ in filas
+        ]
+        for (tp, _, _), futuro in zip(filas, futuros):
+            try:
+                yield tp, futuro.result()
+            except Exception as e:
+                yield tp, e
+
+
+def reparsear_tienda(db, tienda, desde: datetime = None, simular: bool = False, procesos: int = PROCESOS_PARSEO):
+    clase = scraper_para(tienda)
+    if clase is None:
+        print(f"⏭️ {tienda.nombre}: sin scraper registrado")
+        return None
+
+    filas = _con_snapshot(db, tienda, desde)
+    if not filas:
+        print(f"⏭️ {tienda.nombre}: no hay snapshots")
+        return None
+
+    scraper = clase(tienda=tienda, db=db)
+    scraper.preparar_estados([tp for tp, _, _ in filas])
+    scraper.reparseo = {tp.url_producto: snapshot_en for tp, _, snapshot_en in filas}
+    if not simular:
+        scraper.iniciar_corrida(
+            detalle=f"Re-parseo de snapshots {tienda.nombre}",
+            indice=IndiceCatalogo.cargar(db, [tienda.id]),
+        )
+
+    resumen = Counter()
+    try:
+        for tp, datos in _extracciones(scraper, filas, procesos):
+            if isinstance(datos, Exception):
+                print(f"❌ Error re-parseando {tp.url_producto}: {datos}")
+                resumen["error_parseo"] += 1
+            elif not datos:
+                resumen["sin_datos"] += 1
+            elif scraper.sin_cambios(datos):
+                resumen["sin_cambios"] += 1
+            else:
+                resumen["cambios"] += 1
+                if not simular:
+                    scraper.guardar_en_bd(datos)
+    finally:
+        if not simular:
+            resumen.update({f"guardado_{k}": v for k, v in scraper.finalizar_corrida().items()})
+
+    prefijo = "🔎 (simulación) " if simular else "♻️ "
+    print(f"{prefijo}{tienda.nombre}: {len(filas)} snapshots → {dict(resumen)}")
+    return resumen
+
+
+def limpiar_huerfanos(db) -> int:
+    referenciados = {
+        sha for (sha,) in db.query(EstadoScrapingProducto.snapshot_hash)
+        .filter(EstadoScrapingProducto.snapshot_hash.isnot(None))
+    }
+    borrados = limpiar(referenciados)
+    print(f"🧹 Snapshots huérfanos borrados: {borrados}")
+    return borrados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-extracción desde snapshots de HTML")
+    parser.add_argument("--tienda", help="dominio o nombre de la tienda")
+    parser.add_argument("--desde", type=datetime.fromisoformat, help="solo snapshots desde esta fecha")
+    parser.add_argument("--simular", action="store_true")
+    parser.add_argument("-j", "--procesos", type=int, default=PROCESOS_PARSEO)
+    parser.add_argument("--limpiar", action="store_true", help="borra snapshots que ninguna URL apunta")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.limpiar:
+            limpiar_huerfanos(db)
+            return
+
+        tiendas = db.query(Tienda).all()
+        if args.tienda:
+            filtro = args.tienda.lower()
+            tiendas = [
+                t for t in tiendas
+                if filtro in (t.nombre or "").lower()
+                or filtro == dominio_de(t.sitio_web or t.url or "")
+            ]
+        for tienda in tiendas:
+            try:
+                reparsear_tienda(db, tienda, args.desde, args.simular, args.procesos)
+            except Exception as e:
+                print(f"❌ Error re-parseando {tienda.nombre}: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ from database import SessionLocal
 from models import Tienda
 from scraper.tiendas.fender_scraper import FenderScraper
 
+# Con SCRAPER_CORPUS=scraper/corpus la página se sirve desde el corpus grabado
+# (python -m scraper.benchmark --grabar URL) en vez de descargarse.
 URL_PRUEBA = "https://www.fender.cl/fender-telecasterr-luxe-american-ultra-3697.html"
 
 
@@ -24,10 +26,10 @@ def test():
         scraper = FenderScraper(tienda=tienda, db=db)
 
         # 3) Ejecutar pipeline completo
-        producto = scraper.run(URL_PRUEBA)
+        producto_id = scraper.run(URL_PRUEBA)
 
-        if producto:
-            print("✅ Producto sincronizado:", producto.id)
+        if producto_id:
+            print("✅ Producto sincronizado:", producto_id)
         else:
             print("❌ No se pudo sincronizar el producto")
 
@@ -1,7 +1,15 @@
 # scraper/run_scraping_scheduled.py
+"""
+Corrida completa de Fender (todas las URLs activas, sin pasar por la agenda).
 
+Es retomable: si se interrumpe (SIGTERM, reinicio del contenedor), la
+siguiente ejecución sigue con las URLs que faltaban (scraper/checkpoint.py).
+"""
 from database import SessionLocal
-from models import Tienda, TiendaProducto
+from models import Tienda
+from scraper.checkpoint import abrir_checkpoint, cerrar_checkpoint, pendientes
+from scraper.motor import MotorScraping
+from scraper.senales import detener, instalar_manejadores
 from scraper.tiendas.fender_scraper import FenderScraper
 
 
@@ -19,30 +27,31 @@ def scrapear_productos_fender():
             print("❌ No se encontró la tienda Fender en la BD.")
             return
 
-        # 2) Obtener todos los productos activos de esa tienda
-        productos_tienda = (
-            db.query(TiendaProducto)
-            .filter(
-                TiendaProducto.tienda_id == tienda.id,
-                TiendaProducto.activo.is_(True),
-            )
-            .all()
-        )
+        # 2) Productos activos de esa tienda que faltan en esta corrida
+        clave = f"programado:{tienda.id}"
+        desde, retomada = abrir_checkpoint(db, clave)
+        productos_tienda = pendientes(db, tienda.id, desde)
+
+        if retomada:
+            print(f"⏯️ Retomando la corrida iniciada el {desde}: faltan {len(productos_tienda)} productos")
 
         if not productos_tienda:
-            print("⚠️ No hay productos activos asociados a Fender.")
+            print("⚠️ No hay productos activos pendientes en Fender.")
+            cerrar_checkpoint(db, clave)
             return
 
         # 3) Instanciar scraper
         scraper = FenderScraper(tienda=tienda, db=db)
+        scraper.preparar_estados(productos_tienda)
 
-        # 4) Recorrer cada URL y ejecutar el pipeline
-        for tp in productos_tienda:
-            print("\n===============================")
-            print(f"Scrapeando producto: {tp.url_producto}")
-            print("===============================")
-            scraper.run(tp.url_producto)
+        # 4) Descargar todas las URLs en paralelo y ejecutar el pipeline
+        print(f"Scrapeando {len(productos_tienda)} productos...")
+        MotorScraping().ejecutar((scraper, tp.url_producto) for tp in productos_tienda)
 
+        if detener.is_set():
+            print("\n⏸️ Scraping programado interrumpido: se retoma en la próxima ejecución.")
+            return
+        cerrar_checkpoint(db, clave)
         print("\n✅ Scraping programado finalizado.")
 
     finally:
@@ -50,4 +59,5 @@ def scrapear_productos_fender():
 
 
 if __name__ == "__main__":
+    instalar_manejadores()
     scrapear_productos_fender()
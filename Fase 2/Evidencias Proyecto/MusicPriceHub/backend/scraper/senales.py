@@ -0,0 +1,27 @@
+# scraper/senales.py
+"""
+Apagado ordenado del scraping (SIGTERM de Docker / Ctrl+C).
+
+La primera señal solo pide detenerse: el motor no empieza páginas nuevas,
+termina las que están en vuelo, escribe los lotes pendientes y devuelve a
+la cola lo que no alcanzó a procesar. Una segunda señal corta de inmediato.
+"""
+import signal
+import threading
+
+detener = threading.Event()
+
+
+def _manejar(signum, frame):
+    if detener.is_set():
+        raise KeyboardInterrupt
+    print(f"🛑 Señal {signal.Signals(signum).name}: se terminan las páginas en curso y se detiene el scraping")
+    detener.set()
+
+
+def instalar_manejadores():
+    # Solo se puede desde el hilo principal
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for senal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(senal, _manejar)
@@ -1,7 +1,10 @@
 # scraper/services/catalogo_service.py
 import uuid
 from datetime import datetime
+from sqlalchemy import text, insert, update
 from models import Producto, OfertaActual, HistorialPrecio, Tienda, TiendaProducto
+from utils.mejores_precios import recalcular as recalcular_mejores_precios
+from utils.texto import normalizar_nombre
 
 
 def precio_a_centavos(precio_str: str):
@@ -10,6 +13,9 @@ def precio_a_centavos(precio_str: str):
     """
     if not precio_str:
         return None
+    if isinstance(precio_str, int):
+        # Ya convertido por la especificación de extracción
+        return precio_str
 
     limpio = (
         precio_str.replace("$", "")
@@ -25,13 +31,143 @@ def precio_a_centavos(precio_str: str):
         return None
 
 
-def sync_producto_desde_scraping(db, tienda: Tienda, datos: dict):
+def disponibilidad_de(datos: dict) -> str:
+    """
+    "agotado" si la página marcó el producto sin stock (campo "agotado" de la
+    especificación). Ficha y listado usan la misma regla: si no, la cosecha
+    y el scraping de la ficha se pisarían en cada vuelta.
+    """
+    return "agotado" if datos.get("agotado") else "disponible"
+
+
+class LoteCatalogo:
+    """
+    Escrituras de ofertas/historial acumuladas para ejecutarse en bloque
+    (INSERT multi-fila y UPDATE por clave primaria) en vez de fila a fila.
+
+    Se indexan por tienda_producto_id (o producto_id): si la misma URL
+    aparece dos veces en un lote, gana la última.
+    """
+
+    def __init__(self):
+        self.productos_actualizados = {}
+        self.tienda_productos_vinculados = {}
+        self.ofertas_nuevas = {}
+        self.ofertas_actualizadas = {}
+        self.historial_nuevo = {}
+        self.historial_confirmado = {}
+        # Productos cuya fila de precios.mejores_precios hay que recalcular
+        self.productos_con_ofertas = set()
+
+    def __len__(self):
+        return (
+            len(self.productos_actualizados)
+            + len(self.tienda_productos_vinculados)
+            + len(self.ofertas_nuevas)
+            + len(self.ofertas_actualizadas)
+            + len(self.historial_nuevo)
+            + len(self.historial_confirmado)
+        )
+
+    def extender(self, otro: "LoteCatalogo"):
+        self.productos_actualizados.update(otro.productos_actualizados)
+        self.tienda_productos_vinculados.update(otro.tienda_productos_vinculados)
+        self.ofertas_nuevas.update(otro.ofertas_nuevas)
+        self.ofertas_actualizadas.update(otro.ofertas_actualizadas)
+        self.historial_nuevo.update(otro.historial_nuevo)
+        self.historial_confirmado.update(otro.historial_confirmado)
+        self.productos_con_ofertas.update(otro.productos_con_ofertas)
+
+    def aplicar(self, db):
+        if self.productos_actualizados:
+            db.execute(update(Producto), list(self.productos_actualizados.values()))
+        if self.tienda_productos_vinculados:
+            db.execute(update(TiendaProducto), list(self.tienda_productos_vinculados.values()))
+        if self.ofertas_nuevas:
+            db.execute(insert(OfertaActual), list(self.ofertas_nuevas.values()))
+        if self.ofertas_actualizadas:
+            db.execute(update(OfertaActual), list(self.ofertas_actualizadas.values()))
+        if self.productos_con_ofertas:
+            recalcular_mejores_precios(db, self.productos_con_ofertas)
+        if self.historial_nuevo:
+            db.execute(insert(HistorialPrecio), list(self.historial_nuevo.values()))
+        if self.historial_confirmado:
+            db.execute(update(HistorialPrecio), list(self.historial_confirmado.values()))
+
+
+# -----------------------------
+# Resolución de identidades
+# (índice en memoria si hay corrida; si no, consultas indexadas)
+# -----------------------------
+def _buscar_producto(db, nombre_normalizado: str, indice):
+    if indice is not None:
+        return indice.producto(nombre_normalizado)
+    fila = (
+        db.query(Producto.id, Producto.imagen_url)
+        .filter(Producto.nombre_normalizado == nombre_normalizado)
+        .first()
+    )
+    return (fila.id, fila.imagen_url) if fila else (None, None)
+
+
+def _buscar_tienda_producto(db, tienda_id, url: str, indice):
+    """Devuelve (tienda_producto_id, producto_id) o (None, None)."""
+    if indice is not None:
+        return indice.tienda_producto(tienda_id, url)
+    fila = (
+        db.query(TiendaProducto.id, TiendaProducto.producto_id)
+        .filter(
+            TiendaProducto.tienda_id == tienda_id,
+            TiendaProducto.url_producto == url
+        )
+        .first()
+    )
+    return (fila.id, fila.producto_id) if fila else (None, None)
+
+
+def _buscar_oferta(db, tienda_producto_id, indice):
+    if indice is not None:
+        return indice.oferta(tienda_producto_id)
+    fila = (
+        db.query(OfertaActual.id)
+        .filter(OfertaActual.tienda_producto_id == tienda_producto_id)
+        .first()
+    )
+    return fila.id if fila else None
+
+
+def _ultimo_historial(db, tienda_producto_id, indice):
+    if indice is not None:
+        return indice.ultimo_historial(tienda_producto_id)
+    fila = (
+        db.query(HistorialPrecio.id, HistorialPrecio.precio_centavos, HistorialPrecio.disponibilidad)
+        .filter(HistorialPrecio.tienda_producto_id == tienda_producto_id)
+        .order_by(HistorialPrecio.valido_desde.desc().nulls_last())
+        .first()
+    )
+    return tuple(fila) if fila else None
+
+
+def sync_producto_desde_scraping(
+    db, tienda: Tienda, datos: dict, lote: LoteCatalogo = None, indice=None, ahora: datetime = None,
+):
     """
     1. Crear o actualizar producto
     2. Registrar tienda-producto (si no existe)
     3. Registrar oferta actual
     4. Registrar historial de precios
+
+    Las escrituras de 3 y 4 se acumulan en `lote`; si no se entrega uno,
+    se ejecutan de inmediato. Con `indice` (IndiceCatalogo) los productos
+    ya conocidos no generan ninguna consulta. `ahora` es la fecha a la que
+    valen los datos (por defecto, este momento).
+
+    Devuelve el id del producto, o None si los datos no traen nombre. Sin un
+    precio válido lanza ValueError.
     """
+    aplicar_al_final = lote is None
+    # LoteCatalogo define __len__: un lote vacío es falso y no hay que reemplazarlo
+    lote = lote if lote is not None else LoteCatalogo()
 
     nombre = datos.get("nombre")
 
@@ -39,105 +175,197 @@ def sync_producto_desde_scraping(db, tienda: Tienda, datos: dict):
         print("❌ ERROR: El scraping NO contiene nombre de producto.")
         return None
 
+    # Sin precio la oferta y el historial violarían NOT NULL al aplicar el
+    # lote completo: se rechaza este ítem antes de encolar nada
+    precio_centavos = precio_a_centavos(datos.get("precio"))
+    if precio_centavos is None:
+        raise ValueError(f"El scraping no contiene un precio válido: {datos.get('precio')!r}")
+
     # -----------------------------
     # 1) Buscar o crear producto
     # -----------------------------
-    producto = db.query(Producto).filter(Producto.nombre.ilike(nombre)).first()
+    nombre_normalizado = normalizar_nombre(nombre)
+    producto_id, imagen_actual = _buscar_producto(db, nombre_normalizado, indice)
 
-    if not producto:
+    if not producto_id:
         producto = Producto(
             id=uuid.uuid4(),
             nombre=nombre,
-            marca="Fender",
-            modelo="AutoDetect",
+            # De la especificación o de lo extraído; si no, sin marca
+            marca=datos.get("marca"),
+            modelo=datos.get("modelo"),
             imagen_url=datos.get("imagen")  # 🟢 guardar imagen al crear
         )
         db.add(producto)
         db.flush()
-        print(f"🟢 Producto creado: {producto.id}")
-    else:
-        # 🟢 actualizar imagen si viene desde el scraping
-        if datos.get("imagen"):
-            producto.imagen_url = datos["imagen"]
-            print(f"🟡 Imagen actualizada: {datos['imagen']}")
+        producto_id = producto.id
+        if indice is not None:
+            indice.registrar_producto(nombre_normalizado, producto_id, producto.imagen_url)
+        print(f"🟢 Producto creado: {producto_id}")
 
-        print(f"🟢 Producto creado: {producto.id}")
+    elif datos.get("imagen") and datos["imagen"] != imagen_actual:
+        # 🟢 actualizar imagen si cambió en la tienda
+        lote.productos_actualizados[producto_id] = {
+            "id": producto_id,
+            "imagen_url": datos["imagen"],
+        }
+        if indice is not None:
+            indice.registrar_imagen(producto_id, datos["imagen"])
+        print(f"🟡 Imagen actualizada: {datos['imagen']}")
 
     # -----------------------------
     # 2) Buscar o crear tienda-producto
     # -----------------------------
-    tienda_producto = (
-        db.query(TiendaProducto)
-        .filter(
-            TiendaProducto.tienda_id == tienda.id,
-            TiendaProducto.url_producto == datos["url"]
-        )
-        .first()
-    )
+    tienda_producto_id, producto_vinculado = _buscar_tienda_producto(db, tienda.id, datos["url"], indice)
 
-    if not tienda_producto:
+    if tienda_producto_id and producto_vinculado is None:
+        # URL descubierta (scraper/descubrimiento.py): recién ahora se sabe su producto
+        lote.tienda_productos_vinculados[tienda_producto_id] = {
+            "id": tienda_producto_id,
+            "producto_id": producto_id,
+            "actualizado_en": datetime.utcnow(),
+        }
+        if indice is not None:
+            indice.registrar_tienda_producto(tienda.id, datos["url"], tienda_producto_id, producto_id)
+
+    if not tienda_producto_id:
         tienda_producto = TiendaProducto(
             id=uuid.uuid4(),
             tienda_id=tienda.id,
-            producto_id=producto.id,
+            producto_id=producto_id,
             url_producto=datos["url"],
             sku_tienda="AUTO",
             activo=True
         )
         db.add(tienda_producto)
         db.flush()
+        tienda_producto_id = tienda_producto.id
+        if indice is not None:
+            indice.registrar_tienda_producto(tienda.id, datos["url"], tienda_producto_id, producto_id)
 
-       # -----------------------------
-    # 3) Registrar oferta actual
-    #    (una por tienda_producto)
     # -----------------------------
-    precio_centavos = precio_a_centavos(datos.get("precio"))
+    # 3) y 4) Oferta actual + historial
+    # -----------------------------
+    registrar_precio(
+        db, lote, indice,
+        tienda_id=tienda.id,
+        tienda_producto_id=tienda_producto_id,
+        producto_id=producto_id,
+        precio_centavos=precio_centavos,
+        disponibilidad=disponibilidad_de(datos),
+        ahora=ahora or datetime.utcnow(),
+    )
+
+    if aplicar_al_final:
+        lote.aplicar(db)
+
+    print(f"💰 Precio registrado: {datos.get('precio')} ({precio_centavos} centavos)")
+
+    return producto_id
 
+
+def registrar_precio(
+    db, lote: LoteCatalogo, indice, tienda_id, tienda_producto_id, producto_id,
+    precio_centavos, disponibilidad: str, ahora: datetime,
+):
+    """
+    Encola en `lote` la oferta actual (una por tienda_producto) y el tramo de
+    historial. Lo usan el scraping de fichas y la cosecha de listados
+    (scraper/cosecha.py).
+    """
     # ¿Ya existe oferta actual para este tienda_producto?
-    oferta = (
-        db.query(OfertaActual)
-        .filter(OfertaActual.tienda_producto_id == tienda_producto.id)
-        .first()
-    )
+    oferta_id = _buscar_oferta(db, tienda_producto_id, indice)
 
-    if oferta:
+    if oferta_id:
         # 🔁 Actualizar oferta existente
-        oferta.precio_centavos = precio_centavos
-        oferta.moneda = "CLP"
-        oferta.disponibilidad = "disponible"
-        oferta.fecha_listado = datetime.utcnow()
-        oferta.fecha_scraping = datetime.utcnow()
+        lote.ofertas_actualizadas[tienda_producto_id] = {
+            "id": oferta_id,
+            "precio_centavos": precio_centavos,
+            "moneda": "CLP",
+            "disponibilidad": disponibilidad,
+            "fecha_listado": ahora,
+            "fecha_scraping": ahora,
+        }
     else:
         # 🆕 Crear nueva oferta
-        oferta = OfertaActual(
-            id=uuid.uuid4(),
-            tienda_producto_id=tienda_producto.id,
-            producto_id=producto.id,
-            tienda_id=tienda.id,
-            precio_centavos=precio_centavos,
-            moneda="CLP",
-            disponibilidad="disponible",
-            fecha_listado=datetime.utcnow(),
-            fecha_scraping=datetime.utcnow(),
-        )
-        db.add(oferta)
+        oferta_id = uuid.uuid4()
+        lote.ofertas_nuevas[tienda_producto_id] = {
+            "id": oferta_id,
+            "tienda_producto_id": tienda_producto_id,
+            "producto_id": producto_id,
+            "tienda_id": tienda_id,
+            "precio_centavos": precio_centavos,
+            "moneda": "CLP",
+            "disponibilidad": disponibilidad,
+            "fecha_listado": ahora,
+            "fecha_scraping": ahora,
+        }
+        if indice is not None:
+            indice.registrar_oferta(tienda_producto_id, oferta_id)
 
+    lote.productos_con_ofertas.add(producto_id)
 
-    # -----------------------------
-    # 4) Registrar historial
-    # -----------------------------
-    historial = HistorialPrecio(
-        id=uuid.uuid4(),
-        tienda_producto_id=tienda_producto.id,
-        precio_centavos=precio_centavos,
-        moneda="CLP",
-        disponibilidad="disponible",
-        valido_desde=datetime.utcnow(),
-        fuente="scraper",
-        fecha_scraping=datetime.utcnow()
-    )
-    db.add(historial)
+    # Historial: solo cuando cambia precio/disponibilidad;
+    # si no, se extiende el tramo vigente
+    ultimo = _ultimo_historial(db, tienda_producto_id, indice)
 
-    print(f"💰 Precio registrado: {datos.get('precio')} ({precio_centavos} centavos)")
+    if ultimo and ultimo[1] == precio_centavos and ultimo[2] == disponibilidad:
+        lote.historial_confirmado[tienda_producto_id] = {
+            "id": ultimo[0],
+            "confirmado_hasta": ahora,
+        }
+    else:
+        historial_id = uuid.uuid4()
+        lote.historial_nuevo[tienda_producto_id] = {
+            "id": historial_id,
+            "tienda_producto_id": tienda_producto_id,
+            "precio_centavos": precio_centavos,
+            "moneda": "CLP",
+            "disponibilidad": disponibilidad,
+            "valido_desde": ahora,
+            "fuente": "scraper",
+            "fecha_scraping": ahora,
+            "confirmado_hasta": ahora,
+        }
+        if indice is not None:
+            indice.registrar_historial(tienda_producto_id, historial_id, precio_centavos, disponibilidad)
+
+
+def confirmar_precios_vigentes(db, tienda_producto_ids, ahora=None):
+    """
+    Marca como "visto otra vez" el precio actual de URLs que no cambiaron
+    (304 o mismos datos extraídos) con dos UPDATE para toda la corrida,
+    en vez de reescribir cada producto.
+    """
+    if not tienda_producto_ids:
+        return
+
+    ahora = ahora or datetime.utcnow()
+    ids = [str(i) for i in tienda_producto_ids]
 
-    return producto
+    db.execute(
+        text(
+            """
+            UPDATE precios.historial_precios h
+            SET confirmado_hasta = :ahora
+            FROM (
+                SELECT DISTINCT ON (tienda_producto_id) id
+                FROM precios.historial_precios
+                WHERE tienda_producto_id = ANY(CAST(:ids AS uuid[]))
+                ORDER BY tienda_producto_id, valido_desde DESC NULLS LAST
+            ) ultimos
+            WHERE h.id = ultimos.id
+            """
+        ),
+        {"ahora": ahora, "ids": ids},
+    )
+    db.execute(
+        text(
+            """
+            UPDATE precios.ofertas_actuales
+            SET fecha_scraping = :ahora
+            WHERE tienda_producto_id = ANY(CAST(:ids AS uuid[]))
+            """
+        ),
+        {"ahora": ahora, "ids": ids},
+    )
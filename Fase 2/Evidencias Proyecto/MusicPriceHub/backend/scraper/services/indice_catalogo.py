@@ -0,0 +1,130 @@
+# scraper/services/indice_catalogo.py
+"""
+Índice en memoria de la identidad del catálogo para una corrida.
+
+Se carga una vez al inicio (4 consultas) y permite resolver sin ir a la BD:
+  - nombre normalizado      → producto_id (+ imagen actual)
+  - (tienda_id, url)        → (tienda_producto_id, producto_id)
+  - tienda_producto_id      → oferta_id
+  - tienda_producto_id      → último tramo de historial (id, precio, disponibilidad)
+
+Las filas creadas durante la corrida se registran en el índice, pero quedan
+"pendientes" hasta que el lote hace commit: si hay rollback se deshacen.
+"""
+from sqlalchemy import text
+
+from models import Producto, TiendaProducto, OfertaActual
+from utils.texto import normalizar_nombre
+
+_AUSENTE = object()
+
+
+class IndiceCatalogo:
+    def __init__(self):
+        self.productos = {}
+        self.imagenes = {}
+        self.tienda_productos = {}
+        self.ofertas = {}
+        self.historial = {}
+
+        # Cambios aún no confirmados: (diccionario, clave, valor anterior)
+        self._diario = []
+
+    @classmethod
+    def cargar(cls, db, tienda_ids) -> "IndiceCatalogo":
+        indice = cls()
+        tienda_ids = list(tienda_ids)
+
+        for pid, nombre_normalizado, nombre, imagen in db.query(
+            Producto.id, Producto.nombre_normalizado, Producto.nombre, Producto.imagen_url
+        ):
+            clave = nombre_normalizado or normalizar_nombre(nombre)
+            indice.productos.setdefault(clave, pid)
+            indice.imagenes[pid] = imagen
+
+        for tp_id, tienda_id, url, producto_id in db.query(
+            TiendaProducto.id, TiendaProducto.tienda_id, TiendaProducto.url_producto, TiendaProducto.producto_id
+        ).filter(TiendaProducto.tienda_id.in_(tienda_ids)):
+            indice.tienda_productos.setdefault((tienda_id, url), (tp_id, producto_id))
+
+        for oferta_id, tp_id in db.query(
+            OfertaActual.id, OfertaActual.tienda_producto_id
+        ).filter(OfertaActual.tienda_id.in_(tienda_ids)):
+            indice.ofertas.setdefault(tp_id, oferta_id)
+
+        filas = db.execute(
+            text(
+                """
+                SELECT DISTINCT ON (h.tienda_producto_id)
+                    h.tienda_producto_id, h.id, h.precio_centavos, h.disponibilidad
+                FROM precios.historial_precios h
+                JOIN catalogo.tienda_productos tp ON tp.id = h.tienda_producto_id
+                WHERE tp.tienda_id = ANY(CAST(:tiendas AS uuid[]))
+                ORDER BY h.tienda_producto_id, h.valido_desde DESC NULLS LAST
+                """
+            ),
+            {"tiendas": [str(t) for t in tienda_ids]},
+        )
+        for tp_id, hist_id, precio, disponibilidad in filas:
+            indice.historial[tp_id] = (hist_id, precio, disponibilidad)
+
+        print(
+            f"🗂️ Índice de catálogo: {len(indice.productos)} productos, "
+            f"{len(indice.tienda_productos)} URLs, {len(indice.ofertas)} ofertas"
+        )
+        return indice
+
+    # -----------------------------
+    # Registro con deshacer
+    # -----------------------------
+    def _registrar(self, diccionario: dict, clave, valor):
+        self._diario.append((diccionario, clave, diccionario.get(clave, _AUSENTE)))
+        diccionario[clave] = valor
+
+    def marca(self) -> int:
+        return len(self._diario)
+
+    def deshacer(self, marca: int = 0):
+        while len(self._diario) > marca:
+            diccionario, clave, anterior = self._diario.pop()
+            if anterior is _AUSENTE:
+                diccionario.pop(clave, None)
+            else:
+                diccionario[clave] = anterior
+
+    def confirmar(self):
+        self._diario.clear()
+
+    # -----------------------------
+    # Consultas / registro
+    # -----------------------------
+    def producto(self, nombre_normalizado: str):
+        """Devuelve (producto_id, imagen_url) o (None, None)."""
+        pid = self.productos.get(nombre_normalizado)
+        return pid, self.imagenes.get(pid)
+
+    def registrar_producto(self, nombre_normalizado: str, producto_id, imagen_url):
+        self._registrar(self.productos, nombre_normalizado, producto_id)
+        self._registrar(self.imagenes, producto_id, imagen_url)
+
+    def registrar_imagen(self, producto_id, imagen_url):
+        self._registrar(self.imagenes, producto_id, imagen_url)
+
+    def tienda_producto(self, tienda_id, url: str):
+        """Devuelve (tienda_producto_id, producto_id) o (None, None)."""
+        return self.tienda_productos.get((tienda_id, url), (None, None))
+
+    def registrar_tienda_producto(self, tienda_id, url: str, tienda_producto_id, producto_id):
+        self._registrar(self.tienda_productos, (tienda_id, url), (tienda_producto_id, producto_id))
+
+    def oferta(self, tienda_producto_id):
+        return self.ofertas.get(tienda_producto_id)
+
+    def registrar_oferta(self, tienda_producto_id, oferta_id):
+        self._registrar(self.ofertas, tienda_producto_id, oferta_id)
+
+    def ultimo_historial(self, tienda_producto_id):
+        return self.historial.get(tienda_producto_id)
+
+    def registrar_historial(self, tienda_producto_id, historial_id, precio, disponibilidad):
+        self._registrar(self.historial, tienda_producto_id, (historial_id, precio, disponibilidad))
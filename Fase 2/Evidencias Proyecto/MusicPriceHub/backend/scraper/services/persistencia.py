@@ -0,0 +1,209 @@
+# scraper/services/persistencia.py
+"""
+Persistencia por lotes de una corrida de scraping.
+
+En vez de abrir una TareaScraping y hacer commit por cada URL, la corrida
+tiene UNA tarea y los resultados se acumulan en memoria. Cada
+LOTE_MAXIMO resultados (o LOTE_SEGUNDOS segundos) se escriben todos en una
+sola transacción:
+  - producto / tienda-producto nuevos vía ORM (un SAVEPOINT por ítem, para
+    que un ítem malo no arrastre al resto); los ya conocidos se resuelven
+    con el IndiceCatalogo de la corrida, sin consultas,
+  - ofertas e historial con INSERT/UPDATE multi-fila (LoteCatalogo),
+  - un ResultadoScraping por ítem con su estado ("ok" / "error") y los
+    tiempos por fase de la página (scraper/metricas.py).
+
+Al cerrar, la TareaScraping guarda el agregado de tiempos de la corrida.
+"""
+import os
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from models import TareaScraping, ResultadoScraping
+from scraper.metricas import AcumuladorMetricas, MedicionPagina, ms_desde
+from scraper.services.catalogo_service import LoteCatalogo, sync_producto_desde_scraping
+
+LOTE_MAXIMO = int(os.getenv("SCRAPER_LOTE", "50"))
+LOTE_SEGUNDOS = float(os.getenv("SCRAPER_LOTE_SEGUNDOS", "10"))
+
+
+class PersistenciaScraping:
+    def __init__(self, scraper, detalle: str = None, tamano: int = LOTE_MAXIMO, intervalo: float = LOTE_SEGUNDOS):
+        self.scraper = scraper
+        self.db = scraper.db
+        self.tienda = scraper.tienda
+        self.tamano = tamano
+        self.intervalo = intervalo
+        self.resumen = Counter()
+        self.metricas = AcumuladorMetricas()
+
+        self._pendientes = []
+        self._ultimo_flush = time.monotonic()
+
+        self.tarea = TareaScraping(
+            tienda_id=self.tienda.id,
+            inicio_en=datetime.utcnow(),
+            estado="en_curso",
+            detalle=detalle or f"Corrida de scraping {self.tienda.nombre}",
+        )
+        self.db.add(self.tarea)
+        self.db.commit()
+        self.tarea_id = self.tarea.id
+
+    # -----------------------------
+    # Buffer
+    # -----------------------------
+    def agregar(self, datos: dict) -> list:
+        """Encola un resultado; devuelve lo guardado si tocó escribir el lote."""
+        self._pendientes.append(datos)
+        if len(self._pendientes) >= self.tamano:
+            return self.flush()
+        return self.flush_si_vencido()
+
+    def flush_si_vencido(self) -> list:
+        if self._pendientes and time.monotonic() - self._ultimo_flush >= self.intervalo:
+            return self.flush()
+        return []
+
+    def flush(self) -> list:
+        """
+        Escribe el lote pendiente. Devuelve [(datos, producto_id | None), ...].
+        """
+        self._ultimo_flush = time.monotonic()
+        if not self._pendientes:
+            return []
+
+        pendientes, self._pendientes = self._pendientes, []
+        ahora = datetime.utcnow()
+        escrituras = LoteCatalogo()
+        salida = []
+        resultados = []
+
+        mediciones = [self.scraper.tomar_medicion(datos.get("url")) for datos in pendientes]
+        errores = []
+
+        try:
+            for datos, medicion in zip(pendientes, mediciones):
+                inicio = time.perf_counter()
+                producto, error = self._sincronizar(datos, escrituras, ahora)
+                if medicion is not None:
+                    medicion.bd_ms = ms_desde(inicio, time.perf_counter())
+                salida.append((datos, producto))
+                errores.append(error)
+
+            # La escritura en bloque se reparte entre los ítems del lote
+            inicio = time.perf_counter()
+            escrituras.aplicar(self.db)
+            parte_bloque = ms_desde(inicio, time.perf_counter()) // len(pendientes)
+            for (datos, producto), error, medicion in zip(salida, errores, mediciones):
+                if medicion is not None:
+                    medicion.bd_ms += parte_bloque
+                resultados.append(self._resultado(datos, producto, error, ahora, medicion))
+
+            self.db.execute(insert(ResultadoScraping), resultados)
+            self.db.commit()
+            if self.scraper.indice is not None:
+                self.scraper.indice.confirmar()
+
+        except Exception as e:
+            # Falló la escritura en bloque: nada del lote quedó guardado
+            self.db.rollback()
+            if self.scraper.indice is not None:
+                self.scraper.indice.deshacer()
+            print("ERROR al guardar lote en BD:", str(e))
+            for datos in pendientes:
+                self.scraper.marcar_fallo(datos.get("url"))
+                self.scraper.olvidar_estado(datos.get("url"))
+            self._registrar_errores(pendientes, mediciones, str(e), ahora)
+            salida = [(datos, None) for datos in pendientes]
+
+        for (_, producto), medicion in zip(salida, mediciones):
+            resultado = "ok" if producto else "error"
+            self.resumen[resultado] += 1
+            self.metricas.agregar(medicion, resultado)
+        print(f"💾 Lote guardado: {len(pendientes)} ítems ({dict(self.resumen)})")
+        return salida
+
+    def _sincronizar(self, datos: dict, escrituras: LoteCatalogo, ahora: datetime):
+        lote_item = LoteCatalogo()
+        indice = self.scraper.indice
+        marca = indice.marca() if indice is not None else 0
+        savepoint = self.db.begin_nested()
+        try:
+            producto = sync_producto_desde_scraping(
+                db=self.db,
+                tienda=self.tienda,
+                datos=datos,
+                lote=lote_item,
+                indice=indice,
+                ahora=self.scraper.obtenido_en(datos.get("url"), ahora),
+            )
+            if producto:
+                self.scraper.registrar_estado(datos, ahora)
+            savepoint.commit()
+        except Exception as e:
+            savepoint.rollback()
+            if indice is not None:
+                indice.deshacer(marca)
+            self.scraper.marcar_fallo(datos.get("url"))
+            self.scraper.olvidar_estado(datos.get("url"))
+            print("ERROR al guardar en BD:", str(e))
+            return None, str(e)
+
+        if not producto:
+            self.scraper.marcar_fallo(datos.get("url"))
+            return None, "El scraping no contiene nombre de producto"
+
+        escrituras.extender(lote_item)
+        return producto, None
+
+    def _resultado(self, datos: dict, producto, error: str, ahora: datetime, medicion=None) -> dict:
+        return {
+            "tarea_id": self.tarea_id,
+            "url_producto": datos.get("url"),
+            "datos_extraidos": datos if producto else {**datos, "error": error},
+            "obtenido_en": ahora,
+            "estado": "ok" if producto else "error",
+            **(medicion or MedicionPagina()).columnas(),
+        }
+
+    def _registrar_errores(self, pendientes: list, mediciones: list, error: str, ahora: datetime):
+        try:
+            self.db.execute(
+                insert(ResultadoScraping),
+                [
+                    self._resultado(datos, None, error, ahora, medicion)
+                    for datos, medicion in zip(pendientes, mediciones)
+                ],
+            )
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            print("ERROR al registrar resultados fallidos:", str(e))
+
+    # -----------------------------
+    # Cierre de la corrida
+    # -----------------------------
+    def finalizar(self) -> list:
+        salida = self.flush()
+
+        if self.resumen["error"] and self.resumen["ok"]:
+            estado = "parcial"
+        elif self.resumen["error"]:
+            estado = "error"
+        else:
+            estado = "ok"
+
+        try:
+            self.tarea.estado = estado
+            self.tarea.fin_en = datetime.utcnow()
+            self.tarea.metricas = self.metricas.resumen()
+            self.tarea.detalle = f"{self.tarea.detalle} — {dict(self.resumen)}"
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            print("ERROR al cerrar la tarea de scraping:", str(e))
+        return salida
@@ -0,0 +1,108 @@
+# scraper/snapshots.py
+"""
+Copias comprimidas del HTML descargado, direccionadas por contenido.
+
+Cada página que se descarga (HTTP o navegador) se guarda en disco como
+    <DIRECTORIO_SNAPSHOTS>/<sha256[:2]>/<sha256>.html.zst   (si está zstandard)
+    <DIRECTORIO_SNAPSHOTS>/<sha256[:2]>/<sha256>.html.gz    (si no)
+donde sha256 es el hash del HTML: dos descargas idénticas ocupan un solo
+archivo. El último snapshot de cada TiendaProducto queda apuntado en
+estado_scraping_productos.snapshot_hash, junto con el resto del estado de la URL.
+
+Si una tienda cambia su HTML y los selectores fallan, basta corregir la
+especificación y re-extraer desde disco (scraper/reparsear.py) en vez de
+volver a descargar todo.
+
+SCRAPER_SNAPSHOTS=0 desactiva el guardado; SCRAPER_SNAPSHOTS_DIR cambia
+el directorio.
+"""
+import gzip
+import hashlib
+import os
+import time
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # opcional: sin él se usa gzip
+    zstandard = None
+
+GUARDAR_SNAPSHOTS = os.getenv("SCRAPER_SNAPSHOTS", "1") not in ("0", "false", "no")
+DIRECTORIO_SNAPSHOTS = Path(
+    os.getenv("SCRAPER_SNAPSHOTS_DIR") or Path(__file__).resolve().parent.parent / "snapshots"
+)
+
+_MAGIA_ZSTD = b"\x28\xb5\x2f\xfd"
+
+
+def hash_html(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def _rutas(sha: str, directorio: Path):
+    carpeta = directorio / sha[:2]
+    return carpeta / f"{sha}.html.zst", carpeta / f"{sha}.html.gz"
+
+
+def guardar(html: str, directorio: Path = None) -> str:
+    """Guarda el HTML (si no existía ya) y devuelve su hash."""
+    directorio = directorio or DIRECTORIO_SNAPSHOTS
+    sha = hash_html(html)
+    for existente in _rutas(sha, directorio):
+        if existente.exists():
+            # Se renueva la fecha para que limpiar() no lo tome por huérfano
+            os.utime(existente)
+            return sha
+    ruta_zst, ruta_gz = _rutas(sha, directorio)
+
+    datos = html.encode("utf-8")
+    if zstandard is not None:
+        ruta, comprimido = ruta_zst, zstandard.ZstdCompressor(level=10).compress(datos)
+    else:
+        ruta, comprimido = ruta_gz, gzip.compress(datos, compresslevel=6)
+
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: otro proceso nunca ve un archivo a medias
+    temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.tmp")
+    temporal.write_bytes(comprimido)
+    os.replace(temporal, ruta)
+    return sha
+
+
+def leer(sha: str, directorio: Path = None) -> str:
+    directorio = directorio or DIRECTORIO_SNAPSHOTS
+    for ruta in _rutas(sha, directorio):
+        if not ruta.exists():
+            continue
+        datos = ruta.read_bytes()
+        if datos[:4] == _MAGIA_ZSTD:
+            if zstandard is None:
+                raise RuntimeError(f"Snapshot {sha} está en zstd y falta el paquete zstandard")
+            datos = zstandard.ZstdDecompressor().decompress(datos)
+        else:
+            datos = gzip.decompress(datos)
+        return datos.decode("utf-8")
+    raise FileNotFoundError(f"No existe el snapshot {sha}")
+
+
+def limpiar(referenciados: set, directorio: Path = None, antiguedad_minima: int = 86400) -> int:
+    """
+    Borra los snapshots que ya no apunta ningún TiendaProducto. Los más
+    nuevos que `antiguedad_minima` segundos se respetan: pueden ser de una
+    corrida que todavía no escribe su lote.
+    """
+    directorio = directorio or DIRECTORIO_SNAPSHOTS
+    if not directorio.exists():
+        return 0
+    limite = time.time() - antiguedad_minima
+    borrados = 0
+    for ruta in directorio.glob("*/*.html.*"):
+        if ruta.name.split(".", 1)[0] in referenciados:
+            continue
+        try:
+            if ruta.stat().st_mtime < limite:
+                ruta.unlink()
+                borrados += 1
+        except FileNotFoundError:
+            pass
+    return borrados
@@ -0,0 +1,321 @@
+# scraper/trabajos.py
+"""
+Trabajos de scraping pedidos desde la API (POST /scraping/guardar).
+
+La API no scrapea: valida que el dominio de la URL sea de una tienda
+registrada, inserta un TrabajoScraping (operaciones.trabajos_scraping) y
+devuelve su id. El estado vive en la BD, así que GET /scraping/trabajos/{id}
+responde igual desde cualquier proceso de uvicorn.
+
+El worker (scraper/worker.py) atiende los trabajos mientras espera entre
+ciclos, cada TRABAJOS_CADA segundos: toma uno con FOR UPDATE SKIP LOCKED
+(dos workers nunca toman el mismo), arrienda la URL en la cola igual que
+un ciclo (scraper/cola.py) y la scrapea con el motor. Si otro worker la
+tiene arrendada, el trabajo vuelve a pendiente por REINTENTO_ARRENDADA
+segundos. Un trabajo "en_curso" por más de TRABAJO_VENCIDO segundos (el
+worker murió) lo retoma otro.
+
+Si hay más de MAXIMO_EN_COLA trabajos sin terminar se rechazan los nuevos
+(ColaLlena → 503). Los terminados se borran tras RETENCION_TRABAJOS
+segundos; lo guardado queda además en la TareaScraping / ResultadoScraping
+de la corrida.
+
+Uso (desde /backend):
+    python -m scraper.trabajos     # atiende los trabajos pendientes y sale
+"""
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal, engine
+from models import OfertaActual, Producto, Tienda, TiendaProducto, TrabajoScraping
+from scraper.cola import DURACION_ARRIENDO, WORKER_ID, liberar_todo
+from scraper.declarativo import scraper_generico
+from scraper.motor import MotorScraping, dominio_de
+from scraper.registro import scraper_para
+from scraper.senales import detener
+
+TRABAJOS_CADA = int(os.getenv("SCRAPER_TRABAJOS_CADA", "5"))
+MAXIMO_EN_COLA = int(os.getenv("SCRAPER_TRABAJOS_MAXIMO", "100"))
+RETENCION_TRABAJOS = int(os.getenv("SCRAPER_TRABAJOS_RETENCION", "86400"))
+TRABAJO_VENCIDO = int(os.getenv("SCRAPER_TRABAJO_VENCIDO", "900"))
+REINTENTO_ARRENDADA = int(os.getenv("SCRAPER_TRABAJOS_REINTENTO", "30"))
+
+ACTIVOS = ("pendiente", "en_curso")
+TERMINADOS = ("ok", "error")
+
+# Resultados del motor que cuentan como trabajo exitoso
+RESULTADOS_OK = ("ok", "sin_cambios")
+
+SQL_TOMAR = """
+UPDATE operaciones.trabajos_scraping t
+SET estado = 'en_curso', worker = :worker, inicio_en = now(), reintentar_en = NULL
+WHERE t.id = (
+    SELECT id
+    FROM operaciones.trabajos_scraping
+    WHERE (estado = 'pendiente' AND (reintentar_en IS NULL OR reintentar_en <= now()))
+       OR (estado = 'en_curso' AND inicio_en < now() - make_interval(secs => :vencido))
+    ORDER BY creado_en
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING t.id
+"""
+
+SQL_CREAR_ESTADO_URL = """
+INSERT INTO operaciones.estado_scraping_productos (tienda_producto_id, intentos)
+SELECT tp.id, 0
+FROM catalogo.tienda_productos tp
+WHERE tp.tienda_id = :tienda AND tp.url_producto = :url
+ON CONFLICT (tienda_producto_id) DO NOTHING
+"""
+
+# Igual que SQL_ARRENDAR de scraper/cola.py, pero para una URL puntual
+SQL_ARRENDAR_URL = """
+UPDATE operaciones.estado_scraping_productos e
+SET arrendado_por = :worker,
+    arrendado_hasta = now() + make_interval(secs => :duracion),
+    intentos = e.intentos + 1
+FROM catalogo.tienda_productos tp
+WHERE tp.id = e.tienda_producto_id
+  AND tp.tienda_id = :tienda
+  AND tp.url_producto = :url
+  AND (e.arrendado_hasta IS NULL OR e.arrendado_hasta < now() OR e.arrendado_por = :worker)
+RETURNING e.tienda_producto_id
+"""
+
+# Lo que tenía tomado una instancia anterior de este worker vuelve a pendiente
+SQL_LIBERAR_TRABAJOS = """
+UPDATE operaciones.trabajos_scraping
+SET estado = 'pendiente', worker = NULL, inicio_en = NULL
+WHERE estado = 'en_curso' AND worker = :worker
+"""
+
+SQL_PURGAR = """
+DELETE FROM operaciones.trabajos_scraping
+WHERE estado IN ('ok', 'error')
+  AND fin_en < now() - make_interval(secs => :retencion)
+"""
+
+
+class ColaLlena(RuntimeError):
+    pass
+
+
+class TiendaNoRegistrada(ValueError):
+    pass
+
+
+def a_dict(trabajo: TrabajoScraping) -> dict:
+    return {
+        "id": str(trabajo.id),
+        "url": trabajo.url,
+        "estado": trabajo.estado,
+        "creado_en": trabajo.creado_en,
+        "inicio_en": trabajo.inicio_en,
+        "fin_en": trabajo.fin_en,
+        "resultado": trabajo.resultado,
+        "error": trabajo.error,
+    }
+
+
+def tienda_para_url(db, url: str):
+    """La tienda registrada del dominio de `url`, o None."""
+    dominio = dominio_de(url)
+    for tienda in db.query(Tienda).all():
+        if dominio in (dominio_de(tienda.sitio_web or ""), dominio_de(tienda.url or "")):
+            return tienda
+    return None
+
+
+# -----------------------------
+# Lado de la API
+# -----------------------------
+def _activo(db, url: str):
+    return (
+        db.query(TrabajoScraping)
+        .filter(TrabajoScraping.url == url, TrabajoScraping.estado.in_(ACTIVOS))
+        .first()
+    )
+
+
+def encolar_trabajo(db, url: str) -> dict:
+    """Inserta el trabajo de `url` (o devuelve el que ya está sin terminar)."""
+    tienda = tienda_para_url(db, url)
+    if tienda is None:
+        raise TiendaNoRegistrada(f"{dominio_de(url)} no es una tienda registrada")
+
+    # La misma URL ya en curso: se devuelve ese trabajo
+    activo = _activo(db, url)
+    if activo is not None:
+        return a_dict(activo)
+
+    sin_terminar = (
+        db.query(func.count(TrabajoScraping.id))
+        .filter(TrabajoScraping.estado.in_(ACTIVOS))
+        .scalar()
+    )
+    if sin_terminar >= MAXIMO_EN_COLA:
+        raise ColaLlena(f"Hay {sin_terminar} trabajos de scraping sin terminar")
+
+    trabajo = TrabajoScraping(id=uuid.uuid4(), url=url, tienda_id=tienda.id, creado_en=datetime.utcnow())
+    db.add(trabajo)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otra petición encoló la misma URL entre la consulta y el INSERT
+        db.rollback()
+        activo = _activo(db, url)
+        if activo is None:
+            raise
+        return a_dict(activo)
+    return a_dict(trabajo)
+
+
+def obtener_trabajo(db, trabajo_id: str):
+    try:
+        trabajo = db.get(TrabajoScraping, uuid.UUID(str(trabajo_id)))
+    except ValueError:
+        return None
+    return a_dict(trabajo) if trabajo else None
+
+
+# -----------------------------
+# Lado del worker
+# -----------------------------
+def scrapear_url(db, tienda, url: str) -> dict:
+    """Scrapea y guarda una URL con el motor; devuelve lo que quedó en el catálogo."""
+    clase = scraper_para(tienda) or scraper_generico()
+    scraper = clase(tienda=tienda, db=db)
+
+    # Una sola página: no vale la pena levantar el pool de parseo
+    resumen = MotorScraping(concurrencia=1, parseo_en_procesos=False).ejecutar(
+        [(scraper, url)], precargar_indice=False
+    )
+    resultado = max(resumen, key=resumen.get) if resumen else "sin_resultado"
+
+    fila = (
+        db.query(
+            TiendaProducto.producto_id,
+            Producto.nombre,
+            OfertaActual.precio_centavos,
+            OfertaActual.disponibilidad,
+            OfertaActual.fecha_scraping,
+        )
+        .outerjoin(Producto, Producto.id == TiendaProducto.producto_id)
+        .outerjoin(OfertaActual, OfertaActual.tienda_producto_id == TiendaProducto.id)
+        .filter(TiendaProducto.tienda_id == tienda.id, TiendaProducto.url_producto == url)
+        .first()
+    )
+    return {
+        "resultado": resultado,
+        "scraper": clase.__name__,
+        "tienda": tienda.nombre,
+        "tienda_id": str(tienda.id),
+        "producto_id": str(fila.producto_id) if fila and fila.producto_id else None,
+        "producto": fila.nombre if fila else None,
+        "precio_centavos": fila.precio_centavos if fila else None,
+        "disponibilidad": fila.disponibilidad if fila else None,
+        "fecha_scraping": fila.fecha_scraping.isoformat() if fila and fila.fecha_scraping else None,
+        "link": url,
+    }
+
+
+def arrendar_url(db, tienda_id, url: str) -> bool:
+    """
+    Arrienda la URL para este worker. False si otro worker la tiene tomada;
+    una URL que todavía no está en el catálogo no tiene nada que arrendar.
+    """
+    params = {"tienda": str(tienda_id), "url": url}
+    try:
+        db.execute(text(SQL_CREAR_ESTADO_URL), params)
+        arrendada = db.execute(
+            text(SQL_ARRENDAR_URL),
+            {**params, "worker": WORKER_ID, "duracion": DURACION_ARRIENDO},
+        ).first()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if arrendada is not None:
+        return True
+    existe = db.query(TiendaProducto.id).filter(
+        TiendaProducto.tienda_id == tienda_id, TiendaProducto.url_producto == url
+    ).first()
+    return existe is None
+
+
+def tomar_trabajo(db):
+    try:
+        fila = db.execute(text(SQL_TOMAR), {"worker": WORKER_ID, "vencido": TRABAJO_VENCIDO}).first()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return db.get(TrabajoScraping, fila.id) if fila else None
+
+
+def ejecutar_trabajo(db, trabajo: TrabajoScraping):
+    if not arrendar_url(db, trabajo.tienda_id, trabajo.url):
+        print(f"⏸️ {trabajo.url} está arrendada por otro worker; el trabajo espera")
+        trabajo.estado = "pendiente"
+        trabajo.worker = None
+        trabajo.inicio_en = None
+        trabajo.reintentar_en = datetime.utcnow() + timedelta(seconds=REINTENTO_ARRENDADA)
+        db.commit()
+        return
+
+    try:
+        trabajo.resultado = scrapear_url(db, db.get(Tienda, trabajo.tienda_id), trabajo.url)
+        if trabajo.resultado["resultado"] in RESULTADOS_OK:
+            trabajo.estado = "ok"
+        else:
+            trabajo.estado = "error"
+            trabajo.error = trabajo.resultado["resultado"]
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error en el trabajo de scraping {trabajo.url}: {e}")
+        trabajo.estado = "error"
+        trabajo.error = str(e)
+    finally:
+        # Si el motor no alcanzó a intentarla (p. ej. circuito abierto), vuelve a la cola
+        liberar_todo()
+
+    trabajo.fin_en = datetime.utcnow()
+    db.commit()
+
+
+def atender_trabajos(limite: int = None) -> int:
+    """Ejecuta trabajos pendientes hasta que no queden (o `limite`); devuelve cuántos tomó."""
+    db = SessionLocal()
+    atendidos = 0
+    try:
+        db.execute(text(SQL_PURGAR), {"retencion": RETENCION_TRABAJOS})
+        db.commit()
+        while not detener.is_set() and (limite is None or atendidos < limite):
+            trabajo = tomar_trabajo(db)
+            if trabajo is None:
+                break
+            atendidos += 1
+            ejecutar_trabajo(db, trabajo)
+    finally:
+        db.close()
+    return atendidos
+
+
+def liberar_trabajos():
+    """Al arrancar el worker: sus trabajos en curso de una instancia anterior vuelven a pendiente."""
+    with engine.begin() as conn:
+        conn.execute(text(SQL_LIBERAR_TRABAJOS), {"worker": WORKER_ID})
+
+
+def main():
+    liberar_trabajos()
+    print(f"🧾 Trabajos de scraping atendidos: {atender_trabajos()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,83 @@
 # backend/scraper/worker.py
 import time
-from scraper.run_scraping_scheduled import scrapear_productos_fender
+from scraper.browser_pool import cerrar_browser_pool
+from scraper.cola import liberar_todo
+from scraper.cosecha import COSECHA_CADA, cosechar
+from scraper.imagenes import IMAGENES_CADA, actualizar_miniaturas
+from scraper.mantenimiento_scraping import MANTENIMIENTO_CADA, mantener
+from scraper.planificador import ejecutar_ciclo
+from scraper.senales import detener, instalar_manejadores
+from scraper.trabajos import TRABAJOS_CADA, atender_trabajos, liberar_trabajos
 
-# Para probar: 60 segundos.
-# Luego puedes subirlo a 3600 (1 hora) o 36000 (10 horas).
-INTERVALO = 60  
+# Cada cuánto se revisa la agenda. Cada URL tiene su propio intervalo
+# (scraper/agenda.py); en cada vuelta solo se scrapean las vencidas.
+INTERVALO = 60
 
 def main():
-    while True:
-        print("🚀 Ejecutando scraping automático (worker Docker)...")
-        try:
-            scrapear_productos_fender()
-        except Exception as e:
-            print("❌ Error en el scraping:", e)
-
-        print(f"⏳ Esperando {INTERVALO} segundos...")
-        time.sleep(INTERVALO)
+    # SIGTERM (docker stop) termina el ciclo en curso de forma ordenada
+    instalar_manejadores()
+
+    # Lo que una instancia anterior de este worker dejó tomado vuelve a la cola
+    try:
+        liberar_todo()
+        liberar_trabajos()
+    except Exception as e:
+        print("⚠️ No se pudieron recuperar los arriendos anteriores:", e)
+
+    ultimo_mantenimiento = None
+    ultima_cosecha = None
+    ultimas_miniaturas = None
+    try:
+        while not detener.is_set():
+            # Particiones nuevas / retención de las tablas de auditoría
+            if ultimo_mantenimiento is None or time.monotonic() - ultimo_mantenimiento >= MANTENIMIENTO_CADA:
+                try:
+                    mantener()
+                except Exception as e:
+                    print("❌ Error en el mantenimiento de scraping:", e)
+                ultimo_mantenimiento = time.monotonic()
+
+            # Precios desde listados: posterga las fichas que ya quedaron al día
+            if ultima_cosecha is None or time.monotonic() - ultima_cosecha >= COSECHA_CADA:
+                try:
+                    cosechar()
+                except Exception as e:
+                    print("❌ Error en la cosecha de listados:", e)
+                ultima_cosecha = time.monotonic()
+
+            # Miniaturas de las imágenes nuevas o cambiadas en el ciclo anterior
+            if ultimas_miniaturas is None or time.monotonic() - ultimas_miniaturas >= IMAGENES_CADA:
+                try:
+                    actualizar_miniaturas()
+                except Exception as e:
+                    print("❌ Error generando miniaturas:", e)
+                ultimas_miniaturas = time.monotonic()
+
+            if detener.is_set():
+                break
+
+            print("🚀 Ejecutando scraping automático (worker Docker)...")
+            try:
+                # Todas las tiendas con scraper registrado, en un mismo ciclo
+                ejecutar_ciclo()
+            except Exception as e:
+                print("❌ Error en el scraping:", e)
+
+            if not detener.is_set():
+                print(f"⏳ Esperando {INTERVALO} segundos...")
+                # Mientras espera atiende los trabajos pedidos desde la API
+                # (POST /scraping/guardar); se despierta apenas llega una señal
+                fin = time.monotonic() + INTERVALO
+                while not detener.is_set() and time.monotonic() < fin:
+                    try:
+                        atender_trabajos()
+                    except Exception as e:
+                        print("❌ Error atendiendo trabajos de scraping:", e)
+                    detener.wait(max(min(TRABAJOS_CADA, fin - time.monotonic()), 0))
+    finally:
+        # El Chromium del pool vive entre ciclos; se cierra solo al salir
+        cerrar_browser_pool()
+        print("👋 Worker de scraping detenido.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+# tests/conftest.py
+"""
+Configuración común de las pruebas (desde /backend):
+    python -m pytest tests
+
+Las pruebas de persistencia escriben en Postgres de verdad (esquemas,
+JSONB, uuid[]): necesitan TEST_DATABASE_URL apuntando a una base de
+pruebas y se saltan si no está. Las de extracción son offline.
+"""
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# database.py crea el engine al importarse (sin conectar): con la base de
+# pruebas, si está, y si no con una URL cualquiera para poder importar modelos
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or "postgresql://localhost/musicpricehub_pruebas"
+
+
+@pytest.fixture(scope="session")
+def engine_pruebas():
+    if not os.getenv("TEST_DATABASE_URL"):
+        pytest.skip("TEST_DATABASE_URL no está definida (estas pruebas requieren Postgres)")
+
+    from sqlalchemy import text
+
+    import models  # noqa: F401 — registra las tablas en Base.metadata
+    from database import Base, engine
+
+    with engine.begin() as conexion:
+        for esquema in sorted({t.schema for t in Base.metadata.tables.values() if t.schema}):
+            conexion.execute(text(f"CREATE SCHEMA IF NOT EXISTS {esquema}"))
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def db(engine_pruebas):
+    from database import SessionLocal
+
+    sesion = SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.rollback()
+        sesion.close()
+
+
+@pytest.fixture
+def tienda(db):
+    """Una tienda nueva por prueba: lo que se verifica se filtra por su id."""
+    from models import Tienda
+
+    sufijo = uuid.uuid4().hex[:8]
+    tienda = Tienda(
+        id=uuid.uuid4(),
+        nombre=f"Tienda de prueba {sufijo}",
+        url=f"https://{sufijo}.prueba.cl",
+        sitio_web=f"https://{sufijo}.prueba.cl",
+    )
+    db.add(tienda)
+    db.commit()
+    return tienda
@@ -0,0 +1,49 @@
+# tests/test_base_scraper.py
+"""Estado por URL de BaseScraper (offline, sin BD)."""
+import uuid
+from datetime import datetime
+
+from models import EstadoScrapingProducto, Tienda
+from scraper.base_scraper import BaseScraper
+from scraper.http_client import RespuestaHttp
+
+URL = "https://tienda.prueba.cl/guitarra"
+
+
+def test_pagina_sin_cambios_guarda_los_validadores_nuevos():
+    scraper = BaseScraper(tienda=Tienda(nombre="Tienda de prueba"), db=None)
+    estado = EstadoScrapingProducto(tienda_producto_id=uuid.uuid4(), etag='"v1"', last_modified="ayer")
+    scraper._estados[URL] = estado
+
+    # El servidor manda validadores nuevos, pero lo extraído es igual
+    html = scraper._aceptar_respuesta(URL, RespuestaHttp(200, "<html></html>", '"v2"', "hoy", 13))
+    assert html is not None
+    scraper.marcar_sin_cambios(URL)
+
+    # Lo mismo que hace confirmar_sin_cambios con cada URL marcada
+    scraper._reagendar(estado, URL, datetime.utcnow())
+
+    assert (estado.etag, estado.last_modified) == ('"v2"', "hoy")
+
+
+class _SesionFalsa:
+    def add(self, _objeto):
+        pass
+
+
+def test_reparseo_no_reagenda_ni_suelta_el_arriendo():
+    scraper = BaseScraper(tienda=Tienda(nombre="Tienda de prueba"), db=_SesionFalsa())
+    estado = EstadoScrapingProducto(
+        tienda_producto_id=uuid.uuid4(), etag='"v1"', arrendado_por="otro-worker", intentos=2
+    )
+    scraper._estados[URL] = estado
+    snapshot_en = datetime(2026, 1, 2)
+    scraper.reparseo = {URL: snapshot_en}
+
+    ahora = datetime.utcnow()
+    assert scraper.obtenido_en(URL, ahora) == snapshot_en
+    scraper.registrar_estado({"url": URL, "nombre": "Guitarra"}, ahora)
+
+    assert estado.hash_contenido is not None
+    assert (estado.arrendado_por, estado.intentos, estado.etag) == ("otro-worker", 2, '"v1"')
+    assert estado.ultimo_scraping_en is None and estado.proximo_scraping_en is None
@@ -0,0 +1,31 @@
+# tests/test_benchmark.py
+"""Regresión de parsers sobre el corpus grabado (scraper/corpus/), offline."""
+from scraper import benchmark
+from scraper.corpus import Corpus
+from scraper.declarativo import especificaciones_disponibles, scraper_declarativo
+
+
+def test_cada_especificacion_tiene_paginas_en_el_corpus():
+    dominios = set(Corpus().dominios())
+    for archivo in especificaciones_disponibles():
+        especificacion = scraper_declarativo(archivo).especificacion
+        assert dominios & set(especificacion.dominios or (archivo,)), f"{archivo} sin páginas grabadas"
+
+
+def test_corpus_commiteado_con_precision_total(capsys):
+    codigo = benchmark.main(["--minimo-precision", "1.0", "-n", "1"])
+    salida = capsys.readouterr().out
+    assert codigo == 0, salida
+    # Tiendas registradas y la especificación genérica
+    assert "fender.cl" in salida
+    assert "tiendademusica.cl" in salida
+
+
+def test_corpus_cubre_oferta_agotado_y_sin_imagen():
+    # Los casos que rompen parsers: precio tachado, sin stock y ficha sin foto
+    for dominio in Corpus().dominios():
+        paginas = Corpus().paginas(dominio)
+        assert len(paginas) >= 5, f"{dominio}: corpus muy chico"
+        assert any("old-price" in p.html() or "<del" in p.html() for p in paginas), f"{dominio} sin ofertas"
+        assert any(p.esperado.get("agotado") for p in paginas), f"{dominio} sin productos agotados"
+        assert any(p.esperado.get("imagen") is None for p in paginas), f"{dominio} sin fichas sin imagen"
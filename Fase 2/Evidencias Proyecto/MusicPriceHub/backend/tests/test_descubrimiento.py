@@ -0,0 +1,51 @@
+# tests/test_descubrimiento.py
+"""Comparación de URLs del descubrimiento (las de BD contra Postgres, ver conftest.py)."""
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from models import Tienda, TiendaProducto
+from scraper.descubrimiento import Descubrimiento, aplicar_descubrimiento, clave_url, limpiar_url
+
+
+def test_variantes_de_la_misma_pagina_tienen_la_misma_clave():
+    base = "https://www.fender.cl/guitarra-1245.html"
+    variantes = [
+        "http://fender.cl/guitarra-1245.html",
+        "https://FENDER.cl:443/guitarra-1245.html/",
+        "https://www.fender.cl/guitarra-1245.html?utm_source=sitemap&gclid=abc#resenas",
+    ]
+    assert {clave_url(u) for u in variantes} == {clave_url(base)}
+    assert clave_url("https://fender.cl/guitarra-1245.html?color=rojo") != clave_url(base)
+    assert clave_url("https://fender.cl/p?b=2&a=1") == clave_url("https://fender.cl/p?a=1&b=2")
+
+
+def test_normalizar_deja_una_url_descargable():
+    scraper = SimpleNamespace(descubrimiento={}, tienda=Tienda(sitio_web="https://www.fender.cl"))
+    descubrimiento = Descubrimiento(scraper)
+    assert (
+        descubrimiento.normalizar("https://WWW.Fender.cl/guitarra-1245.html?utm_medium=x&color=rojo#top")
+        == "https://www.fender.cl/guitarra-1245.html?color=rojo"
+    )
+    assert descubrimiento.normalizar("https://otra-tienda.cl/guitarra.html") is None
+    assert limpiar_url("mailto:ventas@fender.cl") is None
+
+
+def test_variantes_de_url_no_desactivan_ni_duplican(db, tienda):
+    ahora = datetime.utcnow()
+    guardadas = [f"{tienda.url}/producto-{i}" for i in range(4)]
+    for url in guardadas:
+        db.add(TiendaProducto(
+            id=uuid.uuid4(), tienda_id=tienda.id, url_producto=url,
+            sku_tienda="DESCUBIERTO", activo=True, creado_en=ahora, actualizado_en=ahora,
+        ))
+    db.commit()
+
+    # El sitemap ahora las publica con www., "/" final y utm_*
+    host = tienda.url.replace("https://", "https://www.")
+    encontradas = {f"{host}/producto-{i}/?utm_source=sitemap" for i in range(4)}
+    resumen = aplicar_descubrimiento(db, tienda, encontradas, completo=True)
+
+    assert (resumen["nuevas"], resumen["desactivadas"]) == (0, 0)
+    filas = db.query(TiendaProducto).filter(TiendaProducto.tienda_id == tienda.id).all()
+    assert sorted(tp.url_producto for tp in filas if tp.activo) == guardadas
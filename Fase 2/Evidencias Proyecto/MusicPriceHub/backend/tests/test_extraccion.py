@@ -0,0 +1,65 @@
+# tests/test_extraccion.py
+"""Especificaciones de extracción (offline, sin BD)."""
+from scraper.declarativo import scraper_declarativo, scraper_generico
+from scraper.services.catalogo_service import disponibilidad_de, precio_a_centavos
+
+FICHA = """
+<html><head>
+  <meta property="og:title" content="Guitarra de prueba">
+  {meta_marca}
+</head><body>
+  <div class="product-name"><h1>Guitarra de prueba</h1></div>
+  <div class="price-box"><span class="price">$1.299.990</span></div>
+</body></html>
+"""
+
+
+def _extraer(clase, html):
+    return clase(tienda=None, db=None).extraer_datos(html, "https://tienda.prueba.cl/guitarra")
+
+
+def test_especificacion_de_una_marca_la_fija():
+    datos = _extraer(scraper_declarativo("fender.cl"), FICHA.format(meta_marca=""))
+    assert datos["marca"] == "Fender"
+
+
+def test_generica_sin_marca_no_inventa_una():
+    datos = _extraer(scraper_generico(), FICHA.format(meta_marca=""))
+    assert datos["marca"] is None
+
+
+def test_generica_lee_la_marca_de_la_pagina():
+    html = FICHA.format(meta_marca='<meta property="product:brand" content="Ibanez">')
+    assert _extraer(scraper_generico(), html)["marca"] == "Ibanez"
+
+
+OFERTA = """
+<div class="price-box">
+  <p class="old-price"><span class="price">$1.499.990</span></p>
+  <p class="special-price"><span class="price">$1.199.990</span></p>
+</div>
+<p class="availability out-of-stock">Agotado</p>
+"""
+
+FICHA_OFERTA = f"""
+<html><body>
+  <div class="product-name"><h1>Guitarra de prueba</h1></div>
+  {OFERTA}
+</body></html>
+"""
+
+LISTADO_OFERTA = f"""
+<html><body><ul class="products-grid"><li class="item">
+  <h2 class="product-name"><a href="/guitarra">Guitarra de prueba</a></h2>
+  {OFERTA}
+</li></ul></body></html>
+"""
+
+
+def test_ficha_y_listado_leen_igual_precio_y_stock():
+    clase = scraper_declarativo("fender.cl")
+    ficha = _extraer(clase, FICHA_OFERTA)
+    [item], _ = clase.listado.extraer(LISTADO_OFERTA, "https://tienda.prueba.cl/guitarras.html")
+
+    assert precio_a_centavos(ficha["precio"]) == item["precio"] == 1199990
+    assert disponibilidad_de(ficha) == disponibilidad_de(item) == "agotado"
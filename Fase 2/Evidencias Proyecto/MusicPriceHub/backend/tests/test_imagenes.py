@@ -0,0 +1,88 @@
+# tests/test_imagenes.py
+"""Miniaturas de scraper/imagenes.py (offline, sin BD)."""
+import io
+from collections import Counter
+
+import pytest
+import requests
+from PIL import Image
+
+from scraper import imagenes
+
+
+def _png(ancho=40, alto=20) -> bytes:
+    salida = io.BytesIO()
+    Image.new("RGB", (ancho, alto), "red").save(salida, "PNG")
+    return salida.getvalue()
+
+
+def test_generar_escribe_las_miniaturas(tmp_path):
+    miniaturas = imagenes.generar(_png(), tmp_path)
+    assert set(miniaturas) == {str(t) for t in imagenes.TAMANOS}
+    for url in miniaturas.values():
+        ruta = tmp_path / url.removeprefix(f"{imagenes.URL_MEDIA}/")
+        assert Image.open(ruta).format == "WEBP"
+
+
+@pytest.mark.parametrize("contenido", [b"esto no es una imagen", _png()[:60]])
+def test_imagen_que_pillow_no_decodifica_es_invalida(tmp_path, contenido):
+    with pytest.raises(imagenes.ImagenInvalida):
+        imagenes.generar(contenido, tmp_path)
+    assert not list(tmp_path.rglob("*.webp"))
+
+
+class _Respuesta:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+@pytest.mark.parametrize("status, error", [
+    (404, imagenes.ImagenInvalida),
+    (408, requests.HTTPError),
+    (429, requests.HTTPError),
+    (503, requests.HTTPError),
+])
+def test_descargar_solo_descarta_los_4xx_definitivos(monkeypatch, status, error):
+    cliente = imagenes.get_http_client()
+    monkeypatch.setattr(cliente.session, "get", lambda *a, **k: _Respuesta(status))
+    with pytest.raises(error):
+        imagenes._descargar("https://tienda.prueba.cl/foto.jpg")
+
+
+class _Db:
+    def __init__(self):
+        self.filas = None
+
+    def execute(self, _sentencia, filas):
+        self.filas = filas
+
+    def commit(self):
+        pass
+
+
+def test_un_error_inesperado_no_bota_el_resto_del_lote(monkeypatch):
+    por_url = {"https://a/ok.jpg": [1], "https://a/falla.jpg": [2]}
+
+    def procesar(url):
+        if "falla" in url:
+            raise RuntimeError("algo raro")
+        return {"160": "/media/x.webp"}
+
+    monkeypatch.setattr(imagenes, "pendientes", lambda *a, **k: por_url)
+    monkeypatch.setattr(imagenes, "procesar", procesar)
+    db = _Db()
+
+    resumen = imagenes.generar_miniaturas(db, hilos=2)
+
+    assert resumen == Counter(ok=1, error=1)
+    assert db.filas == [{"id": 1, "imagen_origen_url": "https://a/ok.jpg", "miniaturas": {"160": "/media/x.webp"}}]
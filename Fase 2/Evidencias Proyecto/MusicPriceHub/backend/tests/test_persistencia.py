@@ -0,0 +1,119 @@
+# tests/test_persistencia.py
+"""Lotes de PersistenciaScraping contra Postgres (ver conftest.py)."""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from models import EstadoScrapingProducto, HistorialPrecio, OfertaActual, Producto, TiendaProducto
+from scraper.base_scraper import BaseScraper
+from scraper.services.indice_catalogo import IndiceCatalogo
+
+
+def _corrida(db, tienda):
+    scraper = BaseScraper(tienda=tienda, db=db)
+    scraper.iniciar_corrida(detalle="Prueba", indice=IndiceCatalogo.cargar(db, [tienda.id]))
+    return scraper
+
+
+def _item(tienda, precio="$1.299.990", **extra):
+    sufijo = uuid.uuid4().hex[:8]
+    return {
+        "url": f"{tienda.url}/producto/{sufijo}",
+        "nombre": f"Producto de prueba {sufijo}",
+        "precio": precio,
+        **extra,
+    }
+
+
+def _ofertas(db, tienda):
+    return db.query(OfertaActual).filter(OfertaActual.tienda_id == tienda.id).all()
+
+
+def _historial(db, tienda):
+    return (
+        db.query(HistorialPrecio)
+        .join(TiendaProducto, TiendaProducto.id == HistorialPrecio.tienda_producto_id)
+        .filter(TiendaProducto.tienda_id == tienda.id)
+        .all()
+    )
+
+
+def test_flush_guarda_oferta_e_historial(db, tienda):
+    scraper = _corrida(db, tienda)
+    items = [_item(tienda) for _ in range(3)]
+    for datos in items:
+        scraper.persistencia.agregar(datos)
+
+    salida = scraper.persistencia.flush()
+
+    assert all(producto for _, producto in salida)
+    ofertas = _ofertas(db, tienda)
+    assert len(ofertas) == 3
+    assert {o.precio_centavos for o in ofertas} == {1299990}
+    assert len(_historial(db, tienda)) == 3
+    assert scraper.finalizar_corrida()["ok"] == 3
+
+
+def test_item_sin_precio_no_arrastra_al_lote(db, tienda):
+    scraper = _corrida(db, tienda)
+    buenos = [_item(tienda) for _ in range(2)]
+    malo = _item(tienda, precio=None)
+    for datos in (buenos[0], malo, buenos[1]):
+        scraper.persistencia.agregar(datos)
+
+    salida = dict((datos["url"], producto) for datos, producto in scraper.persistencia.flush())
+
+    assert salida[malo["url"]] is None
+    assert all(salida[datos["url"]] for datos in buenos)
+    assert len(_ofertas(db, tienda)) == 2
+    assert len(_historial(db, tienda)) == 2
+    resumen = scraper.finalizar_corrida()
+    assert (resumen["ok"], resumen["error"]) == (2, 1)
+
+
+def test_producto_nuevo_toma_la_marca_extraida_o_ninguna(db, tienda):
+    scraper = _corrida(db, tienda)
+    sin_marca = _item(tienda)
+    con_marca = _item(tienda, marca="Ibanez")
+    scraper.persistencia.agregar(sin_marca)
+    scraper.persistencia.agregar(con_marca)
+
+    salida = dict((datos["url"], producto) for datos, producto in scraper.persistencia.flush())
+    scraper.finalizar_corrida()
+
+    assert db.get(Producto, salida[sin_marca["url"]]).marca is None
+    assert db.get(Producto, salida[con_marca["url"]]).marca == "Ibanez"
+
+
+def test_reparseo_guarda_con_la_fecha_del_snapshot_sin_tocar_la_cola(db, tienda):
+    datos = _item(tienda)
+    scraper = _corrida(db, tienda)
+    scraper.persistencia.agregar(datos)
+    scraper.persistencia.flush()
+    scraper.finalizar_corrida()
+
+    # Otro worker tiene la URL arrendada mientras se re-parsea su snapshot
+    tp = db.query(TiendaProducto).filter(TiendaProducto.url_producto == datos["url"]).one()
+    estado = db.get(EstadoScrapingProducto, tp.id)
+    arriendo = datetime.now(timezone.utc) + timedelta(minutes=5)
+    estado.arrendado_por, estado.arrendado_hasta, estado.intentos = "otro-worker", arriendo, 1
+    proximo = estado.proximo_scraping_en
+    db.commit()
+
+    snapshot_en = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    scraper = _corrida(db, tienda)
+    scraper.preparar_estados([tp])
+    scraper.reparseo = {datos["url"]: snapshot_en}
+    scraper.persistencia.agregar({**datos, "precio": "$999.990"})
+    scraper.persistencia.flush()
+    scraper.finalizar_corrida()
+
+    db.expire_all()
+    tramo = db.query(HistorialPrecio).filter(
+        HistorialPrecio.tienda_producto_id == tp.id, HistorialPrecio.precio_centavos == 999990
+    ).one()
+    assert tramo.valido_desde == snapshot_en
+    oferta = db.query(OfertaActual).filter(OfertaActual.tienda_producto_id == tp.id).one()
+    assert (oferta.precio_centavos, oferta.fecha_scraping) == (999990, snapshot_en)
+    estado = db.get(EstadoScrapingProducto, tp.id)
+    assert (estado.arrendado_por, estado.arrendado_hasta, estado.intentos) == ("otro-worker", arriendo, 1)
+    assert estado.proximo_scraping_en == proximo
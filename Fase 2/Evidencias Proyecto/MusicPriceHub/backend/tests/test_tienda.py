@@ -0,0 +1,29 @@
+# tests/test_tienda.py
+"""Escrituras de routers/tienda.py contra Postgres (ver conftest.py)."""
+import uuid
+
+from models import MejorPrecio, OfertaActual, TiendaProducto
+from routers.tienda import eliminar_tienda_producto
+from scraper.base_scraper import BaseScraper
+from scraper.services.indice_catalogo import IndiceCatalogo
+
+
+def test_eliminar_tienda_producto_borra_su_oferta_y_recalcula(db, tienda):
+    scraper = BaseScraper(tienda=tienda, db=db)
+    scraper.iniciar_corrida(detalle="Prueba", indice=IndiceCatalogo.cargar(db, [tienda.id]))
+    sufijo = uuid.uuid4().hex[:8]
+    scraper.persistencia.agregar({
+        "url": f"{tienda.url}/producto/{sufijo}",
+        "nombre": f"Producto de prueba {sufijo}",
+        "precio": "$99.990",
+    })
+    [(_, producto_id)] = scraper.persistencia.flush()
+    tp = db.query(TiendaProducto).filter(TiendaProducto.tienda_id == tienda.id).one()
+    assert db.get(MejorPrecio, producto_id).oferta_id is not None
+
+    eliminar_tienda_producto(tp.id, db)
+
+    assert db.query(OfertaActual).filter(OfertaActual.tienda_producto_id == tp.id).count() == 0
+    db.expire_all()
+    mejor = db.get(MejorPrecio, producto_id)
+    assert (mejor.oferta_id, mejor.cantidad_ofertas) == (None, 0)
@@ -0,0 +1,35 @@
+# tests/test_trabajos.py
+"""Trabajos de scraping en la BD (Postgres, ver conftest.py)."""
+import pytest
+
+from models import TrabajoScraping
+from scraper.trabajos import TiendaNoRegistrada, encolar_trabajo, obtener_trabajo, tomar_trabajo
+
+
+def test_dominio_sin_tienda_registrada_se_rechaza(db, tienda):
+    with pytest.raises(TiendaNoRegistrada):
+        encolar_trabajo(db, "https://tienda-que-no-existe.example/producto")
+
+
+def test_la_misma_url_no_se_encola_dos_veces(db, tienda):
+    url = f"{tienda.url}/producto/guitarra"
+    primero = encolar_trabajo(db, url)
+    segundo = encolar_trabajo(db, url)
+
+    assert primero["id"] == segundo["id"]
+    assert primero["estado"] == "pendiente"
+    assert obtener_trabajo(db, primero["id"])["url"] == url
+    assert obtener_trabajo(db, "no-es-un-uuid") is None
+
+
+def test_el_worker_toma_el_trabajo(db, tienda):
+    # Los pendientes de otras pruebas no deben interferir
+    db.query(TrabajoScraping).filter(TrabajoScraping.estado == "pendiente").delete()
+    db.commit()
+    trabajo = encolar_trabajo(db, f"{tienda.url}/producto/bajo")
+
+    tomado = tomar_trabajo(db)
+
+    assert str(tomado.id) == trabajo["id"]
+    assert tomado.estado == "en_curso"
+    assert tomar_trabajo(db) is None
@@ -0,0 +1,97 @@
+# utils/mejores_precios.py
+"""
+Proyección precios.mejores_precios: una fila por producto con su oferta más
+barata (precio, tienda, oferta), cuántas ofertas tiene y el precio_final
+(el menor entre esa oferta y precio_base_centavos).
+
+Se mantiene al escribir: todo lo que inserta, cambia o borra ofertas
+actuales (lote del scraper, routers/tienda.py) o el precio base de un
+producto (routers/productos.py) llama a recalcular() con los productos
+tocados, dentro de la misma transacción. Así el listado ordenado por
+precio es un recorrido de índice sobre esta tabla en vez de agregar
+ofertas_actuales en cada lectura.
+
+Uso (desde /backend):
+    python -m utils.mejores_precios     # reconstruye la tabla completa
+                                        # (p. ej. tras una carga manual o un respaldo)
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import SessionLocal
+
+# {filtro}: "WHERE true" para reconstruir todo, o "WHERE p.id = ANY(...)".
+# Siempre hay WHERE: sin él, el ON CONFLICT quedaría pegado al último JOIN ... ON
+SQL_RECALCULAR = """
+INSERT INTO precios.mejores_precios AS m (
+    producto_id, precio_oferta_centavos, tienda_id, oferta_id,
+    cantidad_ofertas, precio_final_centavos, actualizado_en
+)
+SELECT
+    p.id, o.precio_centavos, o.tienda_id, o.id,
+    COALESCE(c.cantidad, 0),
+    -- LEAST ignora los NULL: sirve igual sin precio base o sin ofertas
+    LEAST(p.precio_base_centavos, o.precio_centavos),
+    :ahora
+FROM catalogo.productos p
+LEFT JOIN LATERAL (
+    SELECT id, tienda_id, precio_centavos
+    FROM precios.ofertas_actuales
+    WHERE producto_id = p.id
+    ORDER BY precio_centavos, fecha_scraping DESC
+    LIMIT 1
+) o ON true
+LEFT JOIN LATERAL (
+    SELECT count(*) AS cantidad
+    FROM precios.ofertas_actuales
+    WHERE producto_id = p.id
+) c ON true
+{filtro}
+ON CONFLICT (producto_id) DO UPDATE SET
+    precio_oferta_centavos = EXCLUDED.precio_oferta_centavos,
+    tienda_id = EXCLUDED.tienda_id,
+    oferta_id = EXCLUDED.oferta_id,
+    cantidad_ofertas = EXCLUDED.cantidad_ofertas,
+    precio_final_centavos = EXCLUDED.precio_final_centavos,
+    actualizado_en = EXCLUDED.actualizado_en
+-- Se reescriben solo las filas que cambian
+WHERE (m.precio_oferta_centavos, m.tienda_id, m.oferta_id, m.cantidad_ofertas, m.precio_final_centavos)
+    IS DISTINCT FROM
+      (EXCLUDED.precio_oferta_centavos, EXCLUDED.tienda_id, EXCLUDED.oferta_id,
+       EXCLUDED.cantidad_ofertas, EXCLUDED.precio_final_centavos)
+"""
+
+
+def recalcular(db, producto_ids, ahora: datetime = None) -> int:
+    """Recalcula la fila de cada producto de `producto_ids` (sin commit)."""
+    ids = [str(pid) for pid in set(producto_ids) if pid is not None]
+    if not ids:
+        return 0
+    resultado = db.execute(
+        text(SQL_RECALCULAR.format(filtro="WHERE p.id = ANY(CAST(:ids AS uuid[]))")),
+        {"ids": ids, "ahora": ahora or datetime.utcnow()},
+    )
+    return resultado.rowcount
+
+
+def reconstruir(db) -> int:
+    """Recalcula todos los productos y hace commit."""
+    resultado = db.execute(
+        text(SQL_RECALCULAR.format(filtro="WHERE true")),
+        {"ahora": datetime.utcnow()},
+    )
+    db.commit()
+    return resultado.rowcount
+
+
+def main():
+    db = SessionLocal()
+    try:
+        print(f"🏷️ Mejores precios actualizados: {reconstruir(db)} productos")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
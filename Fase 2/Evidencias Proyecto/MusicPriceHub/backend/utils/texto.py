@@ -0,0 +1,13 @@
+# utils/texto.py
+import unicodedata
+
+
+def normalizar_nombre(nombre: str):
+    """
+    Clave de identidad de un producto por nombre:
+    "  Fender  Telecaster® " → "fender telecaster®"
+    (misma regla que el backfill de migraciones/002_producto_nombre_normalizado.sql)
+    """
+    if nombre is None:
+        return None
+    return " ".join(unicodedata.normalize("NFKC", nombre).split()).lower()
@@ -12,9 +12,19 @@ export default function AdminProductosPage() {
   useEffect(() => {
     const cargar = async () => {
       try {
-        const res = await fetch(`${API_URL}/api/productos`);
-        const json = await res.json();
-        setProductos(json);
+        // La API pagina: se siguen los cursores hasta traer todo
+        let todos: any[] = [];
+        let cursor: string | null = null;
+        do {
+          const url: string = cursor
+            ? `${API_URL}/api/productos/?limite=100&cursor=${encodeURIComponent(cursor)}`
+            : `${API_URL}/api/productos/?limite=100`;
+          const res = await fetch(url);
+          const json = await res.json();
+          todos = [...todos, ...json];
+          cursor = res.headers.get("X-Siguiente-Cursor");
+        } while (cursor);
+        setProductos(todos);
       } catch (err) {
         console.error("Error cargando productos", err);
       } finally {
@@ -13,6 +13,7 @@ type Producto = {
   marca?: string;
   modelo?: string;
   imagen_url?: string;
+  miniaturas?: Record<string, string>; // tamaño → /media/productos/...webp
   precio_final?: number;   // ← EL PRECIO VIENE DESDE EL BACKEND
 };
 
@@ -20,40 +21,43 @@ export default function HomePage() {
   const [productos, setProductos] = useState<Producto[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  // Cursor de la página siguiente (header X-Siguiente-Cursor de la API)
+  const [siguiente, setSiguiente] = useState<string | null>(null);
+  const [cargandoMas, setCargandoMas] = useState(false);
 
-  useEffect(() => {
-    const fetchProductos = async () => {
-      try {
-        const resp = await fetch("https://musicpricehub.onrender.com/api/productos/");
-        if (!resp.ok) {
-          const err = await resp.json().catch(() => null);
-          setError(
-            typeof err?.detail === "string"
-              ? err.detail
-              : "No se pudieron cargar los productos."
-          );
-          return;
-        }
-        const data = await resp.json();
-        setProductos(data);
-      } catch (_) {
-        setError("Error de conexión al cargar los productos.");
-      } finally {
-        setLoading(false);
+  const fetchProductos = async (cursor?: string) => {
+    const url = cursor
+      ? `https://musicpricehub.onrender.com/api/productos/?cursor=${encodeURIComponent(cursor)}`
+      : "https://musicpricehub.onrender.com/api/productos/";
+    try {
+      const resp = await fetch(url);
+      if (!resp.ok) {
+        const err = await resp.json().catch(() => null);
+        setError(
+          typeof err?.detail === "string"
+            ? err.detail
+            : "No se pudieron cargar los productos."
+        );
+        return;
       }
-    };
+      const data = await resp.json();
+      setProductos((prev) => (cursor ? [...prev, ...data] : data));
+      setSiguiente(resp.headers.get("X-Siguiente-Cursor"));
+    } catch (_) {
+      setError("Error de conexión al cargar los productos.");
+    }
+  };
 
-    fetchProductos();
+  useEffect(() => {
+    fetchProductos().finally(() => setLoading(false));
   }, []);
-useEffect(() => {
-  fetch("https://musicpricehub.onrender.com/api/productos/")
-    .then((res) => res.json())
-    .then((data) => {
-      console.log("PRODUCTOS RECIBIDOS DESDE LA API:", data);
-      setProductos(data);
-    })
-    .catch(() => setError("No se pudo conectar con la API."));
-}, []);
+
+  const cargarMas = async () => {
+    if (!siguiente) return;
+    setCargandoMas(true);
+    await fetchProductos(siguiente);
+    setCargandoMas(false);
+  };
 
   if (loading) {
     return <p className="p-4">Cargando productos...</p>;
@@ -84,7 +88,9 @@ useEffect(() => {
             >
               <img
                 src={
-                  p.imagen_url && p.imagen_url.trim() !== ""
+                  p.miniaturas?.["480"]
+                    ? `https://musicpricehub.onrender.com${p.miniaturas["480"]}`
+                    : p.imagen_url && p.imagen_url.trim() !== ""
                     ? p.imagen_url
                     : `https://placehold.co/300x200?text=${encodeURIComponent(
                         p.nombre || "Producto"
@@ -140,6 +146,18 @@ useEffect(() => {
         
         </div>
       )}
+
+      {siguiente && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={cargarMas}
+            disabled={cargandoMas}
+            className="bg-brand-accent text-black px-4 py-2 rounded disabled:opacity-50"
+          >
+            {cargandoMas ? "Cargando..." : "Cargar más"}
+          </button>
+        </div>
+      )}
     </main>
   );
 }
\ No newline at end of file
@@ -138,7 +138,11 @@ export default function ProductoDetallePage() {
         {/* IMAGEN */}
         <div className="flex justify-center">
           <img
-            src={p.imagen_url}
+            src={
+              p.miniaturas?.["960"]
+                ? `${API_URL}${p.miniaturas["960"]}`
+                : p.imagen_url
+            }
             alt={p.nombre}
             className="w-[420px] h-[420px] object-cover rounded-xl shadow"
           />